@@ -0,0 +1,79 @@
+"""
+An in-memory `Backend`, whose latency, page size and number of keys are set by the benchmarks
+"""
+from functools import partial
+import threading
+import time
+from typing import Dict, Iterator, List
+
+from password_organizer.backends.base import Backend, ListType
+
+
+def key_names(key_count: int) -> List[str]:
+    """ Keys spread over folders, like in real vaults """
+    return [f'/prod/service-{index % 500}/password-{index}' for index in range(key_count)]
+
+
+class FakeBackend(Backend):
+    """
+    Parameters
+    ==========
+    key_count: int
+        Number of passwords stored at first
+    page_size: int
+        Keys per page of the listings
+    latency: float
+        Seconds each call waits, like a network round trip would
+    """
+
+    def __init__(self, key_count: int = 1000, page_size: int = 50, latency: float = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.page_size = page_size
+        self.latency = latency
+        self.passwords: Dict[str, str] = {key: f'value of {key}' for key in key_names(key_count)}
+        self._lock = threading.Lock()
+
+    def _round_trip(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def initialize(self) -> None:
+        self._round_trip()
+
+    def title(self) -> None:
+        pass
+
+    def list_password_keys(self) -> ListType:
+        return self._list_page(0)
+
+    def _list_page(self, offset: int) -> ListType:
+        self._round_trip()
+        with self._lock:
+            keys = list(self.passwords)[offset:offset + self.page_size]
+            has_next_page = offset + self.page_size < len(self.passwords)
+        return keys, partial(self._list_page, offset + self.page_size) if has_next_page else None
+
+    def search_password_keys(self, search_string: str) -> Iterator[List[str]]:
+        self._round_trip()
+        with self._lock:
+            matching = [key for key in self.passwords if search_string in key]
+        for offset in range(0, len(matching), self.page_size):
+            yield matching[offset:offset + self.page_size]
+
+    def retrieve_password(self, key: str) -> str:
+        self._round_trip()
+        with self._lock:
+            return self.passwords[key]
+
+    def create_password(self, password_key: str, password_value: str) -> None:
+        self._round_trip()
+        with self._lock:
+            self.passwords[password_key] = password_value
+
+    def update_password(self, key: str, password_value: str) -> None:
+        self.create_password(key, password_value)
+
+    def delete_password(self, password_key: str) -> None:
+        self._round_trip()
+        with self._lock:
+            del self.passwords[password_key]
@@ -0,0 +1,77 @@
+"""
+Time to first frame and memory use of a list menu with many choices
+
+    python benchmarks/list_menu.py --choices 100000
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Dict, List
+
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+from password_organizer.cli_menu.choice import Choice
+from password_organizer.menu import list_choice_menu
+
+
+def build_choices(choice_count: int) -> List[Choice[str]]:
+    return [
+        Choice.from_string(f'/prod/service-{index % 500}/password-{index}')
+        for index in range(choice_count)
+    ]
+
+
+def time_to_first_frame(choices: List[Choice[str]]) -> float:
+    """
+    Seconds from the call of `list_choice_menu` until it returns, the first choice being chosen
+    as soon as it is displayed
+    """
+    with create_pipe_input() as pipe_input:
+        # The menu is rendered before the keys typed ahead are processed
+        pipe_input.send_text('\r')
+        with create_app_session(input=pipe_input, output=DummyOutput()):
+            start = time.perf_counter()
+            list_choice_menu(choices, 'Which password?', back=lambda: None)
+            return time.perf_counter() - start
+
+
+def measure(choice_count: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    choices = build_choices(choice_count)
+    build_seconds = time.perf_counter() - start
+    first_frame_seconds = time_to_first_frame(choices)
+
+    # Separate run: tracing slows everything down
+    tracemalloc.start()
+    choices = build_choices(choice_count)
+    choices_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    time_to_first_frame(choices)
+    _, menu_peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'build_ms': build_seconds * 1000,
+        'first_frame_ms': first_frame_seconds * 1000,
+        'choices_mb': choices_bytes / 2**20,
+        'menu_peak_mb': (menu_peak_bytes - choices_bytes) / 2**20,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--choices', type=int, default=100000)
+    args = parser.parse_args()
+
+    results = measure(args.choices)
+    print(f'{args.choices} choices')
+    print(f"  build:           {results['build_ms']:8.1f} ms")
+    print(f"  first frame:     {results['first_frame_ms']:8.1f} ms")
+    print(f"  choices memory:  {results['choices_mb']:8.1f} MB")
+    print(f"  menu peak extra: {results['menu_peak_mb']:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
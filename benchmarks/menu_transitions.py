@@ -0,0 +1,66 @@
+"""
+Latency of going from a menu to the next one: successive list menus and confirmations, answered
+through prompt_toolkit's pipe input as soon as they are displayed
+
+    python benchmarks/menu_transitions.py --menus 200 --choices 20
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+from password_organizer.cli_menu.choice import Choice
+from password_organizer.menu import confirmation_menu, go_back, list_choice_menu
+
+
+def time_menus(show_menu: Callable[[], object], keys: str, menu_count: int) -> List[float]:
+    """ Seconds taken by each of `menu_count` successive calls of `show_menu`, answered by keys """
+    durations = []
+    with create_pipe_input() as pipe_input:
+        with create_app_session(input=pipe_input, output=DummyOutput()):
+            for _ in range(menu_count):
+                # The menu is rendered before the keys typed ahead are processed
+                pipe_input.send_text(keys)
+                start = time.perf_counter()
+                show_menu()
+                durations.append(time.perf_counter() - start)
+    return durations
+
+
+def measure(menu_count: int, choice_count: int) -> Dict[str, List[float]]:
+    choices = [
+        Choice.from_string(f'/prod/service/password-{index}') for index in range(choice_count)
+    ]
+
+    def show_list_menu():
+        return list_choice_menu(choices, 'Which password?', back=go_back)
+
+    return {
+        'list menu': time_menus(show_list_menu, '\r', menu_count),
+        'searched list menu': time_menus(show_list_menu, 'pass1\r', menu_count),
+        'confirmation': time_menus(lambda: confirmation_menu('Are you sure?'), 'y', menu_count),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--menus', type=int, default=200)
+    parser.add_argument('--choices', type=int, default=20)
+    args = parser.parse_args()
+
+    results = measure(args.menus, args.choices)
+    print(f'{args.menus} menus of {args.choices} choices (first menu left out)')
+    for name, durations in results.items():
+        durations = durations[1:]
+        print(
+            f'  {name + ":":20} median {statistics.median(durations) * 1000:6.2f} ms   '
+            f'max {max(durations) * 1000:6.2f} ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+AWS clients answered from memory, for the benchmarks of the AWS backends
+
+The calls go through boto3 and botocore as usual (parameters validation and serialization, event
+hooks...), but the answer is given before the request is signed and sent: no network, no response
+parsing.
+"""
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.awsrequest import AWSResponse
+
+from password_organizer.backends.aws_clients import AWSClientPool
+
+from fake_backend import key_names
+
+
+Answer = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def _page(names: List[str], params: Dict[str, Any]) -> Tuple[List[str], Optional[str]]:
+    """ The page of `names` that the MaxResults / NextToken parameters ask for """
+    offset = int(params.get('NextToken') or 0)
+    page_size = params.get('MaxResults') or 10
+    next_offset = offset + page_size
+    return names[offset:next_offset], str(next_offset) if next_offset < len(names) else None
+
+
+class StubbedAWS:
+    """
+    The passwords of an SSM parameter store and of a Secrets Manager, in memory
+
+    Parameters
+    ==========
+    key_count: int
+        Number of parameters, and of secrets
+    latency: float
+        Seconds each API call waits, like a network round trip would
+    """
+
+    def __init__(self, key_count: int = 1000, latency: float = 0):
+        self.latency = latency
+        self.values = {key: f'value of {key}' for key in key_names(key_count)}
+        self.names = list(self.values)
+        self._answers: Dict[str, Answer] = {
+            'ssm.DescribeParameters': self._describe_parameters,
+            'ssm.GetParameter': self._get_parameter,
+            'ssm.GetParameters': self._get_parameters,
+            'secretsmanager.ListSecrets': self._list_secrets,
+            'secretsmanager.GetSecretValue': self._get_secret_value,
+            'secretsmanager.BatchGetSecretValue': self._batch_get_secret_value,
+            'sts.GetCallerIdentity': lambda _params: {
+                'Account': '123456789012', 'UserId': 'benchmark', 'Arn': 'arn:benchmark',
+            },
+            'iam.ListAccountAliases': lambda _params: {'AccountAliases': ['benchmark']},
+        }
+
+    def client_pool(self) -> AWSClientPool:
+        """ A pool of clients answered by this stub """
+        # Never used to sign anything, but required by the backends
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+        pool = AWSClientPool()
+        # Copied to the clients when they are created
+        pool.session.events.register('before-parameter-build', self._record_params)
+        pool.session.events.register('before-call', self._answer)
+        return pool
+
+    @staticmethod
+    def _record_params(params, context, **_kwargs) -> None:
+        context['stub_params'] = dict(params)
+
+    def _answer(self, model, context, **_kwargs) -> Tuple[AWSResponse, Dict[str, Any]]:
+        operation = f'{model.service_model.endpoint_prefix}.{model.name}'
+        answer = self._answers.get(operation)
+        if answer is None:
+            raise NotImplementedError(f'{operation} is not stubbed')
+        if self.latency:
+            time.sleep(self.latency)
+        return AWSResponse('https://stub', 200, {}, None), answer(context['stub_params'])
+
+    def _describe_parameters(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        names = self.names
+        for parameter_filter in params.get('ParameterFilters', []):
+            value = parameter_filter['Values'][0]
+            if parameter_filter['Option'] == 'Contains':
+                names = [name for name in names if value in name]
+            else:
+                # BeginsWith, and the Path filters
+                names = [name for name in names if name.startswith(value)]
+        page, next_token = _page(names, params)
+        response: Dict[str, Any] = {
+            'Parameters': [{'Name': name, 'Version': 1} for name in page],
+        }
+        if next_token:
+            response['NextToken'] = next_token
+        return response
+
+    def _get_parameter(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {'Parameter': {'Name': params['Name'], 'Value': self.values[params['Name']]}}
+
+    def _get_parameters(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'Parameters': [
+                {'Name': name, 'Value': self.values[name]}
+                for name in params['Names'] if name in self.values
+            ],
+            'InvalidParameters': [name for name in params['Names'] if name not in self.values],
+        }
+
+    def _list_secrets(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        names = self.names
+        for secret_filter in params.get('Filters', []):
+            names = [name for name in names if name.startswith(secret_filter['Values'][0])]
+        page, next_token = _page(names, params)
+        response: Dict[str, Any] = {'SecretList': [{'Name': name} for name in page]}
+        if next_token:
+            response['NextToken'] = next_token
+        return response
+
+    def _secret_value(self, name: str) -> Dict[str, Any]:
+        return {'Name': name, 'SecretString': json.dumps({name: self.values[name]})}
+
+    def _get_secret_value(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self._secret_value(params['SecretId'])
+
+    def _batch_get_secret_value(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'SecretValues': [
+                self._secret_value(name)
+                for name in params['SecretIdList'] if name in self.values
+            ],
+            'Errors': [],
+        }
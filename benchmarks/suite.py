@@ -0,0 +1,226 @@
+"""
+The benchmark suite: listings, search keystrokes, menu renders and startup, on an in-memory fake
+backend and on the AWS backends with stubbed clients. The menus are driven through prompt_toolkit's
+pipe input.
+
+The median of each benchmark is compared to the stored baseline, measured on the same machine: the
+suite fails when one is slower than the baseline by more than the tolerance.
+
+    python benchmarks/suite.py                  # Compares to benchmarks/baseline.json
+    python benchmarks/suite.py --save-baseline  # After a change that is meant to be slower / faster
+    python benchmarks/suite.py -k listing       # Only the benchmarks whose name contains `listing`
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+from password_organizer.backends.aws_secrets_manager_backend import AWSSecretsManagerBackend
+from password_organizer.backends.aws_ssm_backend import AWSSSMBackend
+from password_organizer.backends.local_file_backend import LocalFileBackend
+from password_organizer.cli_menu.choice import Choice
+from password_organizer.menu import go_back, list_choice_menu, UserExit
+
+from fake_backend import FakeBackend, key_names
+from stubbed_aws import StubbedAWS
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.3
+""" Relative slowdown above which a benchmark is reported as a regression """
+NOISE_FLOOR_MS = 1.0
+""" Slowdowns smaller than this are noise, whatever their ratio """
+KEY_COUNT = 5000
+VAULT_KEY_COUNT = 200000
+
+Benchmark = Callable[[], float]
+""" Runs the benchmark once, returns the seconds measured """
+
+
+def drive(keys: str, run: Callable[[], object]) -> float:
+    """ Seconds taken by `run`, its menus being answered by `keys`, typed ahead """
+    with create_pipe_input() as pipe_input:
+        pipe_input.send_text(keys)
+        with create_app_session(input=pipe_input, output=DummyOutput()):
+            start = time.perf_counter()
+            try:
+                run()
+            except UserExit:
+                pass
+            return time.perf_counter() - start
+
+
+def timed(run: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def walk_listing(backend) -> None:
+    for _ in backend.iter_password_keys_pages():
+        pass
+
+
+def aws_backend(backend_class, stub: StubbedAWS):
+    backend = backend_class(region='eu-west-1', client_pool=stub.client_pool(), prefetch=True)
+    backend.initialize()
+    return backend
+
+
+def startup(backend_class, stub: StubbedAWS) -> None:
+    """ What happens before the main menu shows up (see `backend_menu`), without the UI """
+    backend = aws_backend(backend_class, stub)
+    backend.start_speculative_listing()
+    backend.load_title_details()
+    backend._take_speculative_listing()     # pylint:disable=protected-access
+
+
+def local_backend(directory: str) -> LocalFileBackend:
+    """ A vault of VAULT_KEY_COUNT passwords, the last 1% written after its index """
+    backend = LocalFileBackend(
+        vault_path=os.path.join(directory, 'vault.pov'), passphrase='benchmark', scrypt_n=16,
+    )
+    backend.initialize()
+    keys = key_names(VAULT_KEY_COUNT)
+    indexed = VAULT_KEY_COUNT * 99 // 100
+    backend.vault.put_many((key, f'value of {key}') for key in keys[:indexed])
+    backend.vault.compact()
+    backend.vault.put_many((key, f'value of {key}') for key in keys[indexed:])
+    return backend
+
+
+def benchmarks(directory: str) -> Dict[str, Benchmark]:
+    choices = [Choice.from_string(key) for key in key_names(KEY_COUNT)]
+    stub = StubbedAWS(KEY_COUNT)
+    search = 'password-1234'
+    vault_keys = key_names(VAULT_KEY_COUNT)[::1000]
+    local: List[LocalFileBackend] = []
+
+    def with_local(run: Callable[[LocalFileBackend], object]) -> float:
+        # Built on first use only: takes a few seconds
+        if not local:
+            local.append(local_backend(directory))
+        return timed(lambda: run(local[0]))
+
+    def list_menu(keys: str) -> float:
+        return drive(keys, lambda: list_choice_menu(choices, 'Which password?', back=go_back))
+
+    return {
+        'listing fake backend': lambda: timed(
+            lambda: walk_listing(FakeBackend(KEY_COUNT))
+        ),
+        'listing fake backend, 1ms latency': lambda: timed(
+            lambda: walk_listing(FakeBackend(1000, latency=0.001))
+        ),
+        'listing stubbed ssm': lambda: timed(
+            lambda: walk_listing(aws_backend(AWSSSMBackend, stub))
+        ),
+        'listing stubbed secretsmanager': lambda: timed(
+            lambda: walk_listing(aws_backend(AWSSecretsManagerBackend, stub))
+        ),
+        'menu render': lambda: list_menu('\r'),
+        'search keystrokes': lambda: list_menu(search + '\r'),
+        'startup stubbed ssm': lambda: timed(lambda: startup(AWSSSMBackend, stub)),
+        'startup stubbed secretsmanager': lambda: timed(
+            lambda: startup(AWSSecretsManagerBackend, stub)
+        ),
+        'local vault get 200 passwords': lambda: with_local(
+            lambda backend: [backend.retrieve_password(key) for key in vault_keys]
+        ),
+        'local vault prefix search': lambda: with_local(
+            lambda backend: list(backend.search_password_keys(vault_keys[100][:-2]))
+        ),
+        # List passwords, search a key of the first page, then quit from its menu
+        'session fake backend': lambda: drive(
+            '\rpassword-12\r\x03',
+            FakeBackend(KEY_COUNT, prefetch=True).main_menu,
+        ),
+    }
+
+
+def run(selected: Dict[str, Benchmark], repeat: int) -> Dict[str, float]:
+    """ The median milliseconds of each benchmark """
+    results = {}
+    for name, benchmark in selected.items():
+        # Warm up: imports, caches
+        benchmark()
+        durations = [benchmark() for _ in range(repeat)]
+        results[name] = statistics.median(durations) * 1000
+    return results
+
+
+def compare(
+    results: Dict[str, float],
+    baseline: Dict[str, float],
+    tolerance: float,
+) -> List[Tuple[str, float, Optional[float], str]]:
+    """ (name, milliseconds, baseline milliseconds, verdict) of each benchmark """
+    rows = []
+    for name, milliseconds in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            verdict = 'new'
+        elif (
+            milliseconds > reference * (1 + tolerance)
+            and milliseconds - reference > NOISE_FLOOR_MS
+        ):
+            verdict = 'REGRESSION'
+        elif milliseconds < reference / (1 + tolerance):
+            verdict = 'faster'
+        else:
+            verdict = 'ok'
+        rows.append((name, milliseconds, reference, verdict))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('-k', dest='filter', default='', help='Only run the matching benchmarks')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        selected = {
+            name: benchmark
+            for name, benchmark in benchmarks(directory).items()
+            if args.filter in name
+        }
+        results = run(selected, args.repeat)
+
+    baseline: Dict[str, float] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as fp:
+            baseline = json.load(fp)
+
+    rows = compare(results, baseline, args.tolerance)
+    print(f'{"benchmark":36} {"median ms":>10} {"baseline":>10}')
+    for name, milliseconds, reference, verdict in rows:
+        reference_text = f'{reference:10.2f}' if reference is not None else f'{"-":>10}'
+        print(f'{name:36} {milliseconds:10.2f} {reference_text} {verdict}')
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as fp:
+            json.dump(baseline, fp, indent=2, sort_keys=True)
+            fp.write('\n')
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+
+    return 1 if any(verdict == 'REGRESSION' for *_, verdict in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
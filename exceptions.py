@@ -6,6 +6,9 @@ class ExitCode(Enum):
     CANNOT_FIND_BACKEND = 100
     MISSING_AUTHENTICATION = 101
     INIT_FAILED = 102
+    PARTIAL_FAILURE = 103
+    INVALID_INPUT = 104
+    BACKEND_FAILURE = 105
 
 
 class InterruptProgramException(Exception, ABC):
@@ -44,3 +47,31 @@ class InitializationFailure(InterruptProgramException):
     @property
     def display_message(self) -> str:
         return "Could not complete the backend initialization procedure"
+
+
+class WrongPassphrase(InterruptProgramException):
+    """ The passphrase given cannot decrypt the local vault """
+
+    @property
+    def exit_code(self) -> ExitCode:
+        return ExitCode.MISSING_AUTHENTICATION
+
+    @property
+    def display_message(self) -> str:
+        return "Could not open the vault: wrong passphrase"
+
+
+class InvalidVault(InterruptProgramException):
+    """ The local vault file is not a vault, or is damaged """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+    @property
+    def exit_code(self) -> ExitCode:
+        return ExitCode.INIT_FAILED
+
+    @property
+    def display_message(self) -> str:
+        return f"Could not open the vault: {self.reason}"
@@ -1,4 +1,4 @@
 from .base import Backend
 
-from .aws_secrets_manager_backend import AWSSecretsManagerBackend
-from .aws_ssm_backend import AWSSSMBackend
+# The backend implementations are not imported here: they pull their SDK (boto3...), which is only
+# loaded once a backend is chosen. See `BACKENDS` in password_organizer.py
@@ -0,0 +1,117 @@
+from abc import ABC, abstractmethod
+import asyncio
+from concurrent.futures import Executor, Future
+from functools import partial
+from typing import Any, Callable, List, Optional, TYPE_CHECKING, TypeVar
+
+from .batch import BatchRetrieval
+from .prefetch import run_in_background
+
+if TYPE_CHECKING:
+    from .base import Backend, ListType
+
+
+T = TypeVar('T')
+
+
+class DaemonThreadExecutor(Executor):
+    """
+    Runs each call in a daemon thread of its own (see `run_in_background`)
+
+    A call interrupted by the user is left running in the background: it must never delay the exit
+    of the program, like the threads of a `ThreadPoolExecutor` would.
+    """
+
+    def submit(self, fn, *args, **kwargs) -> 'Future':    # type:ignore  # Python 3.8 signature
+        return run_in_background(partial(fn, *args, **kwargs))
+
+
+class AsyncBackend(ABC):
+    """
+    The asyncio interface of a backend: its password operations, as coroutines that the menus
+    await on their event loop (see `menu.wait_menu`), and that can run concurrently
+
+    Get the one of a backend with `Backend.as_async`
+    """
+
+    @abstractmethod
+    async def list_password_keys(self) -> 'ListType':
+        """ See `Backend.list_password_keys` """
+
+    @abstractmethod
+    async def list_next_page(self, next_page_method: Callable[[], 'ListType']) -> 'ListType':
+        """ Calls a next page method returned by `list_password_keys` """
+
+    @abstractmethod
+    async def retrieve_password(self, key: str) -> str:
+        """ See `Backend.retrieve_password` """
+
+    @abstractmethod
+    async def retrieve_passwords(self, keys: List[str]) -> BatchRetrieval:
+        """ See `Backend.retrieve_passwords` """
+
+    @abstractmethod
+    async def create_password(self, password_key: str, password_value: str) -> None:
+        """ See `Backend.create_password` """
+
+    @abstractmethod
+    async def update_password(self, key: str, password_value: str) -> None:
+        """ See `Backend.update_password` """
+
+    @abstractmethod
+    async def delete_password(self, password_key: str) -> None:
+        """ See `Backend.delete_password` """
+
+    @abstractmethod
+    async def load_title_details(self) -> None:
+        """ See `Backend.load_title_details` """
+
+    @abstractmethod
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """ Calls some other blocking method of the backend, e.g. an operation of its own """
+
+
+class ExecutorAdapter(AsyncBackend):
+    """
+    The `AsyncBackend` of a synchronous backend: its methods are called in `executor`, so that they
+    do not block the event loop
+
+    Parameters
+    ==========
+    backend: Backend
+        The backend adapted
+    executor: Executor
+        Defaults to a `DaemonThreadExecutor`
+    """
+
+    def __init__(self, backend: 'Backend', executor: Optional[Executor] = None):
+        self.backend = backend
+        self.executor = executor or DaemonThreadExecutor()
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """ Calls `func` in the executor, and waits for its result without blocking the loop """
+        return await asyncio.get_event_loop().run_in_executor(self.executor, partial(func, *args))
+
+    async def list_password_keys(self) -> 'ListType':
+        return await self.run(self.backend.list_password_keys)
+
+    async def list_next_page(self, next_page_method: Callable[[], 'ListType']) -> 'ListType':
+        return await self.run(next_page_method)
+
+    async def retrieve_password(self, key: str) -> str:
+        return await self.run(self.backend.retrieve_password, key)
+
+    async def retrieve_passwords(self, keys: List[str]) -> BatchRetrieval:
+        return await self.run(self.backend.retrieve_passwords, keys)
+
+    async def create_password(self, password_key: str, password_value: str) -> None:
+        await self.run(self.backend.create_password, password_key, password_value)
+
+    async def update_password(self, key: str, password_value: str) -> None:
+        await self.run(self.backend.update_password, key, password_value)
+
+    async def delete_password(self, password_key: str) -> None:
+        await self.run(self.backend.delete_password, password_key)
+
+    async def load_title_details(self) -> None:
+        await self.run(self.backend.load_title_details)
@@ -0,0 +1,217 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+import botocore.config
+
+from .rate_limit import RateControllers
+from ..tracing import current_tracer
+
+
+DEFAULT_MAX_POOL_CONNECTIONS = 32
+""" HTTPS connections kept open per client. Above the number of workers of the batch operations """
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_MAX_ATTEMPTS = 5
+
+THROTTLING_ERROR_CODES = frozenset([
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'LimitExceededException',
+    'RequestThrottled',
+    'SlowDown',
+])
+""" The error codes of the AWS APIs that mean the call was throttled """
+
+
+class AWSClientPool:
+    """
+    The boto3 clients of the AWS backends, one per (service, region), on one shared session
+
+    Clients are thread safe and keep their HTTPS connections open: reusing them saves the TLS
+    handshakes and the credentials resolution when switching back to a region, or when batch
+    operations run concurrently. The session is only used to create clients, under a lock, as
+    boto3 sessions are not thread safe.
+
+    The calls of all the clients are paced by `rate_controllers`, one controller per (service,
+    region, operation), that slow down when the API throttles them (see `control_client_rate`).
+    Every call goes through them: menus, batch retrievals, imports, exports, region searches.
+
+    Parameters
+    ==========
+    max_pool_connections: int
+        Maximum number of HTTPS connections each client keeps open
+    connect_timeout: float
+        Seconds to wait for a connection to be established
+    read_timeout: float
+        Seconds to wait for a response
+    max_attempts: int
+        Attempts per call, with the `standard` retry mode: retries back off exponentially, with
+        jitter
+    """
+
+    def __init__(
+        self,
+        session: Optional[boto3.session.Session] = None,
+        max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        self.session = session or boto3.session.Session()
+        self.config = botocore.config.Config(
+            max_pool_connections=max_pool_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries={'mode': 'standard', 'max_attempts': max_attempts},
+        )
+        self._options: Dict[str, Any] = {
+            'max_pool_connections': max_pool_connections,
+            'connect_timeout': connect_timeout,
+            'read_timeout': read_timeout,
+            'max_attempts': max_attempts,
+        }
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+        self._derived_pools: Dict[Tuple, 'AWSClientPool'] = {}
+        self.rate_controllers = RateControllers()
+
+    def derive(self, **options: Any) -> 'AWSClientPool':
+        """
+        A pool on the same session, whose clients have some other options (see `__init__`), e.g.
+        shorter timeouts. Kept, so that its clients are reused too
+        """
+        options = dict(self._options, **options)
+        key = tuple(sorted(options.items()))
+        with self._lock:
+            pool = self._derived_pools.get(key)
+            if pool is None:
+                pool = AWSClientPool(self.session, **options)
+                # Both pools create their clients from the same session, against the same limits
+                pool._lock = self._lock     # pylint:disable=protected-access
+                pool.rate_controllers = self.rate_controllers
+                self._derived_pools[key] = pool
+            return pool
+
+    def client(self, service: str, region: str) -> Any:
+        """ The client of `service` in `region`, created on first use """
+        with self._lock:
+            client = self._clients.get((service, region))
+            if client is None:
+                client = self.session.client(service, region_name=region, config=self.config)
+                control_client_rate(client, self.rate_controllers)
+                if current_tracer() is not None:
+                    trace_client(client)
+                self._clients[(service, region)] = client
+            return client
+
+    def get_credentials(self) -> Any:
+        with self._lock:
+            return self.session.get_credentials()
+
+
+def control_client_rate(client: Any, rate_controllers: RateControllers) -> None:
+    """
+    Paces each attempt of the calls of `client` with the controller of its operation, and tells
+    the controller whether the attempt was throttled
+    """
+    region = client.meta.region_name
+
+    def controller(event_name: str):
+        # `before-send.ssm.PutParameter` -> ('ssm', region, 'PutParameter')
+        _, service, operation = event_name.split('.', 2)
+        return rate_controllers.controller(service, region, operation)
+
+    def before_send(request, event_name, **_kwargs):
+        request.context['rate_control_call_time'] = controller(event_name).acquire()
+
+    def response_received(context, event_name, parsed_response, **_kwargs):
+        call_time = context.pop('rate_control_call_time', None)
+        if call_time is None:
+            return
+        error_code = (parsed_response or {}).get('Error', {}).get('Code')
+        if error_code in THROTTLING_ERROR_CODES:
+            controller(event_name).on_throttle(call_time)
+        elif error_code is None:
+            controller(event_name).on_success()
+
+    events = client.meta.events
+    # Before the handlers that answer without sending anything (e.g. moto's): they are paced too
+    events.register_first('before-send.*.*', before_send)
+    events.register('response-received.*.*', response_received)
+
+
+def trace_client(client: Any) -> None:
+    """
+    Records a span for each API call of `client`, and an event for each attempt that failed and
+    for each throttling, with botocore's event hooks (see `tracing`)
+    """
+    region = client.meta.region_name
+
+    def operation(event_name: str) -> str:
+        # `after-call.ssm.GetParameter` -> `ssm.GetParameter`
+        return event_name.split('.', 1)[1]
+
+    def before_call(context, **_kwargs):
+        tracer = current_tracer()
+        if tracer is not None:
+            context['trace'] = {'start': tracer.now(), 'attempts': 0, 'throttles': 0}
+
+    def response_received(context, event_name, exception, parsed_response, **_kwargs):
+        tracer = current_tracer()
+        trace = context.get('trace')
+        if tracer is None or trace is None:
+            return
+        trace['attempts'] += 1
+        error_code = (parsed_response or {}).get('Error', {}).get('Code')
+        if error_code in THROTTLING_ERROR_CODES:
+            trace['throttles'] += 1
+            tracer.instant('throttle', 'aws', operation=operation(event_name), code=error_code)
+        elif exception is not None or error_code is not None:
+            tracer.instant(
+                'failed attempt', 'aws', operation=operation(event_name),
+                error=error_code or type(exception).__name__,
+            )
+
+    def after_call(context, event_name, http_response=None, exception=None, **_kwargs):
+        tracer = current_tracer()
+        trace = context.pop('trace', None)
+        if tracer is None or trace is None:
+            return
+        args = {'region': region, 'attempts': trace['attempts'], 'throttles': trace['throttles']}
+        if http_response is not None:
+            args['status'] = http_response.status_code
+        if exception is not None:
+            args['error'] = type(exception).__name__
+        tracer.complete(operation(event_name), 'aws', trace['start'], **args)
+
+    events = client.meta.events
+    events.register('before-call.*.*', before_call)
+    events.register('response-received.*.*', response_received)
+    events.register('after-call.*.*', after_call)
+    events.register('after-call-error.*.*', after_call)
+
+
+_default_client_pool: Optional[AWSClientPool] = None
+_default_client_pool_lock = threading.Lock()
+
+
+def default_client_pool() -> AWSClientPool:
+    """ The pool shared by all the AWS backends of the program """
+    global _default_client_pool     # pylint:disable=global-statement
+    with _default_client_pool_lock:
+        if _default_client_pool is None:
+            _default_client_pool = AWSClientPool()
+        return _default_client_pool
+
+
+def reset_default_client_pool() -> None:
+    """ Forgets the shared clients, e.g. after the credentials changed """
+    global _default_client_pool     # pylint:disable=global-statement
+    with _default_client_pool_lock:
+        _default_client_pool = None
@@ -0,0 +1,108 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from .listing_cache import app_cache_directory, write_private_json
+
+
+IDENTITY_CACHE_FORMAT_VERSION = 1
+
+DEFAULT_IDENTITY_CACHE_TTL = 24 * 3600
+""" Seconds during which the account ID and alias of a set of credentials are cached """
+
+
+@dataclass
+class AccountIdentity:
+    """ The AWS account some credentials belong to """
+    account_id: Optional[str] = None
+    account_alias: Optional[str] = None
+    errors: Dict[str, str] = field(default_factory=dict)
+    """ Why `account_id` / `account_alias` could not be fetched, by field name. Never cached """
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.errors and self.account_id is not None
+
+
+def fetch_account_identity(sts_cli: Any, iam_cli: Any) -> AccountIdentity:
+    """ Calls STS `get_caller_identity` and IAM `list_account_aliases` concurrently """
+    def get_account_id() -> str:
+        return sts_cli.get_caller_identity()['Account']
+
+    def get_account_alias() -> Optional[str]:
+        aliases = iam_cli.list_account_aliases()['AccountAliases']
+        return aliases[0] if aliases else None
+
+    identity = AccountIdentity()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures: Dict[str, 'Future[Any]'] = {
+            'account_id': executor.submit(get_account_id),
+            'account_alias': executor.submit(get_account_alias),
+        }
+        for name, future in futures.items():
+            try:
+                setattr(identity, name, future.result())
+            except Exception as e:      # pylint:disable=broad-except
+                # Displayed in the title instead. Missing permissions on IAM are common
+                identity.errors[name] = str(e)
+    return identity
+
+
+class AccountIdentityCache:
+    """
+    On-disk cache of the `AccountIdentity` of some credentials
+
+    The credentials are only identified by a hash of their access key ID and of the profile they
+    come from. Secrets are never stored.
+
+    Parameters
+    ==========
+    ttl: float
+        Seconds after which a cached identity is fetched again
+    directory: Optional[str]
+        Where to store the cache files. Defaults to `$XDG_CACHE_HOME/password-organizer/identities`
+    """
+
+    def __init__(
+        self,
+        access_key: str,
+        profile: Optional[str],
+        ttl: float,
+        directory: Optional[str] = None,
+    ):
+        self.ttl = ttl
+        directory = directory or os.path.join(app_cache_directory(), 'identities')
+        digest = hashlib.sha256(json.dumps([access_key, profile]).encode('utf-8')).hexdigest()
+        self.path = os.path.join(directory, f'{digest}.json')
+
+    def load(self) -> Optional[AccountIdentity]:
+        """ Returns the cached identity, or None if there is none, or if it is too old """
+        try:
+            with open(self.path, encoding='utf-8') as fp:
+                content = json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+        if (
+            not isinstance(content, dict)
+            or content.get('version') != IDENTITY_CACHE_FORMAT_VERSION
+            or time.time() - content.get('fetched_at', 0) >= self.ttl
+        ):
+            return None
+
+        return AccountIdentity(
+            account_id=content.get('account_id'),
+            account_alias=content.get('account_alias'),
+        )
+
+    def save(self, identity: AccountIdentity) -> None:
+        write_private_json(self.path, {
+            'version': IDENTITY_CACHE_FORMAT_VERSION,
+            'fetched_at': time.time(),
+            'account_id': identity.account_id,
+            'account_alias': identity.account_alias,
+        })
@@ -1,55 +1,423 @@
-import boto3
+import botocore.exceptions
+from enum import Enum
+from functools import partial
+from html import escape
 import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import uuid
 
-from .base import ListType
+from .base import Backend, PasswordMetadata, Screen
+from .batch import BatchRetrieval, chunked, map_concurrently
 from .base_aws_backend import BaseAWSBackend
+from .memory_cache import ExpiringLRUCache
+from ..cli_menu.choice import Choice
+from ..menu import (
+    confirmation_menu, go_back, list_choice_menu, print_html, read_input, read_password, wait_menu,
+)
+
+
+BROWSE_FIELDS = 'Browse the fields of the secret'
+
+DEFAULT_SECRET_CACHE_SIZE = 256
+""" Number of parsed secrets kept in memory """
+DEFAULT_SECRET_CACHE_TTL = 300
+""" Seconds during which a parsed secret is served from memory """
+
+
+class FieldsWouldBeLost(ValueError):
+    """ A password update would replace the fields of a key/value secret with a single value """
+
+
+class FieldAction(Enum):
+    ADD = 'Add a field'
+    RETRIEVE = 'Retrieve field value'
+    UPDATE = 'Update field value'
+    DELETE = 'Delete field'
+
+
+def field_text(value: Any) -> str:
+    """ The value of a field, as displayed. The fields that are not strings are shown as JSON """
+    return value if isinstance(value, str) else json.dumps(value)
 
 
 class AWSSecretsManagerBackend(BaseAWSBackend):
-    """ Uses AWS SSM Parameter Store as a backend to store passwords """
+    """
+    Uses AWS Secrets Manager as a backend to store passwords
+
+    Secrets are JSON objects. The password of a secret is its field named after the secret. Secrets
+    with other fields (key/value secrets) can be browsed field by field, and their password is the
+    whole JSON object.
+
+    Each secret is fetched and parsed once, then its fields are served from memory, for up to
+    `secret_cache_ttl` seconds. Updates read the secret again, merge the fields changed into it, and
+    write it back in one call.
+
+    Parameters
+    ==========
+    secret_cache_size: int
+        Number of parsed secrets kept in memory, the least recently used ones are dropped first
+    secret_cache_ttl: float
+        Seconds after which a secret is fetched again
+    """
+
+    PREFETCH_BY_DEFAULT = True
+    PREFETCH_PAGE_SIZE = 100
+    """ Maximum page size allowed by `list_secrets`, used when prefetching """
+    BATCH_GET_MAX_SECRETS = 20
+    """ Maximum number of secrets that `batch_get_secret_value` can fetch at once """
+    # Default account quota of CreateSecret and UpdateSecret. Reads are allowed 10000/s
+    WRITE_RATE_LIMIT = 50
 
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        secret_cache_size: int = DEFAULT_SECRET_CACHE_SIZE,
+        secret_cache_ttl: float = DEFAULT_SECRET_CACHE_TTL,
+        **kwargs
+    ):
         # TODO - gbataille: support secrets description
         # TODO - gbataille: support secrets tagging
-        # TODO - gbataille: support key/value as secret
         super().__init__(*args, **kwargs)
-        self.secrets_cli = None
+        self.secrets_cli: Any = None
+        self._secret_cache_size = secret_cache_size
+        self._secret_cache_ttl = secret_cache_ttl
+        # By (region, secret name)
+        self._secret_cache: ExpiringLRUCache[Tuple[str, str], Dict[str, Any]] = ExpiringLRUCache(
+            secret_cache_size, secret_cache_ttl,
+        )
+
+    def _copy_options(self) -> Dict[str, Any]:
+        return {
+            **super()._copy_options(),
+            'secret_cache_size': self._secret_cache_size,
+            'secret_cache_ttl': self._secret_cache_ttl,
+        }
 
     def _setup_aws_clients(self) -> None:
-        self.secrets_cli = boto3.client('secretsmanager', region_name=self.region)
+        self.secrets_cli = self.client_pool.client('secretsmanager', self.region)
 
     def backend_description(self) -> str:
         return f"""
 AWS Secrets Manager backend
 
 Passwords are stored in Secrets Manager, in region {self.region}
-Only simple string password are supported so far
+The fields of key/value secrets can be browsed from the menu of the secret
 """
 
-    def list_password_keys(self) -> ListType:
-        # FIXME: check if it's paginated
-        resp = self.secrets_cli.list_secrets()
+    def _describe_passwords(
+        self,
+        next_token: Optional[str],
+        page_size: int,
+    ) -> Tuple[List[PasswordMetadata], Optional[str]]:
+        kwargs: Dict[str, Any] = {
+            'MaxResults': page_size,
+        }
+        if next_token:
+            kwargs['NextToken'] = next_token
+
+        resp = self.secrets_cli.list_secrets(**kwargs)
         passwords = []
         for param in resp.get('SecretList', []):
-            passwords.append(param.get('Name'))
-        return passwords, None
+            current_versions = [
+                version_id
+                for version_id, stages in param.get('SecretVersionsToStages', {}).items()
+                if 'AWSCURRENT' in stages
+            ]
+            passwords.append(PasswordMetadata(
+                key=param.get('Name'),
+                last_modified=param.get('LastChangedDate'),
+                version=current_versions[0] if current_versions else None,
+                description=param.get('Description'),
+            ))
+
+        return passwords, resp.get('NextToken', None)
+
+    def search_password_keys(self, search_string: str) -> Iterator[List[str]]:
+        """
+        Searched with the `name` filter of `list_secrets`, which matches the beginning of the names
+        """
+        # A leading `!` would negate the filter
+        search_string = search_string.lstrip('!')
+        if not search_string:
+            return
+        kwargs: Dict[str, Any] = {
+            'MaxResults': self.PREFETCH_PAGE_SIZE,
+            'Filters': [{'Key': 'name', 'Values': [search_string]}],
+        }
+        while True:
+            resp = self.secrets_cli.list_secrets(**kwargs)
+            yield [secret['Name'] for secret in resp.get('SecretList', [])]
+            if not resp.get('NextToken'):
+                return
+            kwargs['NextToken'] = resp['NextToken']
 
     def retrieve_password(self, key: str) -> str:
-        resp = self.secrets_cli.get_secret_value(SecretId=key)
-        secret_json = resp.get('SecretString')
-        return json.loads(secret_json).get(key)
+        return self._password_value(key, self.retrieve_fields(key))
+
+    def retrieve_fields(self, key: str) -> Dict[str, Any]:
+        """
+        The fields of a secret, fetched and parsed once for all the lookups of the next
+        `secret_cache_ttl` seconds. Not to be modified: use `update_fields`
+
+        Raises
+        ======
+        ValueError
+            when the secret is not a JSON object
+        """
+        fields = self._secret_cache.get((self.region, key))
+        if fields is None:
+            resp = self.secrets_cli.get_secret_value(SecretId=key)
+            fields = self._parse_fields(resp.get('SecretString'))
+            self._secret_cache.put((self.region, key), fields)
+        return fields
+
+    @staticmethod
+    def _parse_fields(secret_json: Optional[str]) -> Dict[str, Any]:
+        if secret_json is None:
+            raise ValueError('Not a key/value secret')
+        fields = json.loads(secret_json)
+        if not isinstance(fields, dict):
+            raise ValueError('Not a key/value secret')
+        return fields
+
+    @staticmethod
+    def _password_value(key: str, fields: Dict[str, Any]) -> str:
+        if key in fields:
+            return field_text(fields[key])
+        # A key/value secret
+        return json.dumps(fields)
+
+    def retrieve_passwords(self, keys: List[str]) -> BatchRetrieval:
+        result = BatchRetrieval()
+        keys_to_fetch = []
+        for key in keys:
+            fields = self._secret_cache.get((self.region, key))
+            if fields is None:
+                keys_to_fetch.append(key)
+            else:
+                result.values[key] = self._password_value(key, fields)
+
+        for chunk_result in map_concurrently(
+            self._retrieve_passwords_chunk,
+            chunked(keys_to_fetch, self.BATCH_GET_MAX_SECRETS),
+        ):
+            result.merge(chunk_result)
+        return result
+
+    def _retrieve_passwords_chunk(self, keys: Sequence[str]) -> BatchRetrieval:
+        result = BatchRetrieval()
+        kwargs: Dict[str, Any] = {'SecretIdList': list(keys)}
+        while True:
+            try:
+                resp = self.secrets_cli.batch_get_secret_value(**kwargs)
+            except botocore.exceptions.ClientError:
+                # Retrieving them one by one tells which one(s) failed, without failing the others
+                return Backend.retrieve_passwords(self, list(keys))
+
+            for secret in resp.get('SecretValues', []):
+                key = secret['Name']
+                try:
+                    fields = self._parse_fields(secret.get('SecretString'))
+                except ValueError:
+                    result.errors[key] = 'Not a password secret'
+                    continue
+                self._secret_cache.put((self.region, key), fields)
+                result.values[key] = self._password_value(key, fields)
+            for error in resp.get('Errors', []):
+                result.errors[error.get('SecretId')] = error.get('Message', error.get('ErrorCode'))
+
+            if not resp.get('NextToken'):
+                return result
+            kwargs['NextToken'] = resp['NextToken']
 
     def create_password(self, password_key: str, password_value: str) -> None:
+        fields = {password_key: password_value}
         self.secrets_cli.create_secret(
             Name=password_key,
-            SecretString=json.dumps({password_key: password_value})
+            SecretString=json.dumps(fields)
         )
+        self._secret_cache.put((self.region, password_key), fields)
 
     def update_password(self, key: str, password_value: str) -> None:
+        """
+        Sets the field named after the secret, keeping the other fields, when the secret has one.
+        Otherwise the value is the whole secret, as `retrieve_password` returns it: a JSON object
+        replaces the secret as-is, any other value is stored as the field named after the secret
+
+        Raises
+        ======
+        FieldsWouldBeLost
+            when the secret has other fields and the value is not a JSON object: they would all be
+            replaced by the value. Change one field with `update_fields` instead
+        """
+        fields = self._fetch_fields(key)
+        if fields is not None and key in fields:
+            fields[key] = password_value
+            self._write_fields(key, fields)
+            return
+
+        try:
+            document = json.loads(password_value)
+        except ValueError:
+            document = None
+        if isinstance(document, dict):
+            self._write_fields(key, document)
+        elif fields:
+            raise FieldsWouldBeLost(
+                f'{key} has the fields {", ".join(fields)}, which the new value would replace. '
+                f'Give all of them as a JSON object, or update one with "{BROWSE_FIELDS}"'
+            )
+        else:
+            self._write_fields(key, {key: password_value})
+
+    def update_fields(
+        self,
+        key: str,
+        updates: Dict[str, str],
+        removed: Sequence[str] = (),
+    ) -> None:
+        """
+        Sets the fields `updates`, removes the fields `removed`, and keeps the others, in one
+        `update_secret` call. The secret is read again first, not from the cache, so that the
+        fields changed by others in the meantime are kept
+
+        Raises
+        ======
+        ValueError
+            when the secret is not a JSON object
+        """
+        fields = self._fetch_fields(key)
+        if fields is None:
+            raise ValueError('Not a key/value secret')
+        fields.update(updates)
+        for field_name in removed:
+            fields.pop(field_name, None)
+        self._write_fields(key, fields)
+
+    def _fetch_fields(self, key: str) -> Optional[Dict[str, Any]]:
+        """ The fields of the secret, read from AWS. None when it is not a JSON object """
+        resp = self.secrets_cli.get_secret_value(SecretId=key)
+        try:
+            return self._parse_fields(resp.get('SecretString'))
+        except ValueError:
+            return None
+
+    def _write_fields(self, key: str, fields: Dict[str, Any]) -> None:
         self.secrets_cli.update_secret(
             SecretId=key,
-            SecretString=json.dumps({key: password_value})
+            SecretString=json.dumps(fields),
+            # A new version per write, that the retries of the call do not duplicate
+            ClientRequestToken=str(uuid.uuid4()),
         )
+        self._secret_cache.put((self.region, key), fields)
 
     def delete_password(self, password_key: str) -> None:
         self.secrets_cli.delete_secret(SecretId=password_key)
+        self._secret_cache.invalidate((self.region, password_key))
+
+    def _handle_update_password(self, password_key: str) -> Optional[Screen]:
+        try:
+            return super()._handle_update_password(password_key)
+        except FieldsWouldBeLost as e:
+            print_html(
+                f'\n<warning>Not updated:</warning> {escape(str(e))}\n',
+                {'warning': '#FF9D00 bold'},
+            )
+            return partial(self.password_menu, password_key)
+
+    def get_password_menu_actions(self) -> List[Choice[Any]]:
+        return super().get_password_menu_actions() + [Choice(BROWSE_FIELDS, BROWSE_FIELDS)]
+
+    def get_method_for_password_menu_action(self, menu_action: Any) -> Callable:
+        if menu_action == BROWSE_FIELDS:
+            return self._fields_menu
+        return super().get_method_for_password_menu_action(menu_action)
+
+    def _fields_menu(self, password_key: str) -> Optional[Screen]:
+        """ Lists the fields of a secret, without their values """
+        fields = wait_menu(
+            f'Retrieving {password_key}',
+            partial(self.as_async().run, self.retrieve_fields, password_key),
+        )
+        choices: List[Choice[Any]] = [Choice.from_string(field_name) for field_name in fields]
+        choices += [Choice.separator(), Choice(FieldAction.ADD.value, FieldAction.ADD)]
+        selection = list_choice_menu(
+            choices,
+            f'Which field of {password_key} do you want to work on?',
+            back=go_back,
+        )
+        if selection is None:
+            return partial(self.password_menu, password_key)
+        if selection is FieldAction.ADD:
+            return partial(self._handle_add_field, password_key)
+        return partial(self._field_menu, password_key, selection)
+
+    def _field_menu(self, password_key: str, field_name: str) -> Optional[Screen]:
+        action: Optional[FieldAction] = list_choice_menu(
+            [
+                Choice(action.value, action)
+                for action in (FieldAction.RETRIEVE, FieldAction.UPDATE, FieldAction.DELETE)
+            ],
+            f'What do you want to do with this field ({password_key} / {field_name})?',
+            back=go_back,
+        )
+        if action is FieldAction.RETRIEVE:
+            return partial(self._handle_retrieve_field, password_key, field_name)
+        if action is FieldAction.UPDATE:
+            return partial(self._handle_update_field, password_key, field_name)
+        if action is FieldAction.DELETE:
+            return partial(self._handle_delete_field, password_key, field_name)
+        return partial(self._fields_menu, password_key)
+
+    def _handle_retrieve_field(self, password_key: str, field_name: str) -> Optional[Screen]:
+        confirmation = confirmation_menu((
+            f'Are you sure you want to retrieve {field_name} of {password_key}? '
+            'Its value will be displayed in clear on the screen'
+        ))
+        if confirmation:
+            fields = wait_menu(
+                f'Retrieving {password_key}',
+                partial(self.as_async().run, self.retrieve_fields, password_key),
+            )
+            print_html(
+                f'\n<title>{escape(password_key)} / {escape(field_name)}:</title> '
+                f'{escape(field_text(fields.get(field_name)))}\n',
+                {
+                    'title': '#FF9D00 bold',
+                },
+            )
+        return partial(self._field_menu, password_key, field_name)
+
+    def _handle_update_field(self, password_key: str, field_name: str) -> Optional[Screen]:
+        value = read_password((
+            'Please enter the new value for the field.\n'
+            '  This will overwrite the old field value (which will be lost):'
+        ))
+        wait_menu(
+            f'Updating {password_key}',
+            partial(self.as_async().run, self.update_fields, password_key, {field_name: value}),
+        )
+        return partial(self._fields_menu, password_key)
+
+    def _handle_add_field(self, password_key: str) -> Optional[Screen]:
+        field_name = read_input('Please enter the name of the field:')
+        value = read_password('Please enter the value for the field:')
+        wait_menu(
+            f'Updating {password_key}',
+            partial(self.as_async().run, self.update_fields, password_key, {field_name: value}),
+        )
+        return partial(self._fields_menu, password_key)
+
+    def _handle_delete_field(self, password_key: str, field_name: str) -> Optional[Screen]:
+        confirmation = confirmation_menu((
+            f'Are you sure you want to delete {field_name} of {password_key}? '
+            'This operation cannot be undone'
+        ))
+        if not confirmation:
+            return partial(self._field_menu, password_key, field_name)
+
+        wait_menu(
+            f'Updating {password_key}',
+            partial(self.as_async().run, self.update_fields, password_key, {}, [field_name]),
+        )
+        return partial(self._fields_menu, password_key)
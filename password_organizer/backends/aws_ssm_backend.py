@@ -1,20 +1,43 @@
-import boto3
+import botocore.exceptions
 from functools import partial
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
-from .base import ListType
+from .base import Backend, PasswordMetadata, Screen
+from .batch import BatchRetrieval, chunked, map_concurrently
 from .base_aws_backend import BaseAWSBackend
+from .path_tree import FolderPath, parent_folder, PathTree, ROOT
+from ..cli_menu.choice import Choice
+from ..menu import go_back, list_choice_menu
+
+
+BROWSE_FOLDERS = 'Browse passwords by folder'
+LOAD_MORE_FOLDERS = 'Look for more subfolders'
 
 
 class AWSSSMBackend(BaseAWSBackend):
-    """ Uses AWS SSM Parameter Store as a backend to store passwords """
+    """
+    Uses AWS SSM Parameter Store as a backend to store passwords
+
+    Parameters named like paths (`/prod/db/password`) can be browsed by folder, see `path_tree`
+    """
+
+    PREFETCH_PAGE_SIZE = 50
+    """ Maximum page size allowed by `describe_parameters`, used when prefetching """
+    GET_PARAMETERS_MAX_NAMES = 10
+    """ Maximum number of parameters that `get_parameters` can fetch at once """
+    GET_PARAMETERS_BY_PATH_PAGE_SIZE = 10
+    """ Maximum page size allowed by `get_parameters_by_path` """
+    # Default account quotas, with the standard parameters throughput
+    READ_RATE_LIMIT = 40
+    WRITE_RATE_LIMIT = 3
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.ssm_cli = None
+        self._path_tree: Optional[Tuple[str, PathTree]] = None
 
     def _setup_aws_clients(self) -> None:
-        self.ssm_cli = boto3.client("ssm", region_name=self.region)
+        self.ssm_cli = self.client_pool.client("ssm", self.region)
 
     def backend_description(self) -> str:
         return f"""
@@ -24,12 +47,13 @@ Passwords are stored in SSM, in region {self.region}, as encrypted string parame
 using default KMS encryption keys
 """
 
-    def list_password_keys(self) -> ListType:
-        return self._get_passwords()
-
-    def _get_passwords(self, next_token: Optional[str] = None) -> ListType:
+    def _describe_passwords(
+        self,
+        next_token: Optional[str],
+        page_size: int,
+    ) -> Tuple[List[PasswordMetadata], Optional[str]]:
         kwargs: Dict[str, Any] = {
-            "MaxResults": 10,
+            "MaxResults": page_size,
         }
         if next_token:
             kwargs["NextToken"] = next_token
@@ -37,21 +61,151 @@ using default KMS encryption keys
         resp = self.ssm_cli.describe_parameters(**kwargs)
         passwords = []
         for param in resp.get("Parameters", []):
-            passwords.append(param.get("Name"))
-
-        next_method = None
-        next_token = resp.get("NextToken", None)
-        if next_token:
-            next_method = partial(self._get_passwords, next_token=next_token)
-
-        return passwords, next_method
+            version = param.get("Version")
+            passwords.append(PasswordMetadata(
+                key=param.get("Name"),
+                last_modified=param.get("LastModifiedDate"),
+                version=str(version) if version is not None else None,
+                description=param.get("Description"),
+            ))
+
+        return passwords, resp.get("NextToken", None)
+
+    def search_password_keys(self, search_string: str) -> Iterator[List[str]]:
+        """
+        Searched with a `Name` filter of `describe_parameters`: the parameters starting with the
+        search when it is a path (`/prod/d`), the ones containing it otherwise. Case sensitive
+        """
+        option = "BeginsWith" if search_string.startswith("/") else "Contains"
+        kwargs: Dict[str, Any] = {
+            "MaxResults": self.PREFETCH_PAGE_SIZE,
+            "ParameterFilters": [{"Key": "Name", "Option": option, "Values": [search_string]}],
+        }
+        while True:
+            resp = self.ssm_cli.describe_parameters(**kwargs)
+            yield [param["Name"] for param in resp.get("Parameters", [])]
+            if not resp.get("NextToken"):
+                return
+            kwargs["NextToken"] = resp["NextToken"]
+
+    @property
+    def path_tree(self) -> PathTree:
+        """ The parameters of the region as a tree of folders, loaded as they are browsed """
+        if self._path_tree is None or self._path_tree[0] != self.region:
+            self._path_tree = (self.region, PathTree(
+                partial(self._iter_folder_keys_pages, self.ssm_cli),
+                partial(self._iter_subtree_keys_pages, self.ssm_cli),
+            ))
+        return self._path_tree[1]
+
+    def _iter_folder_keys_pages(self, ssm_cli: Any, path: str) -> Iterator[List[str]]:
+        """ The parameters of a folder, not those of its subfolders """
+        kwargs: Dict[str, Any] = {
+            "Path": path.rstrip("/") or ROOT,
+            "Recursive": False,
+            "MaxResults": self.GET_PARAMETERS_BY_PATH_PAGE_SIZE,
+        }
+        while True:
+            resp = ssm_cli.get_parameters_by_path(**kwargs)
+            yield [param["Name"] for param in resp.get("Parameters", [])]
+            if not resp.get("NextToken"):
+                return
+            kwargs["NextToken"] = resp["NextToken"]
+
+    def _iter_subtree_keys_pages(self, ssm_cli: Any, path: str) -> Iterator[List[str]]:
+        """
+        The parameters of a folder and of all its subfolders. The path tree only fetches the first
+        pages of it, and the next ones when the user asks for more subfolders
+
+        Listed with `describe_parameters`, which does not return the values, 5 times more
+        parameters per page than `get_parameters_by_path`
+        """
+        kwargs: Dict[str, Any] = {
+            "MaxResults": self.PREFETCH_PAGE_SIZE,
+            "ParameterFilters": [
+                {"Key": "Path", "Option": "Recursive", "Values": [path.rstrip("/") or ROOT]},
+            ],
+        }
+        while True:
+            resp = ssm_cli.describe_parameters(**kwargs)
+            yield [param["Name"] for param in resp.get("Parameters", [])]
+            if not resp.get("NextToken"):
+                return
+            kwargs["NextToken"] = resp["NextToken"]
+
+    def get_root_menu_actions(self) -> List[Choice[Any]]:
+        return super().get_root_menu_actions() + [Choice(BROWSE_FOLDERS, BROWSE_FOLDERS)]
+
+    def get_method_for_root_menu_action(self, menu_action: Any) -> Callable:
+        if menu_action == BROWSE_FOLDERS:
+            return partial(self._folder_menu, FolderPath(ROOT))
+        return super().get_method_for_root_menu_action(menu_action)
+
+    def _folder_menu(self, path: str) -> Optional[Screen]:
+        """
+        Displays the subfolders and the passwords of a folder, as they are loaded
+
+        Only the folders browsed are listed, and they are listed once (see `PathTree`). Until the
+        listing of a folder is complete, the user can ask for more of its subfolders
+        """
+        path_tree = self.path_tree
+        folder = path_tree.open(path)
+        choices: List[Choice[str]] = []
+        if path != ROOT:
+            choices.append(Choice('../', parent_folder(path)))
+        if not folder.is_complete and not folder.has_failed:
+            choices.append(Choice(LOAD_MORE_FOLDERS, LOAD_MORE_FOLDERS))
+        try:
+            selection = list_choice_menu(
+                choices,
+                f'Which password do you want to work on? ({path})',
+                back=go_back,
+                choices_feed=folder.feed,
+            )
+        finally:
+            path_tree.close(path)
+
+        if selection is None:
+            return None
+        if selection == LOAD_MORE_FOLDERS:
+            path_tree.load_more(path)
+            return partial(self._folder_menu, path)
+        if isinstance(selection, FolderPath):
+            return partial(self._folder_menu, selection)
+        return partial(self.password_menu, selection)
 
     def retrieve_password(self, key: str) -> str:
         resp = self.ssm_cli.get_parameter(Name=key, WithDecryption=True)
         return resp.get("Parameter", {}).get("Value")
 
+    def retrieve_passwords(self, keys: List[str]) -> BatchRetrieval:
+        result = BatchRetrieval()
+        for chunk_result in map_concurrently(
+            self._retrieve_passwords_chunk,
+            chunked(keys, self.GET_PARAMETERS_MAX_NAMES),
+        ):
+            result.merge(chunk_result)
+        return result
+
+    def _retrieve_passwords_chunk(self, keys: Sequence[str]) -> BatchRetrieval:
+        try:
+            resp = self.ssm_cli.get_parameters(Names=list(keys), WithDecryption=True)
+        except botocore.exceptions.ClientError:
+            # e.g. not allowed to decrypt one of the parameters. Retrieving them one by one tells
+            # which one(s) failed, without failing the others
+            return Backend.retrieve_passwords(self, list(keys))
+
+        result = BatchRetrieval()
+        for parameter in resp.get("Parameters", []):
+            result.values[parameter["Name"]] = parameter.get("Value")
+        for invalid_key in resp.get("InvalidParameters", []):
+            result.errors[invalid_key] = "Parameter not found"
+        return result
+
     def create_password(self, password_key: str, password_value: str) -> None:
         self._write_password(password_key, password_value)
+        if self._path_tree is not None:
+            self.path_tree.add_key(password_key)
 
     def update_password(self, key: str, password_value: str) -> None:
         self._write_password(key, password_value)
@@ -66,3 +220,5 @@ using default KMS encryption keys
 
     def delete_password(self, password_key: str) -> None:
         self.ssm_cli.delete_parameter(Name=password_key)
+        if self._path_tree is not None:
+            self.path_tree.remove_key(password_key)
@@ -1,23 +1,39 @@
 from abc import ABC, abstractmethod
+import asyncio
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime
 from enum import Enum
-from prompt_toolkit import print_formatted_text, HTML
-from prompt_toolkit.styles import Style
-from typing import Any, Callable, List, Optional, Tuple
-
-from ..menu import confirmation_menu, list_choice_menu, read_input, read_password
-from ..cli_menu.prompts.listmenu import Choice
+from functools import partial
+from html import escape
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ..menu import (
+    confirmation_menu, go_back, list_choice_menu, print_html, read_input, read_password,
+    UserCancel, wait_menu,
+)
+from ..cli_menu.choice import Choice, ChoicesFeed
+from ..tracing import BACKEND_OPERATIONS, traced_operation
+from .async_backend import AsyncBackend, ExecutorAdapter
+from .batch import BatchRetrieval, map_concurrently
+from .listing_cache import CachedListing, ListingCache
+from .prefetch import listing_failed_choice, PasswordKeysPrefetcher, run_in_background
+from .remote_search import RemoteSearch
 
 
 class RootAction(Enum):
     LIST_PASSWORDS = 'List passwords'
+    RETRIEVE_PASSWORDS = 'Retrieve several password values'
     CREATE_PASSWORD = 'Create a new password'
 
 
 ROOT_ACTION_MAPPING = {
     RootAction.LIST_PASSWORDS: "_handle_list_password_action",
+    RootAction.RETRIEVE_PASSWORDS: "_handle_retrieve_passwords_action",
     RootAction.CREATE_PASSWORD: "_handle_create_password_action",
 }
-""" Those methods take no parameter """
+""" Those methods take no parameter, and return the next `Screen` """
 
 assert len(ROOT_ACTION_MAPPING.keys()) == len(RootAction)
 
@@ -33,35 +49,142 @@ PASSWORD_ACTION_MAPPING = {
     PasswordAction.UPDATE: "_handle_update_password",
     PasswordAction.DELETE: "_handle_delete_password",
 }
-""" Those methods take the password key as first and unique parameter """
+"""
+Those methods take the password key as first and unique parameter, and return the next `Screen`
+"""
 
 assert len(PASSWORD_ACTION_MAPPING.keys()) == len(PasswordAction)
 
+LISTING_MESSAGE = 'Listing the passwords'
+
 # Mypy does not support recursive types
 # https://github.com/python/mypy/issues/731
 ListType = Tuple[List[str], Optional[Callable[[], 'ListType']]]  # type:ignore
 
+Screen = Callable[[], Optional['Screen']]  # type:ignore
+"""
+A step of the navigation in the backend menus: displays a menu, acts on the choice, and returns the
+next screen. None goes back to the main menu
+"""
+
+
+@dataclass
+class PasswordMetadata:
+    """ What the listing of a backend tells about a password, without retrieving its value """
+    key: str
+    last_modified: Optional[datetime] = None
+    version: Optional[str] = None
+    description: Optional[str] = None
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        """ The metadata that is set, JSON serializable """
+        content: Dict[str, Any] = {'key': self.key}
+        if self.last_modified is not None:
+            content['last_modified'] = self.last_modified.isoformat()
+        if self.version is not None:
+            content['version'] = self.version
+        if self.description is not None:
+            content['description'] = self.description
+        return content
+
+
+def iter_pages(list_method: Callable[[], ListType]) -> Iterator[List[str]]:
+    """ Yields the successive pages of a listing, starting with the one `list_method` returns """
+    next_page_method: Optional[Callable[[], ListType]] = list_method
+    while next_page_method is not None:
+        password_keys, next_page_method = next_page_method()
+        yield password_keys
+
 
 class Backend(ABC):
 
-    def __init__(self, *args, back: Optional[Callable] = None, **kwargs):  # pylint:disable=unused-argument  # noqa
+    PREFETCH_BY_DEFAULT = False
+    """ Whether the listing pages are prefetched when the user did not specify it """
+    READ_RATE_LIMIT: Optional[float] = None
+    """ Password retrievals per second that the backend sustains. None when not limited """
+    WRITE_RATE_LIMIT: Optional[float] = None
+    """ Password creations / updates per second that the backend sustains. None when not limited """
+    REGIONAL = False
+    """ Whether the backend works on a region, that the non-interactive commands require """
+
+    def __init__(  # pylint:disable=unused-argument
+        self,
+        *args,
+        back: Optional[Callable] = None,
+        prefetch: Optional[bool] = None,
+        listing_cache_ttl: Optional[float] = None,
+        refresh_listing_cache: bool = False,
+        **kwargs
+    ):
         """
         Parameters
         ==========
         back: Optional[Callable]
-            The method to call when the user choses to go back from the backend menu
+            The method to call when the user choses to go back from the backend menu, before
+            `main_menu` returns
             Passing `None` will mean that the backend menu will not display a *BACK* option
+        prefetch: Optional[bool]
+            When True, all the pages of the password keys listing are fetched in the background
+            and added to the menu as they arrive, instead of displaying a *Next Page* option
+            Defaults to `PREFETCH_BY_DEFAULT`
+        listing_cache_ttl: Optional[float]
+            When set, the password keys listing is cached on disk (see `listing_cache_namespace`).
+            The menu is displayed from the cache, and the cache is refreshed in the background
+            when it is older than this number of seconds
+            `None` (default) disables the cache
+        refresh_listing_cache: bool
+            When True, the cache is ignored (but refreshed) the first time the keys are listed
         """
         self._back = back
+        self._prefetch = self.PREFETCH_BY_DEFAULT if prefetch is None else prefetch
+        self._listing_cache_ttl = listing_cache_ttl
+        self._refresh_listing_cache = refresh_listing_cache
+        self._listing_cache: Optional[ListingCache] = None
+        self._listing_refresh: Optional[Tuple[PasswordKeysPrefetcher, ChoicesFeed[str]]] = None
+        self._listing_refresh_lock = threading.Lock()
+        self._speculative_listing: Optional['Future[Optional[ListType]]'] = None
+        self._async_backend: Optional[AsyncBackend] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Their calls are traced with `--trace`
+        for name in BACKEND_OPERATIONS:
+            if name in cls.__dict__:
+                setattr(cls, name, traced_operation(cls.__dict__[name]))
 
     @abstractmethod
     def initialize(self) -> None:
-        """ Perform the backend setup (region, endpoint, credentials, ...) """
+        """
+        Perform the backend setup (region, endpoint, credentials, ...)
+
+        Raises
+        ======
+        UserBack
+            when the user goes back from a menu displayed during the setup
+        """
 
     @abstractmethod
     def title(self) -> None:
         """ Outputs to STDOUT a title / description / documentation for the backend chosen """
 
+    def load_title_details(self) -> None:
+        """
+        Fetches what `title` displays from the backend, if anything, so that `title` does not wait
+
+        Called in the background, while the menus show a spinner
+        """
+
+    def as_async(self) -> AsyncBackend:
+        """
+        The asyncio interface of this backend, which the menus use
+
+        By default, the methods of this backend are run in threads (see `ExecutorAdapter`).
+        Override it if your backend has a native asyncio implementation
+        """
+        if self._async_backend is None:
+            self._async_backend = ExecutorAdapter(self)
+        return self._async_backend
+
     @abstractmethod
     def list_password_keys(self) -> ListType:
         """
@@ -78,10 +201,47 @@ class Backend(ABC):
               the same type signature as this method
         """
 
+    def search_password_keys(self, search_string: str) -> Iterator[List[str]]:
+        """
+        Yields the pages of the password keys matching `search_string`, as searched by the backend
+
+        Lets the search of the listing menus find the keys that are not listed yet. The keys found
+        are searched again by the menu, they may match loosely. Override it if your backend can
+        search: by default nothing is found, and the menus only search the keys listed
+        """
+        return iter(())
+
+    @property
+    def has_server_side_search(self) -> bool:
+        """ Whether the backend searches the password keys itself, see `search_password_keys` """
+        return type(self).search_password_keys is not Backend.search_password_keys
+
     @abstractmethod
     def retrieve_password(self, key: str) -> str:
         """ Gets the password value for a given password key """
 
+    @traced_operation
+    def retrieve_passwords(self, keys: List[str]) -> BatchRetrieval:
+        """
+        Gets the password values for several password keys
+
+        A password that cannot be retrieved is reported in `BatchRetrieval.errors` and does not
+        prevent the other ones from being retrieved.
+
+        By default, calls `retrieve_password` concurrently for each key. Override it if your
+        backend can fetch several passwords per API call.
+        """
+        def retrieve(key: str) -> BatchRetrieval:
+            try:
+                return BatchRetrieval(values={key: self.retrieve_password(key)})
+            except Exception as e:      # pylint:disable=broad-except
+                return BatchRetrieval(errors={key: str(e)})
+
+        result = BatchRetrieval()
+        for key_result in map_concurrently(retrieve, keys):
+            result.merge(key_result)
+        return result
+
     @abstractmethod
     def create_password(self, password_key: str, password_value: str) -> None:
         """ Create a new password under the given key in the backend """
@@ -94,6 +254,147 @@ class Backend(ABC):
     def delete_password(self, password_key: str) -> None:
         """ Deletes a password from the backend """
 
+    def throttle_counts(self) -> Dict[str, int]:
+        """
+        The number of calls that the backend throttled so far, by operation
+
+        Empty when nothing was throttled, or when the backend cannot tell
+        """
+        return {}
+
+    def iter_password_keys_pages(self) -> Iterator[List[str]]:
+        """
+        Yields all the pages of the password keys listing
+
+        Used for background listings. Override it if your backend can list with bigger pages than
+        the ones presented to the user by `list_password_keys`
+        """
+        return iter_pages(self.list_password_keys)
+
+    def iter_password_metadata_pages(self) -> Iterator[List[PasswordMetadata]]:
+        """
+        Yields all the pages of the passwords listing, with the metadata the backend has
+
+        By default, only the password keys are known. Override it if the listing API of your
+        backend tells more (modification date, version, ...)
+        """
+        for password_keys in self.iter_password_keys_pages():
+            yield [PasswordMetadata(key) for key in password_keys]
+
+    def listing_cache_namespace(self) -> Optional[List[str]]:
+        """
+        Identifies the vault listed by this backend in the listing cache
+
+        Override it to add what distinguishes 2 vaults of the same backend (account, region, ...).
+        Returning `None` disables the cache.
+        """
+        return [f'{type(self).__module__}.{type(self).__qualname__}']
+
+    @property
+    def listing_cache(self) -> Optional[ListingCache]:
+        """ The on-disk cache of the password keys listing. None when disabled """
+        if self._listing_cache_ttl is None:
+            return None
+
+        namespace = self.listing_cache_namespace()
+        if namespace is None:
+            return None
+
+        if self._listing_cache is None or self._listing_cache.namespace != namespace:
+            self._listing_cache = ListingCache(namespace)
+        return self._listing_cache
+
+    def _load_cached_listing(self) -> Optional[CachedListing]:
+        listing_cache = self.listing_cache
+        if listing_cache is None:
+            return None
+
+        if self._refresh_listing_cache:
+            # Forced refresh only applies to the first listing
+            self._refresh_listing_cache = False
+            return None
+
+        return listing_cache.load()
+
+    def _start_listing_refresh(self, known_keys: List[str]) -> ChoicesFeed[str]:
+        """
+        Lists all the password keys in the background and saves them in the listing cache
+
+        Returns a feed reconciling `known_keys` with the fresh listing: new keys are pushed as
+        soon as they are fetched, deleted keys are discarded once the listing is complete. If the
+        listing fails, the feed tells it, and the listing cache is left as it was.
+        Only one refresh runs at a time, the feed of the refresh in progress is returned if any.
+        """
+        with self._listing_refresh_lock:
+            if self._listing_refresh is not None and not self._listing_refresh[0].is_done:
+                return self._listing_refresh[1]
+
+            listing_cache = self.listing_cache
+            feed: ChoicesFeed[str] = ChoicesFeed()
+            known = set(known_keys)
+            fetched_keys: List[str] = []
+
+            def on_page(password_keys: List[str]) -> None:
+                fetched_keys.extend(password_keys)
+                new_keys = [key for key in password_keys if key not in known]
+                known.update(new_keys)
+                if new_keys:
+                    feed.push([Choice.from_string(key) for key in new_keys])
+
+            def on_done() -> None:
+                fetched = set(fetched_keys)
+                deleted_keys = [key for key in known_keys if key not in fetched]
+                if deleted_keys:
+                    feed.discard(deleted_keys)
+                if listing_cache is not None:
+                    listing_cache.save(fetched_keys)
+
+            def on_error(error: Exception) -> None:
+                feed.push([listing_failed_choice(error)])
+
+            prefetcher = PasswordKeysPrefetcher(
+                self.iter_password_keys_pages(), on_page, on_done, on_error
+            )
+            prefetcher.start()
+            self._listing_refresh = (prefetcher, feed)
+            return feed
+
+    def start_speculative_listing(self) -> None:
+        """
+        Starts listing the password keys in the background, before the user asks for them, so that
+        the listing menu shows up without waiting. Meant to be called right after `initialize`
+
+        - with a fresh listing cache, there is nothing to do
+        - with a stale one, its background refresh starts right away
+        - otherwise the first page is fetched, and used by the next listing menu
+        """
+        def speculate() -> Optional[ListType]:
+            listing_cache = self.listing_cache
+            if listing_cache is not None and not self._refresh_listing_cache:
+                cached_listing = listing_cache.load()
+                if cached_listing is not None:
+                    if not cached_listing.is_fresh(self._listing_cache_ttl or 0):
+                        self._start_listing_refresh(cached_listing.password_keys)
+                    return None
+            return self.list_password_keys()
+
+        self._speculative_listing = run_in_background(speculate)
+
+    def _take_speculative_listing(self) -> Optional[ListType]:
+        """ Waits for the speculative listing, if any. Returns the first page, if it fetched it """
+        speculative_listing, self._speculative_listing = self._speculative_listing, None
+        if speculative_listing is None:
+            return None
+        try:
+            if speculative_listing.done():
+                return speculative_listing.result()
+            return wait_menu(LISTING_MESSAGE, lambda: asyncio.wrap_future(speculative_listing))
+        except UserCancel:
+            raise
+        except Exception:      # pylint:disable=broad-except
+            # The listing is done again by the caller, the error will surface there
+            return None
+
     def get_root_menu_actions(self) -> List[Choice[RootAction]]:
         """
         Returns a list of actions to present in a menu for the root menu of the backend
@@ -133,16 +434,42 @@ class Backend(ABC):
         return getattr(self, PASSWORD_ACTION_MAPPING[menu_action])
 
     def main_menu(self) -> None:
+        """
+        Displays the backend menus, until the user goes back from the main menu
+
+        The menus do not call each other: each screen returns the next one to this loop (see
+        `Screen`). The stack depth, and the memory held by the menus, stay the same however long
+        the session is.
+        """
+        screen: Optional[Screen] = self._first_screen()
+        while True:
+            if screen is None:
+                screen = self._root_menu()
+                if screen is None:
+                    return
+            try:
+                screen = screen()
+            except UserCancel:
+                print_html(
+                    '\n<warning>Interrupted.</warning> A change requested may still be applied\n',
+                    {'warning': '#FF9D00 bold'},
+                )
+                screen = None
+
+    def _first_screen(self) -> Optional[Screen]:
+        """ The screen displayed before the main menu, if any """
+        return None
+
+    def _root_menu(self) -> Optional[Screen]:
         """
         Displays the backend main menu
 
-        By default, proposes all the `RootAction` and call their handler
+        By default, proposes all the `RootAction`
 
-        Parameters
-        ==========
-        back: Callable
-            The function to call when the user choses to go back
-            If set to `None` (default) the menu will not display a *BACK* option
+        Returns
+        -------
+        Optional[Screen]
+            The handler of the action chosen. None if the user went back
         """
         main_menu_choices = self.get_root_menu_actions()
         action: Optional[RootAction] = list_choice_menu(
@@ -151,104 +478,267 @@ class Backend(ABC):
             back=self._back,
         )
         if action is None:
-            return
-        action_method = self.get_method_for_root_menu_action(action)
-        action_method()
+            return None
+        return self.get_method_for_root_menu_action(action)
 
     def _handle_list_password_action(
         self,
         use_method: Optional[Callable[[], ListType]] = None
-    ) -> None:
-        if use_method is not None:
-            password_keys, next_page_method = use_method()
-        else:
-            password_keys, next_page_method = self.list_password_keys()
+    ) -> Optional[Screen]:
+        password_key: Optional[str] = self._password_keys_menu(
+            'Which password do you want to work on?',
+            use_method=use_method,
+        )
+        if password_key is None:
+            return None
+
+        return partial(self.password_menu, password_key)
+
+    def _password_keys_menu(
+        self,
+        message: str,
+        use_method: Optional[Callable[[], ListType]] = None,
+        multiselect: bool = False,
+    ) -> Optional[Any]:
+        """
+        Displays the password keys for the user to chose from
+
+        The keys come from the listing cache when enabled. Otherwise they are listed page by page
+        or prefetched (see `Backend.__init__`)
+
+        Returns
+        -------
+        Optional[Union[str, List[str]]]
+            The password key chosen, or the list of those chosen if `multiselect` is set.
+            None if the user went back
+        """
+        NEXT_PAGE_CODE = 'next_page'
+        while True:
+            selection = self._password_keys_page_menu(
+                message, use_method, multiselect, NEXT_PAGE_CODE
+            )
+            if not isinstance(selection, tuple):
+                return selection
+            # Next page
+            use_method = selection[1]
+
+    def _password_keys_page_menu(
+        self,
+        message: str,
+        use_method: Optional[Callable[[], ListType]],
+        multiselect: bool,
+        next_page_code: str,
+    ) -> Optional[Any]:
+        """
+        A page of `_password_keys_menu`
 
-        password_action_choices: List[Choice[str]] = [
+        Returns
+        -------
+        Optional[Union[str, List[str], Tuple[str, Callable[[], ListType]]]]
+            What `_password_keys_menu` returns, or `(next_page_code, next_page_method)` when the
+            user asked for the next page
+        """
+        choices_feed: Optional[ChoicesFeed[str]] = None
+        prefetcher: Optional[PasswordKeysPrefetcher] = None
+
+        speculative_page = self._take_speculative_listing() if use_method is None else None
+        cached_listing = self._load_cached_listing() if use_method is None else None
+        if cached_listing is not None:
+            password_keys, next_page_method = cached_listing.password_keys, None
+            if not cached_listing.is_fresh(self._listing_cache_ttl or 0):
+                # Stale while revalidate
+                choices_feed = self._start_listing_refresh(password_keys)
+        elif use_method is not None:
+            password_keys, next_page_method = wait_menu(
+                LISTING_MESSAGE, partial(self.as_async().list_next_page, use_method)
+            )
+        else:
+            password_keys, next_page_method = speculative_page or wait_menu(
+                LISTING_MESSAGE, self.as_async().list_password_keys
+            )
+            listing_cache = self.listing_cache
+            if listing_cache is not None:
+                if next_page_method is None:
+                    listing_cache.save(password_keys)
+                else:
+                    # The refresh fills the cache. It also feeds the menu when prefetching
+                    refresh_feed = self._start_listing_refresh(password_keys)
+                    if self._prefetch:
+                        choices_feed = refresh_feed
+                        next_page_method = None
+
+        password_action_choices: List[Choice[Any]] = [
             Choice.from_string(key) for key in password_keys
         ]
 
-        NEXT_PAGE_CODE = 'next_page'
+        if next_page_method and self._prefetch:
+            feed: ChoicesFeed[str] = ChoicesFeed()
+            prefetcher = PasswordKeysPrefetcher(
+                iter_pages(next_page_method),
+                lambda keys: feed.push([Choice.from_string(key) for key in keys]),
+                on_error=lambda error: feed.push([listing_failed_choice(error)]),
+            )
+            prefetcher.start()
+            choices_feed = feed
+            next_page_method = None
+
+        remote_search: Optional[RemoteSearch] = None
+        if self.has_server_side_search:
+            # The keys found by the backend are merged with the listed ones, in a feed of their own
+            menu_feed: ChoicesFeed[str] = ChoicesFeed()
+            remote_search = RemoteSearch(self.search_password_keys, menu_feed, password_keys)
+            if choices_feed is not None:
+                remote_search.forward(choices_feed)
+            choices_feed = menu_feed
+
+        def stop_prefetching():
+            if prefetcher is not None:
+                prefetcher.cancel()
+            if remote_search is not None:
+                remote_search.cancel()
+
         if next_page_method:
             password_action_choices.append(Choice.separator())
-            password_action_choices.append(Choice('Next Page', NEXT_PAGE_CODE, None))
-
-        password_key: Optional[str] = list_choice_menu(
-            password_action_choices,
-            'Which password do you want to work on?',
-            back=self.main_menu,
+            password_action_choices.append(
+                Choice('Next Page', (next_page_code, next_page_method), None)
+            )
+
+        try:
+            selection = list_choice_menu(
+                password_action_choices,
+                message,
+                back=go_back,
+                choices_feed=choices_feed,
+                multiselect=multiselect,
+                on_search=remote_search.search if remote_search is not None else None,
+            )
+        finally:
+            stop_prefetching()
+
+        return selection
+
+    def _handle_retrieve_passwords_action(self) -> Optional[Screen]:
+        password_keys: Optional[List[str]] = self._password_keys_menu(
+            'Which passwords do you want to retrieve?',
+            multiselect=True,
         )
-        if password_key is None:
-            return
+        if password_keys is None:
+            return None
 
-        if password_key == NEXT_PAGE_CODE:
-            return self._handle_list_password_action(use_method=next_page_method)
+        confirmation = confirmation_menu((
+            f'Are you sure you want to retrieve {len(password_keys)} password(s)? '
+            'Their values will be displayed in clear on the screen'
+        ))
+        if not confirmation:
+            return None
 
-        self.password_menu(password_key)
+        retrieval = wait_menu(
+            f'Retrieving {len(password_keys)} password(s)',
+            partial(self.as_async().retrieve_passwords, password_keys),
+        )
+        lines = []
+        for password_key in password_keys:
+            if password_key in retrieval.values:
+                lines.append(
+                    f'<title>{escape(password_key)}:</title> '
+                    f'{escape(retrieval.values[password_key])}'
+                )
+            else:
+                reason = retrieval.errors.get(password_key, 'Not found')
+                lines.append(
+                    f'<title>{escape(password_key)}:</title> <error>{escape(reason)}</error>'
+                )
+        print_html(
+            '\n' + '\n'.join(lines) + '\n',
+            {
+                'title': '#FF9D00 bold',
+                'error': '#FF4020',
+            },
+        )
+        return None
 
-    def _handle_create_password_action(self) -> None:
+    def _handle_create_password_action(self) -> Optional[Screen]:
         password_key = read_input((
             'Please enter the name (key) under which to store the password:'
         ))
         password_value = read_password((
             'Please enter the value for the password:'
         ))
-        self.create_password(password_key, password_value)
-        self.password_menu(password_key)
+        wait_menu(
+            f'Creating {password_key}',
+            partial(self.as_async().create_password, password_key, password_value),
+        )
+        if self.listing_cache is not None:
+            self.listing_cache.update(added=[password_key])
+        return partial(self.password_menu, password_key)
 
-    def password_menu(self, password_key: str) -> None:
+    def password_menu(self, password_key: str) -> Optional[Screen]:
         """
-        Displays the menu actions for a specific passwor
+        Displays the menu actions for a specific password
 
-        By default, proposes all the `PasswordAction` and call their handler
+        By default, proposes all the `PasswordAction`
+
+        Returns
+        -------
+        Optional[Screen]
+            The handler of the action chosen. None if the user went back
         """
         password_menu_choices = self.get_password_menu_actions()
 
         password_action: Optional[PasswordAction] = list_choice_menu(
             password_menu_choices,     # type:ignore  # too complex for mypy
             f'What do you want to do with this password ({password_key})?',
-            back=self.main_menu
+            back=go_back,
         )
         if password_action is None:
-            return
+            return None
 
         action_method = self.get_method_for_password_menu_action(password_action)
-        action_method(password_key)
+        return partial(action_method, password_key)
 
-    def _handle_retrieve_password(self, password_key: str) -> None:
+    def _handle_retrieve_password(self, password_key: str) -> Optional[Screen]:
         confirmation = confirmation_menu((
             f'Are you sure you want to retrieve {password_key}? '
             'Its value will be displayed in clear on the screen'
         ))
 
         if not confirmation:
-            return self.password_menu(password_key)
+            return partial(self.password_menu, password_key)
 
-        password_value = self.retrieve_password(password_key)
-        print_formatted_text(
-            HTML(f'\n<title>Password {password_key}:</title> {password_value}\n'),
-            style=Style.from_dict({
+        password_value = wait_menu(
+            f'Retrieving {password_key}', partial(self.as_async().retrieve_password, password_key)
+        )
+        print_html(
+            f'\n<title>Password {escape(password_key)}:</title> {escape(password_value)}\n',
+            {
                 'title': '#FF9D00 bold',
-            }),
+            },
         )
-        self.main_menu()
+        return None
 
-    def _handle_update_password(self, password_key: str) -> None:
+    def _handle_update_password(self, password_key: str) -> Optional[Screen]:
         new_password_value = read_password((
             'Please enter the new value for the password.\n'
             '  This will overwrite the old password value (which will be lost):'
         ))
-        self.update_password(password_key, new_password_value)
-        self.password_menu(password_key)
+        wait_menu(
+            f'Updating {password_key}',
+            partial(self.as_async().update_password, password_key, new_password_value),
+        )
+        return partial(self.password_menu, password_key)
 
-    def _handle_delete_password(self, password_key: str) -> None:
+    def _handle_delete_password(self, password_key: str) -> Optional[Screen]:
         confirmation = confirmation_menu((
             f'Are you sure you want to delete password {password_key}? '
             'This operation cannot be undone'
         ))
 
         if not confirmation:
-            return self.password_menu(password_key)
+            return partial(self.password_menu, password_key)
 
-        self.delete_password(password_key)
-        self.main_menu()
+        wait_menu(
+            f'Deleting {password_key}', partial(self.as_async().delete_password, password_key)
+        )
+        if self.listing_cache is not None:
+            self.listing_cache.update(removed=[password_key])
+        return None
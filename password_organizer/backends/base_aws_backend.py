@@ -1,12 +1,25 @@
 from abc import abstractmethod
-import botocore.exceptions
-import boto3
+from functools import partial
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from aws_constants import AWS_REGIONS
-from exceptions import InitializationFailure, MissingAuthentication
+from exceptions import MissingAuthentication
 from . import Backend
-from ..menu import list_choice_menu
-from ..cli_menu.prompts.listmenu import Choice
+from .aws_clients import AWSClientPool, DEFAULT_CONNECT_TIMEOUT, default_client_pool
+from .aws_identity import (
+    AccountIdentity, AccountIdentityCache, DEFAULT_IDENTITY_CACHE_TTL, fetch_account_identity,
+)
+from .base import ListType, PasswordMetadata, Screen
+from .region_search import (
+    DEFAULT_MAX_WORKERS as DEFAULT_REGION_SEARCH_WORKERS, DEFAULT_REGION_TIMEOUT, RegionSearch,
+)
+from ..menu import go_back, list_choice_menu, UserBack
+from ..cli_menu.choice import Choice, ChoicesFeed
+
+
+ALL_REGIONS = '*'
+SEARCH_ALL_REGIONS = 'Search all regions'
 
 
 class BaseAWSBackend(Backend):      # pylint:disable=abstract-method
@@ -18,39 +31,114 @@ class BaseAWSBackend(Backend):      # pylint:disable=abstract-method
     - tries to fetch and display the account id and the account alias of the AWS account the user is
       connected to
 
+    Instead of picking a region, the user can search the password keys of all the regions at once.
+
+    Parameters
+    ==========
+    region: Optional[str]
+        The region to work with. When not given, the user choses it in `initialize`
+    identity_cache_ttl: Optional[float]
+        Seconds during which the account ID and alias are cached on disk, per credentials and
+        profile. `None` disables the cache
+    client_pool: Optional[AWSClientPool]
+        Where the boto3 clients come from. Defaults to the pool shared by all the AWS backends
+    region_search_workers: int
+        Number of regions listed concurrently when searching all the regions
+    region_search_timeout: float
+        Seconds after which a region is left out of the search of all the regions
+
     Raises
     ======
     MissingAuthentication
         when AWS credentials cannot be found to connect to AWS
     """
 
-    def __init__(self, *args, **kwargs):
+    PAGE_SIZE = 10
+    """ Number of passwords per page when the user navigates the pages """
+    PREFETCH_PAGE_SIZE = 10
+    """ Maximum page size allowed by the listing API, used when prefetching / in the background """
+    REGIONAL = True
+
+    def __init__(
+        self,
+        *args,
+        region: Optional[str] = None,
+        identity_cache_ttl: Optional[float] = DEFAULT_IDENTITY_CACHE_TTL,
+        client_pool: Optional[AWSClientPool] = None,
+        region_search_workers: int = DEFAULT_REGION_SEARCH_WORKERS,
+        region_search_timeout: float = DEFAULT_REGION_TIMEOUT,
+        **kwargs
+    ):
         super().__init__(*args, **kwargs)
         self.region = 'us-east-1'
+        self._requested_region = region
+        self._identity_cache_ttl = identity_cache_ttl
+        self._account_identity: Optional[AccountIdentity] = None
+        self._account_identity_lock = threading.Lock()
+        self.client_pool = client_pool or default_client_pool()
+        self._pending_password_key: Optional[str] = None
+        self._region_search_workers = region_search_workers
+        self._region_search_timeout = region_search_timeout
 
-        self.sts_cli = boto3.client('sts', region_name=self.region)
-        self.iam_cli = boto3.client('iam', region_name=self.region)
-
-        if self.sts_cli._request_signer._credentials is None:
-            # Note that this uses botocore internals. Might change.
-            # TODO - gbataille: test this behavior for changes
+        self._credentials = self.client_pool.get_credentials()
+        if self._credentials is None:
             raise MissingAuthentication()
 
     def initialize(self) -> None:
-        self.region = list_choice_menu(
-            [Choice.from_string(region) for region in AWS_REGIONS],
-            'Which region do you want to work with?',
-            back=self._back,
-        )
-        if self.region is None:
-            raise InitializationFailure()
+        if self._requested_region is not None:
+            self.region = self._requested_region
+            self._setup_aws_clients()
+            return
+
+        while True:
+            region: Optional[str] = list_choice_menu(
+                [Choice(SEARCH_ALL_REGIONS, ALL_REGIONS), Choice.separator()]
+                + [Choice.from_string(region) for region in AWS_REGIONS],
+                'Which region do you want to work with?',
+                back=self._back,
+            )
+            if region is None:
+                raise UserBack()
+            if region != ALL_REGIONS:
+                self.switch_region(region)
+                return
 
+            # Back to the region menu when the user goes back
+            found = self._all_regions_keys_menu()
+            if found is not None:
+                region, self._pending_password_key = found
+                self.switch_region(region)
+                return
+
+    def switch_region(self, region: str) -> None:
+        self.region = region
         self._setup_aws_clients()
 
+    def in_region(self, region: str, client_pool: Optional[AWSClientPool] = None) -> Any:
+        """
+        A new backend with the options of this one, working on another region. It shares nothing
+        with this one but the client pool, so that both can be used from different threads
+        """
+        backend = type(self)(
+            region=region, client_pool=client_pool or self.client_pool, **self._copy_options()
+        )
+        backend.initialize()
+        return backend
+
+    def _copy_options(self) -> Dict[str, Any]:
+        """ The constructor options of the copies made by `in_region`. Extend it with yours """
+        return {
+            'prefetch': self._prefetch,
+            'listing_cache_ttl': self._listing_cache_ttl,
+            'identity_cache_ttl': self._identity_cache_ttl,
+            'region_search_workers': self._region_search_workers,
+            'region_search_timeout': self._region_search_timeout,
+        }
+
     @abstractmethod
     def _setup_aws_clients(self) -> None:
         """
-        Used to initialize the AWS client connections.
+        Used to initialize the AWS client connections, from `client_pool`.
         Called anytime they need to be refreshed, like when the region changes
         """
 
@@ -58,26 +146,212 @@ class BaseAWSBackend(Backend):      # pylint:disable=abstract-method
     def backend_description(self) -> str:
         """ A description of the AWS based backend, to be displayed at backend initialization """
 
+    @abstractmethod
+    def _describe_passwords(
+        self,
+        next_token: Optional[str],
+        page_size: int,
+    ) -> Tuple[List[PasswordMetadata], Optional[str]]:
+        """
+        Fetches a page of the passwords listing
+
+        Returns
+        -------
+        Tuple[List[PasswordMetadata], Optional[str]]
+            - 0: the passwords of the page
+            - 1: the token of the next page, if any
+        """
+
+    def list_password_keys(self) -> ListType:
+        return self._get_passwords()
+
+    def _get_passwords(
+        self,
+        next_token: Optional[str] = None,
+        page_size: Optional[int] = None,
+    ) -> ListType:
+        if page_size is None:
+            page_size = self.PREFETCH_PAGE_SIZE if self._prefetch else self.PAGE_SIZE
+
+        passwords, next_token = self._describe_passwords(next_token, page_size)
+
+        next_method = None
+        if next_token:
+            next_method = partial(
+                self._get_passwords, next_token=next_token, page_size=page_size
+            )
+
+        return [password.key for password in passwords], next_method
+
+    def iter_password_metadata_pages(self) -> Iterator[List[PasswordMetadata]]:
+        next_token: Optional[str] = None
+        while True:
+            passwords, next_token = self._describe_passwords(next_token, self.PREFETCH_PAGE_SIZE)
+            yield passwords
+            if not next_token:
+                return
+
+    def iter_password_keys_pages(self) -> Iterator[List[str]]:
+        for passwords in self.iter_password_metadata_pages():
+            yield [password.key for password in passwords]
+
+    def throttle_counts(self) -> Dict[str, int]:
+        """ Shared by all the backends on the same client pool """
+        return {
+            f'{service}.{operation} ({region})': count
+            for (service, region, operation), count
+            in self.client_pool.rate_controllers.throttle_counts().items()
+        }
+
+    @property
+    def sts_cli(self) -> Any:
+        return self.client_pool.client('sts', self.region)
+
+    @property
+    def iam_cli(self) -> Any:
+        return self.client_pool.client('iam', self.region)
+
+    @property
+    def account_identity(self) -> AccountIdentity:
+        """
+        The account ID and alias of the credentials, fetched concurrently
+
+        They are cached on disk for `identity_cache_ttl` seconds, per access key and profile.
+        Failed lookups are not cached, and tried again on the next access.
+        """
+        with self._account_identity_lock:
+            if self._account_identity is not None:
+                return self._account_identity
+
+            identity_cache = None
+            if self._identity_cache_ttl is not None:
+                identity_cache = AccountIdentityCache(
+                    self._credentials.access_key,
+                    self.client_pool.session.profile_name,
+                    ttl=self._identity_cache_ttl,
+                )
+                identity = identity_cache.load()
+                if identity is not None:
+                    self._account_identity = identity
+                    return identity
+
+            identity = fetch_account_identity(self.sts_cli, self.iam_cli)
+            if identity.is_complete:
+                self._account_identity = identity
+                if identity_cache is not None:
+                    identity_cache.save(identity)
+            return identity
+
+    @property
+    def account_id(self) -> Optional[str]:
+        """ The ID of the AWS account the credentials belong to. None if it cannot be fetched """
+        return self.account_identity.account_id
+
+    def listing_cache_namespace(self) -> Optional[List[str]]:
+        account_id = self.account_id
+        if account_id is None:
+            # No way to tell which vault this is
+            return None
+        namespace = super().listing_cache_namespace() or []
+        return namespace + [account_id, self.region]
+
+    def _first_screen(self) -> Optional[Screen]:
+        if self._pending_password_key is not None:
+            # Chosen from the search of all the regions, at initialization
+            password_key, self._pending_password_key = self._pending_password_key, None
+            return partial(self.password_menu, password_key)
+        return super()._first_screen()
+
+    def get_root_menu_actions(self) -> List[Choice[Any]]:
+        return super().get_root_menu_actions() + [Choice(SEARCH_ALL_REGIONS, ALL_REGIONS)]
+
+    def get_method_for_root_menu_action(self, menu_action: Any) -> Callable:
+        if menu_action == ALL_REGIONS:
+            return self._handle_search_all_regions_action
+        return super().get_method_for_root_menu_action(menu_action)
+
+    def _handle_search_all_regions_action(self) -> Optional[Screen]:
+        found = self._all_regions_keys_menu()
+        if found is None:
+            return None
+
+        region, password_key = found
+        self.switch_region(region)
+        return partial(self.password_menu, password_key)
+
+    def _all_regions_keys_menu(self) -> Optional[Tuple[str, str]]:
+        """
+        Lists the password keys of all the regions concurrently, in one menu labelled by region
+
+        Regions show up as they answer. Those that fail or time out are listed, disabled, with the
+        reason.
+
+        Returns
+        -------
+        Optional[Tuple[str, str]]
+            The region and the password key chosen. None if the user went back
+        """
+        # Fail fast: a region that does not answer should not hold a worker for long
+        search_pool = self.client_pool.derive(
+            connect_timeout=min(self._region_search_timeout, DEFAULT_CONNECT_TIMEOUT),
+            read_timeout=self._region_search_timeout,
+            max_attempts=2,
+        )
+        region_width = max(len(region) for region in AWS_REGIONS)
+        feed: ChoicesFeed[Optional[Tuple[str, str]]] = ChoicesFeed()
+
+        def list_region(region: str) -> Iterator[List[str]]:
+            return self.in_region(region, search_pool).iter_password_keys_pages()
+
+        def on_page(region: str, password_keys: List[str]) -> None:
+            feed.push([
+                Choice(f'{region:<{region_width}}  {key}', (region, key))
+                for key in password_keys
+            ])
+
+        def on_region_done(region: str, error: Optional[Exception]) -> None:
+            if error is not None:
+                feed.push([Choice(region, None, disabled_reason=str(error)[:80])])
+
+        search = RegionSearch(
+            list_region,
+            AWS_REGIONS,
+            on_page,
+            on_region_done,
+            max_workers=self._region_search_workers,
+            region_timeout=self._region_search_timeout,
+        )
+        search.start()
+        try:
+            return list_choice_menu(
+                [],
+                'Which password do you want to work on? (all regions)',
+                back=go_back,
+                choices_feed=feed,
+            )
+        finally:
+            search.cancel()
+
+    def load_title_details(self) -> None:
+        self.account_identity     # pylint:disable=pointless-statement
+
     def title(self):
         _title = f"Working on AWS, in region {self.region}:\n"
 
-        _title += '- Account ID: '
-        try:
-            account_id = self.sts_cli.get_caller_identity()['Account']
-            # Spaces for manual alignment with account alias
-            _title += f'   {account_id}\n'
-        except botocore.exceptions.ClientError as e:
-            _title += f' 💥 Error 💥 - {str(e)[:50]}...\n'
+        identity = self.account_identity
+
+        # Spaces for manual alignment with account alias
+        _title += '- Account ID:    '
+        if 'account_id' in identity.errors:
+            _title += f' 💥 Error 💥 - {identity.errors["account_id"][:50]}...\n'
+        else:
+            _title += f'{identity.account_id}\n'
 
         _title += '- Account alias: '
-        try:
-            account_aliases = self.iam_cli.list_account_aliases()['AccountAliases']
-            if account_aliases:
-                _title += f'{account_aliases[0]}\n'
-            else:
-                _title += 'None\n'
-        except botocore.exceptions.ClientError as e:
-            _title += f' 💥 Error 💥 - {str(e)[:50]}...'
+        if 'account_alias' in identity.errors:
+            _title += f' 💥 Error 💥 - {identity.errors["account_alias"][:50]}...'
+        else:
+            _title += f'{identity.account_alias}\n'
 
         backend_description = self.backend_description()
         print(f"""
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, TypeVar
+
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+DEFAULT_MAX_WORKERS = 4
+""" Default number of concurrent API calls for batch operations """
+
+
+@dataclass
+class BatchRetrieval:
+    """ Outcome of `Backend.retrieve_passwords` """
+    values: Dict[str, str] = field(default_factory=dict)
+    """ The password values, by password key """
+    errors: Dict[str, str] = field(default_factory=dict)
+    """ The reason why a password could not be retrieved, by password key """
+
+    def merge(self, other: 'BatchRetrieval') -> None:
+        self.values.update(other.values)
+        self.errors.update(other.errors)
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """ Splits `items` in consecutive chunks of at most `size` items. Consumes `items` lazily """
+    iterator = iter(items)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def map_concurrently(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[R]:
+    """
+    Calls `func` on each item from a pool of `max_workers` threads
+
+    Returns the results in the order of `items`. `func` is expected to handle its own errors, the
+    first exception raised is re-raised here.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
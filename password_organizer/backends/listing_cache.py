@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, List, Optional
+
+
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_TTL = 3600
+""" Seconds after which a cached listing is refreshed in the background """
+
+
+def app_cache_directory() -> str:
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'password-organizer')
+
+
+def default_cache_directory() -> str:
+    return os.path.join(app_cache_directory(), 'listings')
+
+
+def write_private_json(path: str, content: Any) -> None:
+    """ Atomically replaces the file at `path` with `content`. Readable by the current user only """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+            json.dump(content, fp)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@dataclass
+class CachedListing:
+    password_keys: List[str]
+    fetched_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def is_fresh(self, ttl: float) -> bool:
+        return self.age < ttl
+
+
+class ListingCache:
+    """
+    On-disk cache of the password keys listing of a backend
+
+    Only the password keys and some listing metadata are stored, NEVER the password values.
+
+    Parameters
+    ==========
+    namespace: List[str]
+        Identifies the vault the listing comes from (backend class, account, region, ...). Each
+        namespace is stored in its own file
+    directory: Optional[str]
+        Where to store the cache files. Defaults to `$XDG_CACHE_HOME/password-organizer/listings`
+    """
+
+    def __init__(self, namespace: List[str], directory: Optional[str] = None):
+        self.namespace = namespace
+        self.directory = directory or default_cache_directory()
+        digest = hashlib.sha256(json.dumps(namespace).encode('utf-8')).hexdigest()
+        self.path = os.path.join(self.directory, f'{digest}.json')
+
+    def load(self) -> Optional[CachedListing]:
+        """ Returns the cached listing, or None if there is none or it cannot be read """
+        try:
+            with open(self.path, encoding='utf-8') as fp:
+                content = json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+        if (
+            not isinstance(content, dict)
+            or content.get('version') != CACHE_FORMAT_VERSION
+            or content.get('namespace') != self.namespace
+        ):
+            return None
+
+        return CachedListing(
+            password_keys=content.get('password_keys', []),
+            fetched_at=content.get('fetched_at', 0),
+        )
+
+    def save(self, password_keys: List[str], fetched_at: Optional[float] = None) -> None:
+        """ Atomically replaces the cached listing. Readable by the current user only """
+        content = {
+            'version': CACHE_FORMAT_VERSION,
+            'namespace': self.namespace,
+            'fetched_at': time.time() if fetched_at is None else fetched_at,
+            'key_count': len(password_keys),
+            'password_keys': password_keys,
+        }
+
+        write_private_json(self.path, content)
+
+    def update(self, added: Optional[List[str]] = None, removed: Optional[List[str]] = None):
+        """
+        Reflects local changes (password creation / deletion) in the cached listing, if any,
+        without changing its age
+        """
+        cached = self.load()
+        if cached is None:
+            return
+
+        removed_keys = set(removed or [])
+        password_keys = [key for key in cached.password_keys if key not in removed_keys]
+        known_keys = set(password_keys)
+        password_keys.extend(key for key in added or [] if key not in known_keys)
+        self.save(password_keys, fetched_at=cached.fetched_at)
+
+    def clear(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
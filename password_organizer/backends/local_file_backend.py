@@ -0,0 +1,160 @@
+from functools import partial
+import os
+from typing import Iterator, List, Optional
+
+from exceptions import InvalidVault
+from .base import Backend, ListType
+from .batch import BatchRetrieval
+from .vault_file import DEFAULT_SCRYPT_N, VaultFile
+from ..menu import read_password
+
+
+PASSPHRASE_ENV = 'PASSWORD_ORGANIZER_PASSPHRASE'
+VAULT_PATH_ENV = 'PASSWORD_ORGANIZER_VAULT'
+
+
+def default_vault_path() -> str:
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(data_home, 'password-organizer', 'vault.pov')
+
+
+class LocalFileBackend(Backend):
+    """
+    Stores the passwords in a local file, encrypted with a passphrase (see `vault_file`)
+
+    No network: for offline hosts, and as a stand-in for the remote backends in tests. Lookups and
+    prefix listings go through a memory-mapped index, and stay fast with hundreds of thousands of
+    passwords.
+
+    Parameters
+    ==========
+    vault_path: Optional[str]
+        The vault file, created on first use. Defaults to $PASSWORD_ORGANIZER_VAULT, or to
+        `$XDG_DATA_HOME/password-organizer/vault.pov`
+    passphrase: Optional[str]
+        Defaults to $PASSWORD_ORGANIZER_PASSPHRASE. Asked in `initialize` when not set
+    scrypt_n: int
+        Cost of the key derivation of a new vault. Lower it in tests only
+    """
+
+    PREFETCH_BY_DEFAULT = True
+    PAGE_SIZE = 10
+    """ Number of passwords per page when the user navigates the pages """
+    PREFETCH_PAGE_SIZE = 1000
+
+    def __init__(
+        self,
+        *args,
+        vault_path: Optional[str] = None,
+        passphrase: Optional[str] = None,
+        scrypt_n: int = DEFAULT_SCRYPT_N,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.vault_path = vault_path or os.environ.get(VAULT_PATH_ENV) or default_vault_path()
+        self._passphrase = passphrase or os.environ.get(PASSPHRASE_ENV)
+        self._scrypt_n = scrypt_n
+        self._vault: Optional[VaultFile] = None
+
+    def initialize(self) -> None:
+        passphrase = self._passphrase
+        if passphrase is None:
+            passphrase = read_password(f'Please enter the passphrase of {self.vault_path}:')
+            if not os.path.exists(self.vault_path):
+                confirmation = read_password('New vault. Please enter the passphrase again:')
+                if confirmation != passphrase:
+                    raise InvalidVault('the passphrases do not match')
+        self._vault = VaultFile(self.vault_path, passphrase, scrypt_n=self._scrypt_n)
+        # Not kept around longer than needed
+        self._passphrase = None
+
+    @property
+    def vault(self) -> VaultFile:
+        if self._vault is None:
+            raise RuntimeError('The backend is not initialized')
+        return self._vault
+
+    def close(self) -> None:
+        if self._vault is not None:
+            self._vault.close()
+            self._vault = None
+
+    def title(self) -> None:
+        print(f"""
+===========================================
+Working on the local vault {self.vault_path}
+- Passwords: {len(self.vault)}
+===========================================
+
+Passwords are encrypted with AES-256-GCM, with a key derived from the passphrase
+""")
+
+    def listing_cache_namespace(self) -> Optional[List[str]]:
+        # The listing is read from the local index already
+        return None
+
+    def list_password_keys(self) -> ListType:
+        return self._list_page(None, self.PREFETCH_PAGE_SIZE if self._prefetch else self.PAGE_SIZE)
+
+    def _list_page(self, start_after: Optional[str], page_size: int) -> ListType:
+        keys = []
+        for key in self.vault.keys(start_after=start_after):
+            keys.append(key)
+            if len(keys) > page_size:
+                break
+        if len(keys) > page_size:
+            return keys[:page_size], partial(self._list_page, keys[page_size - 1], page_size)
+        return keys, None
+
+    def iter_password_keys_pages(self) -> Iterator[List[str]]:
+        return self._iter_pages(self.vault.keys())
+
+    def _iter_pages(self, keys: Iterator[str]) -> Iterator[List[str]]:
+        page: List[str] = []
+        for key in keys:
+            page.append(key)
+            if len(page) == self.PREFETCH_PAGE_SIZE:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def search_password_keys(self, search_string: str) -> Iterator[List[str]]:
+        """
+        The keys starting with the search when it is a path (`/prod/d`), found in O(log n). The
+        keys containing it otherwise
+        """
+        if search_string.startswith('/'):
+            return self._iter_pages(self.vault.keys(prefix=search_string))
+        return self._iter_pages(key for key in self.vault.keys() if search_string in key)
+
+    def retrieve_password(self, key: str) -> str:
+        value = self.vault.get(key)
+        if value is None:
+            raise LookupError(f'No password {key}')
+        return value
+
+    def retrieve_passwords(self, keys: List[str]) -> BatchRetrieval:
+        # Local, and in memory most of the time: threads would only add overhead
+        result = BatchRetrieval()
+        for key in keys:
+            try:
+                value = self.vault.get(key)
+            except InvalidVault as e:
+                result.errors[key] = e.display_message
+                continue
+            if value is None:
+                result.errors[key] = 'Not found'
+            else:
+                result.values[key] = value
+        return result
+
+    def create_password(self, password_key: str, password_value: str) -> None:
+        self.vault.put(password_key, password_value)
+
+    def update_password(self, key: str, password_value: str) -> None:
+        self.vault.put(key, password_value)
+
+    def delete_password(self, password_key: str) -> None:
+        if not self.vault.delete(password_key):
+            raise LookupError(f'No password {password_key}')
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+import threading
+import time
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class ExpiringLRUCache(Generic[K, V]):
+    """
+    In-memory cache of at most `max_entries` entries, shared between threads
+
+    Entries expire `ttl` seconds after they were stored. When the cache is full, the least recently
+    used entry makes room for the new one. Nothing is ever written to disk: it may hold secrets.
+
+    Parameters
+    ==========
+    max_entries: int
+        Number of entries above which the least recently used ones are dropped
+    ttl: float
+        Seconds after which an entry is dropped
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        if max_entries < 1:
+            raise ValueError(f'The cache must hold at least 1 entry, got {max_entries}')
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[K, Tuple[float, V]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        """ The value stored under `key`. None if there is none, or if it expired """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,221 @@
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+from ..cli_menu.choice import Choice, ChoicesFeed
+from .prefetch import listing_failed_choice, PausablePrefetcher
+
+
+ROOT = '/'
+SEPARATOR = '/'
+
+SUBTREE_PAGES = 4
+""" Pages of the listing below a folder fetched to find its subfolders, each time they are asked """
+
+
+class FolderPath(str):
+    """ The path of a folder, like `/prod/db/`. Tells folders from password keys in the menus """
+
+
+def parent_folder(path: str) -> FolderPath:
+    """ The folder of a password key, or the parent of a folder """
+    index = path.rstrip(SEPARATOR).rfind(SEPARATOR)
+    return FolderPath(path[:index + 1] if index >= 0 else ROOT)
+
+
+class Folder:
+    """
+    A folder of a `PathTree`: its password keys and subfolders, as they are known so far
+
+    They are pushed to `feed` as they are found, which a menu can subscribe to: it is delivered the
+    content found before it subscribed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.feed: ChoicesFeed = ChoicesFeed()
+        self.is_complete = False
+        """ Whether all its keys and subfolders are known """
+        self.has_failed = False
+        """ Whether one of its listings failed: it may never be complete """
+        self.subtree_pages_left = 0
+        """ Pages of `subtree_listing` still to fetch before it pauses, see `PathTree.load_more` """
+        self._names: Set[str] = set()
+        self.keys_listing: Optional[PausablePrefetcher] = None
+        self.subtree_listing: Optional[PausablePrefetcher] = None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def add(self, names: List[str]) -> None:
+        """ Adds password keys and subfolders (`FolderPath`), those already known are ignored """
+        new_names = [name for name in names if name not in self._names]
+        if not new_names:
+            return
+        self._names.update(new_names)
+        self.feed.push([Choice(self._relative_name(name), name) for name in new_names])
+
+    def _relative_name(self, name: str) -> str:
+        # Keys out of any hierarchy, like `password`, are in the root folder
+        return name[len(self.path):] if name.startswith(self.path) else name
+
+    def remove(self, key: str) -> None:
+        if key in self._names:
+            self._names.remove(key)
+            self.feed.discard([key])
+
+    def fail(self, error: Exception) -> None:
+        """ Tells the menu that the folder is only partly listed """
+        if not self.has_failed:
+            self.has_failed = True
+            self.feed.push([listing_failed_choice(error)])
+
+    def pause(self) -> None:
+        for listing in (self.keys_listing, self.subtree_listing):
+            if listing is not None:
+                listing.pause()
+
+    def complete(self) -> None:
+        self.is_complete = True
+        self.pause()
+        self.keys_listing = self.subtree_listing = None
+
+
+class PathTree:
+    """
+    The password keys of a backend, browsed as a tree of folders: `/prod/db/password` is the key
+    `password` of the folder `/prod/db/`, itself in the folder `/prod/`
+
+    A folder is loaded when it is opened, in the background:
+    - its own password keys, with `list_keys`
+    - its subfolders, found in the listing of all the keys below it, with `list_subtree`. The keys
+      of the subfolders it finds on the way are kept too. This listing can be as long as the whole
+      subtree: only `subtree_pages` of it are fetched, then `load_more` fetches as many again
+    Both listings are paused when the folder is closed, and resumed where they were left when it is
+    opened again. So only the folders the user looks at are listed. Once the listing of a folder is
+    complete, the folder and all its subfolders are: they are never listed again. A listing that
+    fails is reported in the folder, which is then left incomplete.
+
+    Parameters
+    ==========
+    list_keys: Callable[[str], Iterator[List[str]]]
+        Yields the pages of the password keys in a folder, not in its subfolders
+    list_subtree: Callable[[str], Iterator[List[str]]]
+        Yields the pages of the password keys in a folder and in all its subfolders
+    subtree_pages: int
+        Pages of `list_subtree` fetched when a folder is first opened, and by each `load_more`
+    """
+
+    def __init__(
+        self,
+        list_keys: Callable[[str], Iterator[List[str]]],
+        list_subtree: Callable[[str], Iterator[List[str]]],
+        subtree_pages: int = SUBTREE_PAGES,
+    ):
+        self._list_keys = list_keys
+        self._list_subtree = list_subtree
+        self._subtree_pages = subtree_pages
+        self._folders: Dict[str, Folder] = {}
+        self._lock = threading.RLock()
+
+    def open(self, path: str) -> Folder:
+        """ The folder at `path`, whose loading starts or resumes. Close it once done with it """
+        with self._lock:
+            folder = self._folder(path)
+            if folder.is_complete:
+                return folder
+
+            if folder.keys_listing is None:
+                folder.keys_listing = PausablePrefetcher(
+                    self._list_keys(path),
+                    lambda keys: self._add_keys(path, keys),
+                    on_error=lambda error: self._fail(path, error),
+                )
+            if folder.subtree_listing is None:
+                folder.subtree_listing = PausablePrefetcher(
+                    self._list_subtree(path),
+                    lambda keys: self._add_subtree_keys(path, keys),
+                    lambda: self._complete(path),
+                    lambda error: self._fail(path, error),
+                )
+                folder.subtree_pages_left = self._subtree_pages
+            folder.keys_listing.resume()
+            if folder.subtree_pages_left > 0:
+                folder.subtree_listing.resume()
+            return folder
+
+    def load_more(self, path: str) -> None:
+        """ Fetches more of the listing below the open folder at `path`, to find more subfolders """
+        with self._lock:
+            folder = self._folders.get(path)
+            if folder is None or folder.subtree_listing is None:
+                return
+            folder.subtree_pages_left += self._subtree_pages
+            folder.subtree_listing.resume()
+
+    def close(self, path: str) -> None:
+        """ Pauses the loading of the folder at `path` """
+        with self._lock:
+            folder = self._folders.get(path)
+            if folder is not None:
+                folder.pause()
+
+    def add_key(self, key: str) -> None:
+        """ Records a password key created, in its folder if it was loaded """
+        with self._lock:
+            folder = self._folders.get(parent_folder(key))
+            if folder is not None:
+                folder.add([key])
+
+    def remove_key(self, key: str) -> None:
+        """ Forgets a deleted password key """
+        with self._lock:
+            folder = self._folders.get(parent_folder(key))
+            if folder is not None:
+                folder.remove(key)
+
+    def _folder(self, path: str) -> Folder:
+        folder = self._folders.get(path)
+        if folder is None:
+            folder = Folder(path)
+            self._folders[path] = folder
+        return folder
+
+    def _add_keys(self, path: str, keys: List[str]) -> None:
+        with self._lock:
+            self._folder(path).add(keys)
+
+    def _add_subtree_keys(self, path: str, keys: List[str]) -> None:
+        """ Files the keys found below the folder at `path`, creating their folders on the way """
+        with self._lock:
+            # Added in one go per folder. Ordered sets
+            additions: Dict[str, Dict[str, None]] = {}
+            for key in keys:
+                folder_path = parent_folder(key)
+                additions.setdefault(folder_path, {})[key] = None
+                # Up to the folder listed, unless the rest of the way is already known
+                while len(folder_path) > len(path):
+                    parent_path = parent_folder(folder_path)
+                    parent_additions = additions.setdefault(parent_path, {})
+                    if folder_path in parent_additions or folder_path in self._folder(parent_path):
+                        break
+                    parent_additions[folder_path] = None
+                    folder_path = parent_path
+
+            for added_to, names in additions.items():
+                self._folder(added_to).add(list(names))
+
+            folder = self._folder(path)
+            folder.subtree_pages_left -= 1
+            if folder.subtree_pages_left <= 0 and folder.subtree_listing is not None:
+                folder.subtree_listing.pause()
+
+    def _fail(self, path: str, error: Exception) -> None:
+        with self._lock:
+            self._folder(path).fail(error)
+
+    def _complete(self, path: str) -> None:
+        """ All the keys below the folder at `path` are known: so are all its subfolders """
+        with self._lock:
+            for folder_path, folder in self._folders.items():
+                if folder_path.startswith(path):
+                    folder.complete()
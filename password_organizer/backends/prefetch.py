@@ -0,0 +1,165 @@
+from concurrent.futures import Future
+import threading
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+from ..cli_menu.choice import Choice
+
+
+T = TypeVar('T')
+
+
+class ListingFailed:
+    """ The value of the choice telling that a listing failed. Used just as a type """
+
+
+def listing_failed_choice(error: Exception) -> Choice:
+    """ A disabled choice telling, in a listing menu, that the keys listed are not all of them """
+    return Choice('Listing failed', ListingFailed, disabled_reason=str(error)[:80])
+
+
+def run_in_background(func: Callable[[], T]) -> 'Future[T]':
+    """
+    Calls `func` in a daemon thread, so that an exit of the program never waits for it
+
+    Returns a future of its result (or of the exception it raised)
+    """
+    future: 'Future[T]' = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func())
+        except BaseException as e:      # pylint:disable=broad-except
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+class PasswordKeysPrefetcher:
+    """
+    Walks the pages of a password keys listing (see `Backend.iter_password_keys_pages`) in a
+    background thread
+
+    Each page is handed to `on_page` as soon as it has been fetched, so that the keys can be
+    displayed progressively. Once all the pages have been fetched, `on_done` is called. If the
+    listing fails instead, `on_error` is called with the exception, and `on_done` is not: the pages
+    fetched are not the whole listing. All are called from the background thread.
+    """
+
+    def __init__(
+        self,
+        pages: Iterable[List[str]],
+        on_page: Callable[[List[str]], None],
+        on_done: Optional[Callable[[], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        self._pages = pages
+        self._on_page = on_page
+        self._on_done = on_done
+        self._on_error = on_error
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """ Stops fetching pages. The page being fetched, if any, is discarded """
+        self._cancelled.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._thread.join(timeout)
+
+    @property
+    def is_done(self) -> bool:
+        return not self._thread.is_alive()
+
+    def _run(self) -> None:
+        try:
+            for password_keys in self._pages:
+                if self._cancelled.is_set():
+                    return
+                self._on_page(password_keys)
+            if self._on_done is not None and not self._cancelled.is_set():
+                self._on_done()
+        except Exception as e:      # pylint:disable=broad-except
+            # Nobody is there to catch it in the background thread
+            if self._on_error is not None and not self._cancelled.is_set():
+                self._on_error(e)
+
+
+class PausablePrefetcher:
+    """
+    Walks the pages of a listing in a background thread while it is wanted: unlike
+    `PasswordKeysPrefetcher`, it can be paused and resumed where it was left
+
+    When paused, it stops after the page being fetched, which is still handed to `on_page`. Once all
+    the pages have been fetched, `on_done` is called, or `on_error` if the listing failed. All are
+    called from the background thread.
+    """
+
+    def __init__(
+        self,
+        pages: Iterable[List[str]],
+        on_page: Callable[[List[str]], None],
+        on_done: Optional[Callable[[], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        self._pages = iter(pages)
+        self._on_page = on_page
+        self._on_done = on_done
+        self._on_error = on_error
+        self._lock = threading.Lock()
+        self._paused = True
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+
+    def resume(self) -> None:
+        with self._lock:
+            self._paused = False
+            if self._thread is None and not self._done.is_set():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def pause(self) -> None:
+        with self._lock:
+            self._paused = True
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """ Waits until all the pages are fetched, or until the prefetcher is paused """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @property
+    def is_done(self) -> bool:
+        """ Whether all the pages were fetched, or the listing failed """
+        return self._done.is_set()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._paused:
+                    self._thread = None
+                    return
+            try:
+                password_keys = next(self._pages, None)
+                if password_keys is None:
+                    self._finish()
+                    if self._on_done is not None:
+                        self._on_done()
+                    return
+                self._on_page(password_keys)
+            except Exception as e:      # pylint:disable=broad-except
+                # Nobody is there to catch it in the background thread
+                self._finish()
+                if self._on_error is not None:
+                    self._on_error(e)
+                return
+
+    def _finish(self) -> None:
+        with self._lock:
+            self._done.set()
+            self._thread = None
@@ -0,0 +1,174 @@
+from collections import deque
+import random
+import threading
+import time
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter, shared between threads
+
+    Allows `rate` operations per second on average, with bursts of up to `capacity` operations.
+    Used to stay under the API rate limits (TPS) of the backends instead of getting throttled.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"The rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """ Blocks until `tokens` operations are allowed """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+RATE_WINDOW = 1.0
+""" Seconds over which the rate of the calls is measured """
+
+
+class AdaptiveRateController:
+    """
+    Client-side rate limiter whose rate follows the throttling of the API, shared between threads
+
+    Additive increase, multiplicative decrease (AIMD):
+    - The calls are not limited until the first throttling
+    - On throttling, the rate drops to `decrease_factor` times the current rate (the rate measured
+      over the last second, the first time). The throttlings of the calls sent before the drop are
+      only counted: the rate already dropped for them
+    - Each call that goes through raises the rate by `increase / rate`, that is by `increase`
+      calls per second every second, up to `max_rate`
+
+    The calls are spaced by 1 / rate, give or take `jitter` of it, so that the threads waiting for
+    their turn do not call in lockstep.
+    """
+
+    def __init__(
+        self,
+        min_rate: float = 0.5,
+        max_rate: Optional[float] = None,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        jitter: float = 0.2,
+    ):
+        if min_rate <= 0:
+            raise ValueError(f"The minimum rate must be positive, got {min_rate}")
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"The decrease factor must be between 0 and 1, got {decrease_factor}")
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.jitter = jitter
+        self.rate: Optional[float] = None
+        """ Calls allowed per second. None until the first throttling """
+        self.calls = 0
+        self.throttles = 0
+        self._next_call = 0.0
+        self._last_decrease = float('-inf')
+        self._recent_calls: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Blocks until a call is allowed
+
+        Returns
+        -------
+        float
+            The time of the call, to pass to `on_throttle`
+        """
+        with self._lock:
+            now = time.monotonic()
+            call_time = now
+            if self.rate is not None:
+                call_time = max(now, self._next_call)
+                interval = random.uniform(1 - self.jitter, 1 + self.jitter) / self.rate
+                self._next_call = call_time + interval
+            self.calls += 1
+            self._recent_calls.append(call_time)
+            while self._recent_calls[0] < now - RATE_WINDOW:
+                self._recent_calls.popleft()
+
+        if call_time > now:
+            time.sleep(call_time - now)
+        return call_time
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.rate is not None:
+                self.rate += self.increase / self.rate
+                if self.max_rate is not None:
+                    self.rate = min(self.rate, self.max_rate)
+
+    def on_throttle(self, call_time: float) -> None:
+        """ The call made at `call_time` (see `acquire`) was throttled """
+        with self._lock:
+            self.throttles += 1
+            if call_time <= self._last_decrease:
+                return
+
+            now = time.monotonic()
+            if self.rate is None:
+                self.rate = len([t for t in self._recent_calls if t >= now - RATE_WINDOW])
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._last_decrease = now
+            self._next_call = max(self._next_call, now + 1 / self.rate)
+
+
+class RateControllers:
+    """
+    The `AdaptiveRateController` of each (service, region, operation), created on first use
+
+    Parameters
+    ==========
+    controller_options: Dict[str, Any]
+        The parameters of the controllers, see `AdaptiveRateController`
+    """
+
+    def __init__(self, **controller_options: Any):
+        self._controller_options = controller_options
+        self._controllers: Dict[Tuple[str, str, str], AdaptiveRateController] = {}
+        self._lock = threading.Lock()
+
+    def controller(self, service: str, region: str, operation: str) -> AdaptiveRateController:
+        with self._lock:
+            controller = self._controllers.get((service, region, operation))
+            if controller is None:
+                controller = AdaptiveRateController(**self._controller_options)
+                self._controllers[(service, region, operation)] = controller
+            return controller
+
+    def throttle_counts(self) -> Dict[Tuple[str, str, str], int]:
+        """ The number of throttled calls of each (service, region, operation) throttled so far """
+        with self._lock:
+            return {
+                key: controller.throttles
+                for key, controller in self._controllers.items()
+                if controller.throttles
+            }
+
+
+def throttles_since(before: Dict[str, int], after: Dict[str, int]) -> Dict[str, int]:
+    """ The throttles counted between 2 calls to `Backend.throttle_counts` """
+    return {
+        operation: count - before.get(operation, 0)
+        for operation, count in after.items()
+        if count > before.get(operation, 0)
+    }
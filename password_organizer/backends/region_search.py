@@ -0,0 +1,109 @@
+from concurrent.futures import TimeoutError as FutureTimeout
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from .prefetch import run_in_background
+
+
+DEFAULT_MAX_WORKERS = 8
+""" Regions listed concurrently """
+DEFAULT_REGION_TIMEOUT = 10.0
+""" Seconds after which the listing of a region is abandoned """
+
+
+class RegionTimeout(Exception):
+    """ A region did not list all its password keys in time """
+
+
+class RegionSearch:
+    """
+    Lists the password keys of several regions concurrently, from a bounded pool of daemon threads
+
+    Each page of keys is handed to `on_page` as soon as it is fetched, so that a slow or unreachable
+    region never holds back the others. Once a region is done, `on_region_done` is called with the
+    error that stopped it, if any. A region still listing after `region_timeout` seconds ends with a
+    `RegionTimeout`, even in the middle of a call: each page is fetched in a thread of its own, left
+    to finish in the background while the worker moves on, its page discarded. Both callbacks are
+    called from the worker threads.
+
+    Parameters
+    ==========
+    list_region: Callable[[str], Iterator[List[str]]]
+        Yields the pages of the password keys listing of a region
+    """
+
+    def __init__(
+        self,
+        list_region: Callable[[str], Iterator[List[str]]],
+        regions: Iterable[str],
+        on_page: Callable[[str, List[str]], None],
+        on_region_done: Optional[Callable[[str, Optional[Exception]], None]] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        region_timeout: float = DEFAULT_REGION_TIMEOUT,
+    ):
+        self._list_region = list_region
+        self._on_page = on_page
+        self._on_region_done = on_region_done
+        self._region_timeout = region_timeout
+        self._regions: 'queue.Queue[str]' = queue.Queue()
+        for region in regions:
+            self._regions.put(region)
+        self._cancelled = threading.Event()
+        self._workers = [
+            threading.Thread(target=self._run, daemon=True)
+            for _ in range(min(max_workers, self._regions.qsize()))
+        ]
+
+    def start(self) -> None:
+        for worker in self._workers:
+            worker.start()
+
+    def cancel(self) -> None:
+        """ Stops listing. The pages being fetched, if any, are discarded """
+        self._cancelled.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        for worker in self._workers:
+            worker.join(timeout)
+
+    @property
+    def is_done(self) -> bool:
+        return not any(worker.is_alive() for worker in self._workers)
+
+    def _run(self) -> None:
+        while not self._cancelled.is_set():
+            try:
+                region = self._regions.get_nowait()
+            except queue.Empty:
+                return
+
+            error = self._search_region(region)
+            if self._on_region_done is not None and not self._cancelled.is_set():
+                self._on_region_done(region, error)
+
+    def _search_region(self, region: str) -> Optional[Exception]:
+        deadline = time.monotonic() + self._region_timeout
+        pages: Optional[Iterator[List[str]]] = None
+
+        def next_page() -> Optional[List[str]]:
+            nonlocal pages
+            if pages is None:
+                pages = iter(self._list_region(region))
+            return next(pages, None)
+
+        try:
+            while not self._cancelled.is_set():
+                page = run_in_background(next_page)
+                try:
+                    password_keys = page.result(timeout=max(deadline - time.monotonic(), 0))
+                except FutureTimeout:
+                    return RegionTimeout(f'No answer within {self._region_timeout:g}s')
+                if password_keys is None or self._cancelled.is_set():
+                    return None
+                self._on_page(region, password_keys)
+        except Exception as e:      # pylint:disable=broad-except
+            # e.g. region not enabled for the account, or not reachable
+            return e
+        return None
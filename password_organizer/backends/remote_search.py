@@ -0,0 +1,124 @@
+import threading
+from typing import Callable, Iterable, Iterator, List, Optional, Set
+
+from ..cli_menu.choice import Choice, ChoicesFeed
+
+
+DEFAULT_DEBOUNCE = 0.3
+""" Seconds without typing after which the search is sent to the backend """
+MIN_SEARCH_LENGTH = 2
+""" Shorter search strings match too many keys to be worth a query """
+
+
+class SearchFailed:
+    """ The value of the choices telling that a search failed, with the search string """
+
+
+class RemoteSearch:
+    """
+    Searches the password keys with the backend, as the user types in a listing menu, so that the
+    search finds keys that were not listed yet
+
+    Queries are debounced: one is sent once the search string stayed the same for `debounce`
+    seconds. A new query cancels the one in progress, whose next pages are not fetched. The keys
+    found are pushed to `feed`, unless they are already in the menu: they are merged with the
+    listed ones, and searched like them. A query that fails is reported in the menu by a disabled
+    choice, found by the search string it failed for.
+
+    Parameters
+    ==========
+    search_pages: Callable[[str], Iterator[List[str]]]
+        Yields the pages of the password keys matching a search string
+    feed: ChoicesFeed[str]
+        The feed of the menu
+    known_keys: Iterable[str]
+        The keys the menu starts with
+    """
+
+    def __init__(
+        self,
+        search_pages: Callable[[str], Iterator[List[str]]],
+        feed: ChoicesFeed,
+        known_keys: Iterable[str],
+        debounce: float = DEFAULT_DEBOUNCE,
+    ):
+        self._search_pages = search_pages
+        self._feed = feed
+        self._known: Set[str] = set(known_keys)
+        self._debounce = debounce
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        # Incremented by each search: the queries of the previous ones stop
+        self._generation = 0
+        self._forwarded: List = []
+        self._failed: Set[str] = set()
+
+    def forward(self, source: ChoicesFeed) -> None:
+        """ Pushes the keys of another feed, like the listing ones, to the feed of the menu """
+        def listener(added: List[Choice], removed: List) -> None:
+            with self._lock:
+                new_choices = [choice for choice in added if choice.value not in self._known]
+                self._known.update(choice.value for choice in new_choices)
+                self._known.difference_update(removed)
+            if new_choices or removed:
+                self._feed.push(new_choices)
+                if removed:
+                    self._feed.discard(removed)
+
+        self._forwarded.append((source, listener))
+        source.subscribe(listener)
+
+    def search(self, search_string: str) -> None:
+        """ Called as the search string changes """
+        with self._lock:
+            self._generation += 1
+            if self._timer is not None:
+                # Kept to be joined: the query may have started already
+                self._timer.cancel()
+            if len(search_string) < MIN_SEARCH_LENGTH:
+                return
+
+            self._timer = threading.Timer(
+                self._debounce, self._query, (search_string, self._generation)
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self) -> None:
+        """ Stops searching, and forwarding. To be called once the menu is done """
+        self.search('')
+        for source, listener in self._forwarded:
+            source.unsubscribe(listener)
+        self._forwarded = []
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """ Waits for the last query, even cancelled """
+        timer = self._timer
+        if timer is not None:
+            timer.join(timeout)
+
+    def _query(self, search_string: str, generation: int) -> None:
+        try:
+            pages = self._search_pages(search_string)
+            while generation == self._generation:
+                password_keys = next(pages, None)
+                if password_keys is None:
+                    return
+                with self._lock:
+                    if generation != self._generation:
+                        return
+                    new_keys = [key for key in password_keys if key not in self._known]
+                    self._known.update(new_keys)
+                if new_keys:
+                    self._feed.push([Choice.from_string(key) for key in new_keys])
+        except Exception as e:      # pylint:disable=broad-except
+            # The search is a bonus: the listed keys are still searched
+            with self._lock:
+                if generation != self._generation or search_string in self._failed:
+                    return
+                self._failed.add(search_string)
+            self._feed.push([Choice(
+                f'Search failed: {search_string}',
+                (SearchFailed, search_string),
+                disabled_reason=str(e)[:80],
+            )])
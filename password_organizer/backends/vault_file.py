@@ -0,0 +1,735 @@
+"""
+The storage of the local backend: passwords encrypted in one file, with a memory-mapped index
+
+The vault file is a log: a header, then one record per write, appended. A record holds the key in
+clear and the value encrypted with AES-256-GCM, the key (and the vault ID) being authenticated along
+with the value. Each record, deletions included, also ends with a MAC of its content, of its offset
+in the file and of the generation of the file: a record cannot be forged, moved, replayed, or
+removed from the middle of the log without the vault failing to open. The encryption and MAC keys
+are derived from a passphrase with scrypt. Only the value of the entry looked up is ever decrypted.
+
+The index file, next to the vault, maps the keys to their last record: a hash table for the
+lookups, and the keys sorted for the prefix listings. It is memory-mapped, and checked against its
+own MAC when the vault is opened. The records appended since the index was written are indexed in
+memory, and once there are too many of them the vault is compacted: the live records are copied to
+a new vault file, a new index is written, and both replace the old ones atomically. The index is
+only derived data: when it is missing, or does not match the vault, it is built again from the
+vault.
+
+What cannot be detected: the last records being cut off, and the whole vault being replaced by an
+older copy of it.
+
+Several processes can use a vault at the same time: they lock a file next to it, shared to read,
+exclusive to write, and catch up with the writes and compactions of the others. Not on Windows,
+where one process at a time should use a vault.
+
+Like the listing cache, the keys are stored in clear, never the values.
+"""
+from array import array
+from contextlib import contextmanager
+import hashlib
+import heapq
+import hmac
+from itertools import islice
+import mmap
+import os
+import struct
+import sys
+import threading
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from exceptions import InvalidVault, WrongPassphrase
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None    # type:ignore
+
+
+VAULT_MAGIC = b'POVAULT2'
+INDEX_MAGIC = b'POINDEX2'
+
+DEFAULT_SCRYPT_N = 2 ** 15
+""" CPU / memory cost of the key derivation: about 0.1s and 32MB """
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+MIN_COMPACTION_THRESHOLD = 1024
+""" Records appended since the last compaction above which the vault is compacted... """
+COMPACTION_RATIO = 8
+""" ... or above 1 / COMPACTION_RATIO of the entries, for big vaults """
+
+KEYS_BATCH_SIZE = 1000
+""" Keys read from the index at a time by the listings """
+
+CHECK_PLAINTEXT = b'password-organizer vault check!!'
+MAC_LABEL = b'password-organizer vault mac'
+NONCE_SIZE = 12
+TAG_SIZE = 16
+RECORD_MAC_SIZE = 16
+INDEX_MAC_SIZE = 32
+
+# magic, vault ID, salt, scrypt n, r, p, check nonce, check ciphertext, generation
+VAULT_HEADER = struct.Struct(f'<8s16s16sIII{NONCE_SIZE}s{len(CHECK_PLAINTEXT) + TAG_SIZE}s16s')
+CHECK_AAD_SIZE = 8 + 16 + 16 + 4 * 3
+""" The part of the header authenticated by the check ciphertext: the generation changes """
+# Size of the rest of the record (MAC included), operation, key size
+RECORD_HEADER = struct.Struct('<IBH')
+PUT = 1
+DELETE = 2
+RECORD_OFFSET = struct.Struct('<Q')
+
+# magic, generation, vault bytes indexed, entries, hash table slots. Followed by the MAC
+INDEX_FIELDS = struct.Struct('<8s16sQII')
+INDEX_HEADER_SIZE = INDEX_FIELDS.size + INDEX_MAC_SIZE
+# key offset in the keys blob, key size, record offset, record size
+INDEX_ENTRY = struct.Struct('<QIQI')
+SLOT = struct.Struct('<I')
+
+Location = Tuple[int, int]
+""" Offset and size of a record in the vault file """
+
+
+def _key_hash(key: bytes) -> int:
+    # Stable across processes, unlike `hash`
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+def _fsync_directory(path: str) -> None:
+    """ Makes a rename in the directory of `path` durable. Not possible on Windows """
+    if sys.platform == 'win32':
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class KeyIndex:
+    """
+    A memory-mapped index file: O(1) lookups in its hash table, O(log n) prefix listings in its
+    sorted keys
+
+    Raises
+    ======
+    ValueError
+        when the file is not an index, or does not match its MAC
+    """
+
+    def __init__(self, path: str, mac_key: bytes):
+        with open(path, 'rb') as fp:
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self.generation, self.indexed_length, self.count, self._slots = (
+                INDEX_FIELDS.unpack_from(self._mmap, 0)
+            )
+            if magic != INDEX_MAGIC:
+                raise ValueError('Not an index file')
+            if not hmac.compare_digest(self._mac(mac_key), self._stored_mac()):
+                raise ValueError('The index was tampered with')
+        except (struct.error, ValueError) as e:
+            self.close()
+            raise ValueError(str(e))
+        self._entries_start = INDEX_HEADER_SIZE
+        self._table_start = self._entries_start + self.count * INDEX_ENTRY.size
+        self._keys_start = self._table_start + self._slots * SLOT.size
+
+    def _stored_mac(self) -> bytes:
+        return self._mmap[INDEX_FIELDS.size:INDEX_HEADER_SIZE]
+
+    def _mac(self, mac_key: bytes) -> bytes:
+        mac = hmac.new(mac_key, digestmod=hashlib.sha256)
+        with memoryview(self._mmap) as view:
+            mac.update(view[:INDEX_FIELDS.size])
+            mac.update(view[INDEX_HEADER_SIZE:])
+        return mac.digest()
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def _entry(self, position: int) -> Tuple[bytes, int, int]:
+        key_offset, key_size, record_offset, record_size = INDEX_ENTRY.unpack_from(
+            self._mmap, self._entries_start + position * INDEX_ENTRY.size
+        )
+        start = self._keys_start + key_offset
+        return self._mmap[start:start + key_size], record_offset, record_size
+
+    def lookup(self, key: bytes) -> Optional[Location]:
+        if not self._slots:
+            return None
+        mask = self._slots - 1
+        slot = _key_hash(key) & mask
+        while True:
+            position = SLOT.unpack_from(self._mmap, self._table_start + slot * SLOT.size)[0]
+            if not position:
+                return None
+            entry_key, record_offset, record_size = self._entry(position - 1)
+            if entry_key == key:
+                return record_offset, record_size
+            slot = (slot + 1) & mask
+
+    def _lower_bound(self, key: bytes) -> int:
+        """ The position of the first key not lower than `key` """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def iter_from(self, start: bytes) -> Iterator[Tuple[bytes, int, int]]:
+        """ The (key, record offset, record size) of the keys from `start` on, in order """
+        mapped = self._mmap
+        offset = self._entries_start + self._lower_bound(start) * INDEX_ENTRY.size
+        unpack_from = INDEX_ENTRY.unpack_from
+        while offset < self._table_start:
+            key_offset, key_size, record_offset, record_size = unpack_from(mapped, offset)
+            key_start = self._keys_start + key_offset
+            yield mapped[key_start:key_start + key_size], record_offset, record_size
+            offset += INDEX_ENTRY.size
+
+    @staticmethod
+    def write(
+        path: str,
+        mac_key: bytes,
+        generation: bytes,
+        indexed_length: int,
+        entries: Sequence[Tuple[bytes, int, int]],
+    ) -> None:
+        """ Writes the index of `entries`, sorted by key, atomically """
+        slots = 8
+        while slots < 2 * len(entries):
+            slots *= 2
+        table = array('I', [0]) * slots
+        entry_structs = []
+        key_offset = 0
+        for position, (key, record_offset, record_size) in enumerate(entries):
+            entry_structs.append(
+                INDEX_ENTRY.pack(key_offset, len(key), record_offset, record_size)
+            )
+            key_offset += len(key)
+            slot = _key_hash(key) & (slots - 1)
+            while table[slot]:
+                slot = (slot + 1) & (slots - 1)
+            table[slot] = position + 1
+        if table.itemsize != SLOT.size:
+            raise RuntimeError('Unsupported platform: unsigned int is not 4 bytes')
+        if sys.byteorder == 'big':
+            table.byteswap()
+
+        fields = INDEX_FIELDS.pack(INDEX_MAGIC, generation, indexed_length, len(entries), slots)
+        parts = [b''.join(entry_structs), table.tobytes(), b''.join(key for key, _, _ in entries)]
+        mac = hmac.new(mac_key, fields, hashlib.sha256)
+        for part in parts:
+            mac.update(part)
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as fp:
+            fp.write(fields + mac.digest())
+            for part in parts:
+                fp.write(part)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, path)
+
+
+class _FileLock:
+    """ Lock shared between processes, on a file that is never replaced. Not on Windows """
+
+    def __init__(self, path: str):
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def acquire(self, exclusive: bool) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def release(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class VaultFile:
+    """
+    A vault file and its index, opened with a passphrase. Created when it does not exist
+
+    Thread safe, and process safe (except on Windows). See the module documentation for the format
+
+    Parameters
+    ==========
+    scrypt_n: int
+        Cost of the key derivation of a new vault, a power of 2. An existing vault keeps its own
+    compaction_threshold: Optional[int]
+        Records appended since the last compaction above which the vault is compacted. Defaults to
+        MIN_COMPACTION_THRESHOLD, or 1 / COMPACTION_RATIO of the entries for big vaults
+
+    Raises
+    ======
+    WrongPassphrase
+        when the passphrase cannot decrypt the vault
+    InvalidVault
+        when the file is not a vault, or is damaged
+    """
+
+    def __init__(
+        self,
+        path: str,
+        passphrase: str,
+        scrypt_n: int = DEFAULT_SCRYPT_N,
+        compaction_threshold: Optional[int] = None,
+    ):
+        self.path = path
+        self.index_path = f'{path}.index'
+        self._compaction_threshold = compaction_threshold
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._exclusive = False
+        self._fp: Optional[BinaryIO] = None
+        self._file_id = (0, 0)
+        """ The device and inode of the file open, to tell when another process replaced it """
+        self._index: Optional[KeyIndex] = None
+        self._appended: Dict[bytes, Optional[Location]] = {}
+        """ The records appended since the index was written. None for the deletions """
+        self._size = 0
+        """ The end of the last record read or written """
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+        self._file_lock = _FileLock(f'{path}.lock')
+        try:
+            with self._locked(exclusive=True):
+                if not os.path.exists(path):
+                    self._create(passphrase, scrypt_n)
+                self._open_file()
+                self._open(passphrase)
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def _file(self) -> BinaryIO:
+        if self._fp is None:
+            raise ValueError('The vault is closed')
+        return self._fp
+
+    def _open_file(self) -> None:
+        self._fp = open(self.path, 'r+b')
+        opened = os.fstat(self._fp.fileno())
+        self._file_id = (opened.st_dev, opened.st_ino)
+
+    @contextmanager
+    def _locked(self, exclusive: bool = False) -> Iterator[None]:
+        """
+        Holds the lock of the threads, and the lock of the processes. Catches up with what the other
+        processes wrote in the meantime. Reentrant, but a shared lock cannot become exclusive
+        """
+        with self._lock:
+            if self._lock_depth:
+                if exclusive and not self._exclusive:
+                    raise RuntimeError('The vault is locked for reading only')
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            self._file_lock.acquire(exclusive)
+            self._lock_depth, self._exclusive = 1, exclusive
+            try:
+                if self._fp is not None:
+                    self._refresh()
+                yield
+            finally:
+                self._lock_depth, self._exclusive = 0, False
+                self._file_lock.release()
+
+    def _create(self, passphrase: str, scrypt_n: int) -> None:
+        salt = os.urandom(16)
+        header_start = struct.pack(
+            '<8s16s16sIII', VAULT_MAGIC, os.urandom(16), salt, scrypt_n, SCRYPT_R, SCRYPT_P,
+        )
+        cipher = AESGCM(self._derive_key(passphrase, salt, scrypt_n, SCRYPT_R, SCRYPT_P))
+        nonce = os.urandom(NONCE_SIZE)
+        check = cipher.encrypt(nonce, CHECK_PLAINTEXT, header_start)
+        tmp_path = f'{self.path}.tmp'
+        # Readable by the current user only
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, 'wb') as fp:
+            fp.write(header_start + nonce + check + os.urandom(16))
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_directory(self.path)
+
+    @staticmethod
+    def _derive_key(passphrase: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            passphrase.encode('utf-8'), salt=salt, n=n, r=r, p=p, dklen=32,
+            maxmem=2 * 128 * n * r * p + 1024 * 1024,
+        )
+
+    def _read_header(self) -> Tuple:
+        self._file.seek(0)
+        header = self._file.read(VAULT_HEADER.size)
+        try:
+            fields = VAULT_HEADER.unpack(header)
+        except struct.error:
+            raise InvalidVault(f'{self.path} is not a vault')
+        if fields[0] != VAULT_MAGIC:
+            raise InvalidVault(f'{self.path} is not a vault')
+        self._header = header
+        return fields
+
+    def _open(self, passphrase: str) -> None:
+        _, self._vault_id, salt, n, r, p, nonce, check, self._generation = self._read_header()
+
+        key = self._derive_key(passphrase, salt, n, r, p)
+        self._cipher = AESGCM(key)
+        try:
+            self._cipher.decrypt(nonce, check, self._header[:CHECK_AAD_SIZE])
+        except InvalidTag:
+            raise WrongPassphrase()
+        self._mac_key = hmac.new(key, MAC_LABEL, hashlib.sha256).digest()
+
+        self._load_index()
+
+    def _refresh(self) -> None:
+        """ Catches up with the writes of the other processes. Under the lock of the processes """
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            raise InvalidVault(f'{self.path} was removed')
+        if (current.st_dev, current.st_ino) != self._file_id:
+            # Compacted by another process: the file open is not the vault anymore
+            self._reopen()
+        elif current.st_size < self._size:
+            self._load_index()
+        elif current.st_size > self._size:
+            self._scan(self._size, current.st_size)
+
+    def _reopen(self) -> None:
+        self._file.close()
+        self._open_file()
+        vault_id = self._vault_id
+        check_aad = self._header[:CHECK_AAD_SIZE]
+        _, self._vault_id, *_, self._generation = self._read_header()
+        if self._vault_id != vault_id or self._header[:CHECK_AAD_SIZE] != check_aad:
+            raise InvalidVault(f'{self.path} was replaced by another vault')
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """ Maps the index, and indexes in memory the records appended after it """
+        file_size = os.fstat(self._file.fileno()).st_size
+        if self._index is not None:
+            self._index.close()
+        try:
+            index: Optional[KeyIndex] = KeyIndex(self.index_path, self._mac_key)
+        except (OSError, ValueError):
+            index = None
+        if index is not None and (
+            index.generation != self._generation or index.indexed_length > file_size
+        ):
+            # Left by a compaction interrupted, or by another vault
+            index.close()
+            index = None
+
+        self._index = index
+        self._appended = {}
+        self._size = index.indexed_length if index is not None else VAULT_HEADER.size
+        self._scan(self._size, file_size)
+        if index is None and self._exclusive:
+            self._write_index()
+
+    def _record_mac(self, generation: bytes, offset: int, record: bytes) -> bytes:
+        """ The MAC of a record without its MAC, written at `offset` in the vault `generation` """
+        message = b''.join((self._vault_id, generation, RECORD_OFFSET.pack(offset), record))
+        return hmac.digest(self._mac_key, message, 'sha256')[:RECORD_MAC_SIZE]
+
+    def _is_authentic(self, offset: int, record: bytes) -> bool:
+        return hmac.compare_digest(
+            self._record_mac(self._generation, offset, record[:-RECORD_MAC_SIZE]),
+            record[-RECORD_MAC_SIZE:],
+        )
+
+    def _scan(self, offset: int, file_size: int) -> None:
+        """
+        Indexes the records from `offset` on in memory. Drops an incomplete last record, which was
+        never acknowledged, when the vault is locked for writing
+        """
+        self._file.seek(offset)
+        while offset < file_size:
+            header = self._file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            size, operation, key_size = RECORD_HEADER.unpack(header)
+            if size < 3 + RECORD_MAC_SIZE:
+                self._check_torn(offset, file_size)
+                break
+            rest = self._file.read(size - 3)
+            if len(rest) < size - 3:
+                break
+            record = header + rest
+            if (
+                operation not in (PUT, DELETE)
+                or key_size > size - 3 - RECORD_MAC_SIZE
+                or not self._is_authentic(offset, record)
+            ):
+                if offset + len(record) < file_size or record[-RECORD_MAC_SIZE:].strip(b'\0'):
+                    raise InvalidVault(f'damaged or tampered record at offset {offset}')
+                # The last record, interrupted while being written: its MAC is not
+                break
+            key = rest[:key_size]
+            self._appended[key] = (offset, len(record)) if operation == PUT else None
+            offset += len(record)
+
+        self._size = offset
+        if offset < file_size and self._exclusive:
+            self._file.truncate(offset)
+
+    def _check_torn(self, offset: int, file_size: int) -> None:
+        """ What follows an invalid record header must be an interrupted write: zeros """
+        self._file.seek(offset)
+        if self._file.read(file_size - offset).strip(b'\0'):
+            raise InvalidVault(f'damaged or tampered record at offset {offset}')
+
+    def close(self) -> None:
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+            if self._file_lock is not None:
+                self._file_lock.close()
+                self._file_lock = None      # type:ignore
+
+    def __enter__(self) -> 'VaultFile':
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        self.close()
+
+    def _aad(self, operation: int, key: bytes) -> bytes:
+        return self._vault_id + bytes([operation]) + key
+
+    def _locate(self, key: bytes) -> Optional[Location]:
+        if key in self._appended:
+            return self._appended[key]
+        if self._index is None:
+            return None
+        return self._index.lookup(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._locked():
+            return self._locate(key.encode('utf-8')) is not None
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        The value of `key`, decrypted. None when there is none
+
+        Raises
+        ======
+        InvalidVault
+            when the record of the key was tampered with
+        """
+        key_bytes = key.encode('utf-8')
+        with self._locked():
+            location = self._locate(key_bytes)
+            if location is None:
+                return None
+            offset, size = location
+            self._file.seek(offset)
+            record = self._file.read(size)
+            authentic = self._is_authentic(offset, record)
+        if not authentic:
+            raise InvalidVault(f'the record of {key} was tampered with')
+
+        encrypted = record[RECORD_HEADER.size + len(key_bytes):-RECORD_MAC_SIZE]
+        try:
+            value = self._cipher.decrypt(
+                encrypted[:NONCE_SIZE], encrypted[NONCE_SIZE:], self._aad(PUT, key_bytes)
+            )
+        except InvalidTag:
+            raise InvalidVault(f'the record of {key} was tampered with')
+        return value.decode('utf-8')
+
+    def _record(self, operation: int, key: bytes, value: Optional[str] = None) -> bytes:
+        """ A record, without its MAC: it depends on where the record is written """
+        if len(key) > 0xFFFF:
+            raise ValueError('Keys are limited to 65535 bytes')
+        body = key
+        if value is not None:
+            nonce = os.urandom(NONCE_SIZE)
+            body += nonce + self._cipher.encrypt(
+                nonce, value.encode('utf-8'), self._aad(operation, key)
+            )
+        return RECORD_HEADER.pack(len(body) + RECORD_MAC_SIZE + 3, operation, len(key)) + body
+
+    def put(self, key: str, value: str) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        """ Writes several entries with a single append: one disk sync """
+        self._append([(PUT, key.encode('utf-8'), value) for key, value in items])
+
+    def delete(self, key: str) -> bool:
+        """ Returns False when there was no `key` """
+        key_bytes = key.encode('utf-8')
+        with self._locked(exclusive=True):
+            if self._locate(key_bytes) is None:
+                return False
+            self._append([(DELETE, key_bytes, None)])
+            return True
+
+    def _append(self, operations: List[Tuple[int, bytes, Optional[str]]]) -> None:
+        # Encrypted before waiting for the lock
+        unsealed = [self._record(operation, key, value) for operation, key, value in operations]
+        with self._locked(exclusive=True):
+            offset = self._size
+            records = []
+            for record in unsealed:
+                records.append(record + self._record_mac(self._generation, offset, record))
+                offset += len(records[-1])
+
+            self._file.seek(self._size)
+            self._file.write(b''.join(records))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            offset = self._size
+            for (operation, key, _), record in zip(operations, records):
+                self._appended[key] = (offset, len(record)) if operation == PUT else None
+                offset += len(record)
+            self._size = offset
+
+            if len(self._appended) > self._current_compaction_threshold():
+                self.compact()
+
+    def _current_compaction_threshold(self) -> int:
+        if self._compaction_threshold is not None:
+            return self._compaction_threshold
+        indexed = self._index.count if self._index is not None else 0
+        return max(MIN_COMPACTION_THRESHOLD, indexed // COMPACTION_RATIO)
+
+    def _iter_locations(self, start: bytes = b'') -> Iterator[Tuple[bytes, Location]]:
+        """ The keys from `start` on and the location of their record, in order. Under the lock """
+        appended = sorted(
+            (key, location)
+            for key, location in self._appended.items()
+            if key >= start
+        )
+        if not appended and self._index is not None:
+            for key, record_offset, record_size in self._index.iter_from(start):
+                yield key, (record_offset, record_size)
+            return
+
+        indexed: Iterator[Tuple[bytes, Optional[Location]]] = iter(())
+        if self._index is not None:
+            indexed = (
+                (key, (record_offset, record_size))
+                for key, record_offset, record_size in self._index.iter_from(start)
+                if key not in self._appended
+            )
+        for key, location in heapq.merge(appended, indexed, key=lambda item: item[0]):
+            if location is not None:
+                yield key, location
+
+    def keys(self, prefix: str = '', start_after: Optional[str] = None) -> Iterator[str]:
+        """
+        The keys starting with `prefix`, in order, after `start_after` when given
+
+        Read KEYS_BATCH_SIZE at a time, each batch found in O(log n). The writes made in between
+        show up if they come after the batches already read
+        """
+        prefix_bytes = prefix.encode('utf-8')
+        start = prefix_bytes
+        if start_after is not None:
+            start = max(start, start_after.encode('utf-8') + b'\x00')
+        while True:
+            with self._locked():
+                batch = [
+                    key for key, _ in islice(self._iter_locations(start), KEYS_BATCH_SIZE)
+                ]
+            for key in batch:
+                if not key.startswith(prefix_bytes):
+                    return
+                yield key.decode('utf-8')
+            if len(batch) < KEYS_BATCH_SIZE:
+                return
+            start = batch[-1] + b'\x00'
+
+    def __len__(self) -> int:
+        with self._locked():
+            if self._index is None:
+                return sum(1 for location in self._appended.values() if location is not None)
+            count = self._index.count
+            for key, location in self._appended.items():
+                indexed = self._index.lookup(key) is not None
+                count += (location is not None) - indexed
+            return count
+
+    def _write_index(self) -> None:
+        """ Indexes the vault as it is, without compacting it. Locked for writing """
+        entries = [
+            (key, offset, size) for key, (offset, size) in self._iter_locations()
+        ]
+        KeyIndex.write(self.index_path, self._mac_key, self._generation, self._size, entries)
+        if self._index is not None:
+            self._index.close()
+        self._index = KeyIndex(self.index_path, self._mac_key)
+        self._appended = {}
+
+    def compact(self) -> None:
+        """
+        Copies the live records to a new vault file, without the ones overwritten or deleted, and
+        indexes it. The vault and its index are replaced atomically: a crash leaves either the old
+        vault or the new one, and an index that is either right or rebuilt at the next opening.
+        The other processes switch to the new vault the next time they use it
+        """
+        with self._locked(exclusive=True):
+            generation = os.urandom(16)
+            tmp_path = f'{self.path}.compact'
+            entries = []
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, 'wb') as fp:
+                fp.write(self._header[:-16] + generation)
+                offset = VAULT_HEADER.size
+                for key, (record_offset, record_size) in self._iter_locations():
+                    self._file.seek(record_offset)
+                    record = self._file.read(record_size)
+                    if not self._is_authentic(record_offset, record):
+                        raise InvalidVault(f'damaged or tampered record at offset {record_offset}')
+                    # Moved, to a new generation of the vault: authenticated again
+                    record = record[:-RECORD_MAC_SIZE]
+                    fp.write(record + self._record_mac(generation, offset, record))
+                    entries.append((key, offset, record_size))
+                    offset += record_size
+                fp.flush()
+                os.fsync(fp.fileno())
+
+            KeyIndex.write(self.index_path, self._mac_key, generation, offset, entries)
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            _fsync_directory(self.path)
+
+            self._open_file()
+            self._header = self._header[:-16] + generation
+            self._generation = generation
+            self._index = KeyIndex(self.index_path, self._mac_key)
+            self._appended = {}
+            self._size = offset
+
+    def file_sizes(self) -> Tuple[int, int]:
+        """ Bytes of the vault file and of its index """
+        return os.path.getsize(self.path), os.path.getsize(self.index_path)
@@ -0,0 +1,261 @@
+"""
+Bulk creation / update of passwords from a JSON, JSONL, CSV or dotenv file
+"""
+from concurrent.futures import ThreadPoolExecutor
+import csv
+from dataclasses import dataclass, field
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from .backends.base import Backend
+from .backends.batch import DEFAULT_MAX_WORKERS, chunked
+from .backends.rate_limit import throttles_since, TokenBucket
+
+
+SUPPORTED_FORMATS = ('json', 'jsonl', 'csv', 'env')
+
+
+class ImportFormatError(ValueError):
+    """ The file to import is not in the expected format """
+
+
+@dataclass
+class ImportEntry:
+    key: str
+    value: str
+
+
+def detect_format(path: str) -> str:
+    """ Guesses the format of the file to import from its name """
+    name = os.path.basename(path).lower()
+    extension = os.path.splitext(name)[1].lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension in ('json', 'csv', 'env'):
+        return extension
+    if name.startswith('.env'):
+        return 'env'
+    raise ImportFormatError(
+        f"Cannot guess the format of {path}. Use one of {', '.join(SUPPORTED_FORMATS)}"
+    )
+
+
+def _as_string(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _read_json(fp: TextIO) -> Iterator[ImportEntry]:
+    # The JSON format cannot be streamed, use JSONL for big files
+    try:
+        content = json.load(fp)
+    except json.JSONDecodeError as e:
+        raise ImportFormatError(f'Line {e.lineno}: {e.msg}') from e
+    if isinstance(content, dict):
+        for key, value in content.items():
+            yield ImportEntry(key, _as_string(value))
+    elif isinstance(content, list):
+        for item in content:
+            yield _entry_from_object(item)
+    else:
+        raise ImportFormatError('A JSON file must contain an object or a list of objects')
+
+
+def _entry_from_object(item: Any) -> ImportEntry:
+    if isinstance(item, dict):
+        if 'key' in item and 'value' in item:
+            return ImportEntry(item['key'], _as_string(item['value']))
+        if len(item) == 1:
+            key, value = next(iter(item.items()))
+            return ImportEntry(key, _as_string(value))
+    raise ImportFormatError(
+        f'Expected {{"key": ..., "value": ...}} or {{<key>: <value>}}, got {item!r:.50}'
+    )
+
+
+def _read_jsonl(fp: TextIO) -> Iterator[ImportEntry]:
+    for line_number, line in enumerate(fp, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield _entry_from_object(json.loads(line))
+        except ValueError as e:
+            raise ImportFormatError(f'Line {line_number}: {e}') from e
+
+
+def _read_csv(fp: TextIO) -> Iterator[ImportEntry]:
+    for row_number, row in enumerate(csv.reader(fp), start=1):
+        if not row:
+            continue
+        if row_number == 1 and [cell.strip().lower() for cell in row] == ['key', 'value']:
+            # Header
+            continue
+        if len(row) != 2:
+            raise ImportFormatError(f'Row {row_number}: expected 2 columns (key, value)')
+        yield ImportEntry(row[0], row[1])
+
+
+def _read_env(fp: TextIO) -> Iterator[ImportEntry]:
+    for line_number, line in enumerate(fp, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('export '):
+            line = line[len('export '):]
+        if '=' not in line:
+            raise ImportFormatError(f'Line {line_number}: expected KEY=VALUE')
+        key, value = line.split('=', 1)
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+            value = value[1:-1]
+        yield ImportEntry(key.strip(), value)
+
+
+READERS: Dict[str, Callable[[TextIO], Iterator[ImportEntry]]] = {
+    'json': _read_json,
+    'jsonl': _read_jsonl,
+    'csv': _read_csv,
+    'env': _read_env,
+}
+
+
+def _with_file_name(entries: Iterator[ImportEntry], name: str) -> Iterator[ImportEntry]:
+    try:
+        yield from entries
+    except ImportFormatError as e:
+        raise ImportFormatError(f'{name}: {e}') from e
+    except UnicodeDecodeError as e:
+        raise ImportFormatError(f'{name}: not UTF-8 text ({e.reason})') from e
+
+
+def read_entries(fp: TextIO, file_format: str) -> Iterator[ImportEntry]:
+    """
+    Lazily reads the entries to import. Except for JSON, the file is streamed
+
+    Raises
+    ======
+    ImportFormatError
+        when the format is unknown, or when the file is not in this format: then while reading the
+        entries, with the name of the file and the line
+    """
+    try:
+        reader = READERS[file_format]
+    except KeyError:
+        raise ImportFormatError(
+            f"Unknown format {file_format}. Use one of {', '.join(SUPPORTED_FORMATS)}"
+        )
+    return _with_file_name(reader(fp), getattr(fp, 'name', '<input>'))
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failures: Dict[str, str] = field(default_factory=dict)
+    """ The reason of the failure, by password key """
+    throttles: Dict[str, int] = field(default_factory=dict)
+    """ The calls the backend throttled during the import, by operation """
+
+    @property
+    def processed(self) -> int:
+        return self.created + self.updated + self.unchanged + len(self.failures)
+
+
+class BulkImporter:
+    """
+    Creates or updates passwords in a backend from a stream of entries
+
+    - Entries are processed by chunks, `max_workers` chunks at a time. Only a few chunks are read
+      ahead, so that memory stays flat whatever the size of the stream
+    - The current values of a chunk are fetched at once (`Backend.retrieve_passwords`), to decide
+      between creation and update, and to skip the passwords that already have the right value
+    - Writes are rate limited to `write_rate` per second, shared by all the workers. It defaults
+      to the backend `WRITE_RATE_LIMIT`. Below that, the AWS backends slow down on their own when
+      throttled (see `AWSClientPool`)
+
+    Parameters
+    ==========
+    force: bool
+        Writes the passwords even if they already have the right value
+    on_progress: Optional[Callable[[ImportReport], None]]
+        Called after each chunk, from the worker threads
+    """
+
+    CHUNK_SIZE = 10
+
+    def __init__(
+        self,
+        backend: Backend,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        write_rate: Optional[float] = None,
+        read_rate: Optional[float] = None,
+        force: bool = False,
+        on_progress: Optional[Callable[[ImportReport], None]] = None,
+    ):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.force = force
+        self.on_progress = on_progress
+        write_rate = write_rate or backend.WRITE_RATE_LIMIT
+        read_rate = read_rate or backend.READ_RATE_LIMIT
+        self._write_limiter = TokenBucket(write_rate) if write_rate else None
+        self._read_limiter = TokenBucket(read_rate) if read_rate else None
+        self._report = ImportReport()
+        self._report_lock = threading.Lock()
+
+    def run(self, entries: Iterable[ImportEntry]) -> ImportReport:
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+        throttles_before = self.backend.throttle_counts()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for chunk in chunked(entries, self.CHUNK_SIZE):
+                in_flight.acquire()
+                future = executor.submit(self._import_chunk, chunk)
+                future.add_done_callback(lambda _future: in_flight.release())
+
+        self._report.throttles = throttles_since(throttles_before, self.backend.throttle_counts())
+        return self._report
+
+    def _import_chunk(self, chunk: List[ImportEntry]) -> None:
+        # The last value wins when a key is repeated
+        values = {entry.key: entry.value for entry in chunk}
+
+        if self._read_limiter is not None:
+            self._read_limiter.acquire()
+        try:
+            current_values = self.backend.retrieve_passwords(list(values)).values
+        except Exception as e:      # pylint:disable=broad-except
+            for key in values:
+                self._record(key, failure=f'Could not read the current value: {e}')
+            return
+
+        write: Callable[[str, str], None]
+        for key, value in values.items():
+            if key in current_values:
+                if current_values[key] == value and not self.force:
+                    self._record(key, outcome='unchanged')
+                    continue
+                write, outcome = self.backend.update_password, 'updated'
+            else:
+                write, outcome = self.backend.create_password, 'created'
+
+            if self._write_limiter is not None:
+                self._write_limiter.acquire()
+            try:
+                write(key, value)
+                self._record(key, outcome=outcome)
+            except Exception as e:      # pylint:disable=broad-except
+                self._record(key, failure=str(e))
+
+        if self.on_progress is not None:
+            self.on_progress(self._report)
+
+    def _record(self, key: str, outcome: Optional[str] = None, failure: Optional[str] = None):
+        with self._report_lock:
+            if failure is not None:
+                self._report.failures[key] = failure
+            elif outcome is not None:
+                setattr(self._report, outcome, getattr(self._report, outcome) + 1)
@@ -0,0 +1,111 @@
+"""
+The choices of a list menu. Kept free of prompt_toolkit, so that the backends can build menus
+without importing it
+"""
+import threading
+from typing import Callable, Generic, List, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+
+class Separator:
+    """ Used just as a type. Not supposed to be instantiated """
+
+
+class Choice(Generic[T]):
+    """
+    A choice of a list menu
+
+    Menus can hold 100k+ choices: slotted, to keep them small and fast to create. Written by hand
+    rather than as a dataclass, which only supports `__slots__` with defaults from Python 3.10
+    """
+
+    __slots__ = ('display_text', 'value', 'disabled_reason')
+
+    def __init__(self, display_text: str, value: T, disabled_reason: Optional[str] = None):
+        self.display_text = display_text
+        self.value = value
+        self.disabled_reason = disabled_reason
+
+    def __repr__(self) -> str:
+        return (
+            f'Choice(display_text={self.display_text!r}, value={self.value!r}, '
+            f'disabled_reason={self.disabled_reason!r})'
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            (self.display_text, self.value, self.disabled_reason)
+            == (other.display_text, other.value, other.disabled_reason)   # type:ignore
+        )
+
+    # Mutable, so not hashable
+    __hash__ = None     # type:ignore
+
+    @property
+    def is_disabled(self) -> bool:
+        return self.disabled_reason is not None
+
+    @property
+    def display_length(self) -> int:
+        return len(self.display_text)
+
+    @staticmethod
+    def separator() -> 'Choice':
+        return Choice('-' * 15, Separator, '')
+
+    @property
+    def is_separator(self) -> bool:
+        return self.value == Separator
+
+    @staticmethod
+    def from_string(value: str) -> 'Choice':
+        return Choice(value, value, None)
+
+
+FeedListener = Callable[[List[Choice], List], None]
+
+
+class ChoicesFeed(Generic[T]):
+    """
+    Channel through which choices can be added to, or removed from, a list menu while it is
+    displayed. Typically fed from a background thread.
+
+    Listeners get called with `(added_choices, removed_values)`. A new listener first receives
+    everything that was pushed to the feed before it subscribed.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._added: List[Choice[T]] = []
+        self._removed: List[T] = []
+        self._listeners: List[FeedListener] = []
+
+    def push(self, choices: List[Choice[T]]) -> None:
+        """ Adds choices to the menu(s) listening to this feed """
+        self._notify(choices, [])
+
+    def discard(self, values: List[T]) -> None:
+        """ Removes the choices with the given values from the menu(s) listening to this feed """
+        self._notify([], values)
+
+    def _notify(self, added: List[Choice[T]], removed: List[T]) -> None:
+        with self._lock:
+            self._added.extend(added)
+            self._removed.extend(removed)
+            for listener in list(self._listeners):
+                listener(added, removed)
+
+    def subscribe(self, listener: FeedListener) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+            if self._added or self._removed:
+                listener(list(self._added), list(self._removed))
+
+    def unsubscribe(self, listener: FeedListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
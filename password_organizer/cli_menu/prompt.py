@@ -1,5 +1,4 @@
-from . import prompts
-from .prompts import confirm, listmenu, password, std_input  # noqa  # pylint:disable=unused-import
+import importlib
 
 
 def prompt(questions, answers=None, **kwargs):
@@ -49,7 +48,12 @@ def prompt(questions, answers=None, **kwargs):
             if callable(question.get('default')):
                 _kwargs['default'] = question['default'](answers)
 
-            application = getattr(prompts, question_type).question(message, **_kwargs)
+            # The question modules (and prompt_toolkit) are only imported when a question is asked
+            try:
+                question_module = importlib.import_module(f'.prompts.{question_type}', __package__)
+            except ModuleNotFoundError:
+                raise AttributeError(f'No question module {question_type}')
+            application = question_module.question(message, **_kwargs)
             answer = application.run()
 
             if answer is not None:
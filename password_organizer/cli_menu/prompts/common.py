@@ -1,5 +1,27 @@
+"""
+What the questions share: the style, and the prompt_toolkit application that displays them
+
+Building an `Application` (with its hundreds of default key bindings), a layout and key bindings for
+every question made going from a menu to the next one slow. Instead there is one application per
+prompt_toolkit app session (that is, per input / output), in which each type of question swaps its
+`Screen`. The screens are built once per application, then updated for each question.
+"""
+from typing import Dict, Optional, Type, TypeVar
+from weakref import WeakKeyDictionary
+
+from prompt_toolkit.application import Application
+from prompt_toolkit.application.current import AppSession, get_app_session
+from prompt_toolkit.history import DummyHistory
+from prompt_toolkit.key_binding import DynamicKeyBindings, merge_key_bindings
+from prompt_toolkit.key_binding.key_bindings import KeyBindingsBase
+from prompt_toolkit.layout import Layout
+from prompt_toolkit.layout.containers import Container, HSplit, Window
+from prompt_toolkit.lexers import SimpleLexer
+from prompt_toolkit.shortcuts import PromptSession
 from prompt_toolkit.styles import Style
 
+from ...tracing import current_tracer
+
 
 default_style = Style.from_dict({
     'set-cursor-position':  '#FF9D00 bold',
@@ -13,3 +35,113 @@ default_style = Style.from_dict({
     'search': 'noinherit #FF4020 bold',
     'disabled': '#555555',
 })
+
+
+class Screen:
+    """
+    What a type of question displays: a container, and the key bindings that act on it
+
+    The key bindings are attached to the container, rather than to the application: prompt_toolkit
+    caches the key bindings in effect per window, so that they are not merged again when the
+    screens are swapped. `extra_key_bindings` take precedence over them
+    """
+
+    def __init__(self, container: Container, key_bindings: KeyBindingsBase):
+        self.extra_key_bindings: Optional[KeyBindingsBase] = None
+        self.layout = Layout(HSplit(
+            [container],
+            key_bindings=merge_key_bindings([
+                key_bindings,
+                DynamicKeyBindings(lambda: self.extra_key_bindings),
+            ]),
+        ))
+
+
+S = TypeVar('S', bound=Screen)
+
+
+class ScreensApplication(Application):
+    """
+    An application that displays a `Screen` at a time, swapped in between two runs
+
+    Parameters
+    ==========
+    kwargs: Dict[Any, Any]
+        Any additional arguments that a prompt_toolkit.application.Application can take
+    """
+
+    def __init__(self, **kwargs):
+        self._screens: Dict[type, Screen] = {}
+        self._screen_name = ''
+        super().__init__(
+            layout=Layout(Window()),
+            mouse_support=False,
+            style=default_style,
+            **kwargs
+        )
+        self._render_start: Optional[float] = None
+        self.before_render += self._before_render
+        self.after_render += self._after_render
+
+    def _before_render(self, _application) -> None:
+        tracer = current_tracer()
+        self._render_start = tracer.now() if tracer is not None else None
+
+    def _after_render(self, _application) -> None:
+        """ Records a span for each rendering, when tracing (see `tracing`) """
+        tracer = current_tracer()
+        if tracer is not None and self._render_start is not None:
+            tracer.complete(f'render {self._screen_name}', 'ui', self._render_start)
+
+    def screen(self, screen_class: Type[S]) -> S:
+        """ The screen of `screen_class` of this application, built on first use """
+        screen = self._screens.get(screen_class)
+        if screen is None:
+            screen = screen_class()     # type:ignore  # The screens build their container
+            self._screens[screen_class] = screen
+        return screen       # type:ignore
+
+    def show(self, screen: Screen, key_bindings: Optional[KeyBindingsBase] = None) -> None:
+        """
+        Displays `screen` on the next run
+
+        Parameters
+        ==========
+        key_bindings: Optional[KeyBindingsBase]
+            Bindings that take precedence over the ones of the screen
+        """
+        screen.extra_key_bindings = key_bindings
+        self.layout = screen.layout
+        self._screen_name = type(screen).__name__
+
+
+_applications: 'WeakKeyDictionary[AppSession, ScreensApplication]' = WeakKeyDictionary()
+_prompt_sessions: 'WeakKeyDictionary[AppSession, PromptSession]' = WeakKeyDictionary()
+
+
+def shared_application() -> ScreensApplication:
+    """ The application of the current app session, created on first use """
+    app_session = get_app_session()
+    application = _applications.get(app_session)
+    if application is None:
+        application = ScreensApplication()
+        _applications[app_session] = application
+    return application
+
+
+def shared_prompt_session() -> PromptSession:
+    """
+    The prompt session of the current app session for the text inputs, created on first use
+
+    Nothing typed is kept in its history: the inputs include passwords
+    """
+    app_session = get_app_session()
+    session = _prompt_sessions.get(app_session)
+    if session is None:
+        session = PromptSession(
+            lexer=SimpleLexer(style='class:answer'),
+            style=default_style,
+            history=DummyHistory(),
+        )
+        _prompt_sessions[app_session] = session
+    return session
@@ -1,77 +1,89 @@
 """
 confirm type question
 """
-from prompt_toolkit.application import Application
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.keys import Keys
-from prompt_toolkit.layout import Layout
 from prompt_toolkit.layout.containers import Window, HSplit
 from prompt_toolkit.layout.controls import FormattedTextControl
 from prompt_toolkit.layout.dimension import LayoutDimension as D
 
-from .common import default_style
+from .common import Screen, ScreensApplication, shared_application
 
 
-def question(message, **kwargs):
-    default = kwargs.pop('default', True)
+class ConfirmScreen(Screen):
+    """ The layout and the key bindings of the confirmations, updated for each question """
 
-    status = {'answer': None}
+    def __init__(self):
+        self.message = ''
+        self.qmark = '?'
+        self.default = True
+        self.answer = None
+        super().__init__(self._build_container(), self._build_key_bindings())
 
-    qmark = kwargs.pop('qmark', '?')
+    def ask(self, message: str, default: bool, qmark: str) -> None:
+        self.message = message
+        self.default = default
+        self.qmark = qmark
+        self.answer = None
 
-    def get_prompt_tokens():
+    def _get_prompt_tokens(self):
         tokens = []
 
-        tokens.append(('class:question-mark', qmark))
-        tokens.append(('class:question', ' %s ' % message))
-        if isinstance(status['answer'], bool):
-            tokens.append(('class:answer', ' Yes' if status['answer'] else ' No'))
+        tokens.append(('class:question-mark', self.qmark))
+        tokens.append(('class:question', ' %s ' % self.message))
+        if isinstance(self.answer, bool):
+            tokens.append(('class:answer', ' Yes' if self.answer else ' No'))
         else:
-            if default:
+            if self.default:
                 instruction = ' (Y/n)'
             else:
                 instruction = ' (y/N)'
             tokens.append(('class:instruction', instruction))
         return tokens
 
-    # key bindings
-    kb = KeyBindings()
-
-    @kb.add(Keys.ControlQ, eager=True)
-    @kb.add(Keys.ControlC, eager=True)
-    def _(event):
-        event.app.exit(exception=KeyboardInterrupt())
-
-    @kb.add('n')
-    @kb.add('N')
-    def key_n(event):       # pylint:disable=unused-variable
-        status['answer'] = False
-        event.app.exit(result=False)
-
-    @kb.add('y')
-    @kb.add('Y')
-    def key_y(event):       # pylint:disable=unused-variable
-        status['answer'] = True
-        event.app.exit(result=True)
-
-    @kb.add(Keys.Enter, eager=True)
-    def set_answer(event):      # pylint:disable=unused-variable
-        status['answer'] = default
-        event.app.exit(result=default)
-
-    # assemble layout
-    layout = Layout(
-        HSplit([
+    def _build_container(self) -> HSplit:
+        return HSplit([
             Window(
                 height=D.exact(1),
-                content=FormattedTextControl(get_prompt_tokens)
+                content=FormattedTextControl(self._get_prompt_tokens)
             ),
         ])
-    )
-
-    return Application(
-        layout=layout,
-        key_bindings=kb,
-        mouse_support=False,
-        style=default_style,
-    )
+
+    def _build_key_bindings(self) -> KeyBindings:
+        kb = KeyBindings()
+
+        @kb.add(Keys.ControlQ, eager=True)
+        @kb.add(Keys.ControlC, eager=True)
+        def _(event):
+            event.app.exit(exception=KeyboardInterrupt())
+
+        @kb.add('n')
+        @kb.add('N')
+        def key_n(event):       # pylint:disable=unused-variable
+            self.answer = False
+            event.app.exit(result=False)
+
+        @kb.add('y')
+        @kb.add('Y')
+        def key_y(event):       # pylint:disable=unused-variable
+            self.answer = True
+            event.app.exit(result=True)
+
+        @kb.add(Keys.Enter, eager=True)
+        def set_answer(event):      # pylint:disable=unused-variable
+            self.answer = self.default
+            event.app.exit(result=self.default)
+
+        return kb
+
+
+def question(message, **kwargs):
+    default = kwargs.pop('default', True)
+    qmark = kwargs.pop('qmark', '?')
+    key_bindings = kwargs.pop('key_bindings', None)
+
+    application = ScreensApplication(**kwargs) if kwargs else shared_application()
+    screen = application.screen(ConfirmScreen)
+    screen.ask(message, default, qmark)
+    application.show(screen, key_bindings)
+    return application
@@ -1,74 +1,72 @@
-from dataclasses import dataclass
-from prompt_toolkit.application import Application
+import asyncio
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.keys import Keys
 from prompt_toolkit.filters import Condition, IsDone
-from prompt_toolkit.layout import Layout
 from prompt_toolkit.layout.controls import (
     FormattedTextControl, GetLinePrefixCallable, UIContent, UIControl
 )
 from prompt_toolkit.layout.containers import ConditionalContainer, HSplit, Window
 from prompt_toolkit.layout.dimension import LayoutDimension as D
+from prompt_toolkit.data_structures import Point
 import string
-from typing import Generic, List, Optional, TypeVar
+from typing import Callable, Collection, Container, Dict, List, Optional
 
-from .common import default_style
-
-
-T = TypeVar('T')
-
-
-class Separator:
-    """ Used just as a type. Not supposed to be instantiated """
-
-
-@dataclass
-class Choice(Generic[T]):
-    display_text: str
-    value: T
-    disabled_reason: Optional[str] = None
-
-    @property
-    def is_disabled(self) -> bool:
-        return self.disabled_reason is not None
-
-    @property
-    def display_length(self) -> int:
-        return len(self.display_text)
-
-    @staticmethod
-    def separator() -> 'Choice':
-        return Choice('-' * 15, Separator, '')
-
-    @property
-    def is_separator(self) -> bool:
-        return self.value == Separator
-
-    @staticmethod
-    def from_string(value: str) -> 'Choice':
-        return Choice(value, value, None)
+from ..choice import Choice, ChoicesFeed, Separator  # noqa  # pylint:disable=unused-import
+from ..search import ChoicesIndex
+from .common import Screen, ScreensApplication, shared_application
 
 
 class ChoicesControl(UIControl):
     """
     Menu to display some textual choices.
-    Provide a search feature by just typing the start of the entry desired
+    Provide a search feature by just typing (part of) the entry desired, see `ChoicesIndex`
+
+    `footer_choices` are displayed after `choices` and stay at the bottom of the menu when choices
+    are added through `update_choices`
+
+    When `multiselect` is set, `choices` can be checked / unchecked (see `toggle_selected_choice`)
     """
-    def __init__(self, choices: List[Choice], **kwargs):
+    def __init__(
+        self,
+        choices: List[Choice],
+        footer_choices: Optional[List[Choice]] = None,
+        multiselect: bool = False,
+        **kwargs
+    ):
+        self.load(choices, footer_choices, multiselect, default=kwargs.pop('default'))
+        super().__init__(**kwargs)
+
+    def load(
+        self,
+        choices: List[Choice],
+        footer_choices: Optional[List[Choice]] = None,
+        multiselect: bool = False,
+        default=None,
+    ) -> None:
+        """
+        Replaces the choices of the menu, as if the control was new. The same control can then be
+        displayed from one menu to the next
+        """
         # Selection to keep consistent
         self._selected_choice: Optional[Choice] = None
         self._selected_index: int = -1
 
         self._answered = False
         self._search_string: Optional[str] = None
-        self._choices = choices
+        self._choices = list(choices)
+        self._footer_choices = footer_choices or []
         self._cached_choices: Optional[List[Choice]] = None
+        # Built on the first search
+        self._index: Optional[ChoicesIndex] = None
+        self._cached_max_display_length: Optional[int] = None
+        self._multiselect = multiselect
+        # Checked choices, by id
+        self._checked_choices: Dict[int, Choice] = {}
 
-        self._init_choices(default=kwargs.pop('default'))
-        super().__init__(**kwargs)
+        self._init_choices(default=default)
 
     def _init_choices(self, default=None):
-        if default is not None and default not in self._choices:
+        if default is not None and default not in self._all_choices:
             raise ValueError(f"Default value {default} is not part of the given choices")
 
         self._compute_available_choices(default=default)
@@ -81,6 +79,32 @@ class ChoicesControl(UIControl):
     def is_answered(self, value: bool) -> None:
         self._answered = value
 
+    @property
+    def _all_choices(self) -> List[Choice]:
+        return self._choices + self._footer_choices
+
+    def update_choices(self, added: List[Choice], removed_values: Collection) -> None:
+        """ Adds and removes choices, keeping the footer choices at the bottom """
+        if removed_values:
+            removed: Container
+            try:
+                removed = set(removed_values)
+            except TypeError:
+                # Unhashable values: looked up one by one
+                removed = list(removed_values)
+            self._choices = [choice for choice in self._choices if choice.value not in removed]
+            # Rebuilt on the next search
+            self._index = None
+            self._cached_max_display_length = None
+        self._choices.extend(added)
+        if self._index is not None:
+            self._index.add(added)
+        if added and self._cached_max_display_length is not None:
+            self._cached_max_display_length = max(
+                self._cached_max_display_length, max(choice.display_length for choice in added)
+            )
+        self._reset_cached_choices()
+
     def _get_available_choices(self) -> List[Choice]:
         if self._cached_choices is None:
             self._compute_available_choices()
@@ -88,62 +112,86 @@ class ChoicesControl(UIControl):
         return self._cached_choices or []
 
     def _compute_available_choices(self, default: Optional[Choice] = None) -> None:
-        self._cached_choices = []
+        if self._search_string:
+            if self._index is None:
+                self._index = ChoicesIndex(self._choices)
+            search_string = self._search_string.lower()
+            self._cached_choices = self._index.search(search_string) + [
+                choice for choice in self._footer_choices
+                if search_string in choice.display_text.lower()
+            ]
+        else:
+            self._cached_choices = self._all_choices
 
-        for choice in self._choices:
-            if self._search_string:
-                if choice.display_text.startswith(self._search_string):
-                    self._cached_choices.append(choice)
-            else:
-                self._cached_choices.append(choice)
+        if default is not None:
+            self._selected_index = self._cached_choices.index(default)
+            self._selected_choice = self._cached_choices[self._selected_index]
+            return
 
-        if self._cached_choices == []:
-            self._selected_choice = None
-            self._selected_index = -1
-        else:
-            if default is not None:
-                self._selected_choice = default
-                self._selected_index = self._cached_choices.index(default)
+        index = self._find_choice(self._selected_choice)
+        if index is not None:
+            # Choices might have been added before the selection
+            self._selected_index = index
+            return
 
-            if self._selected_choice not in self._cached_choices:
-                self._selected_choice = self._cached_choices[0]
-                self._selected_index = 0
-                while self._selected_choice.is_disabled:
-                    self.select_next_choice()
+        # Selects the first choice that is not disabled
+        self._selected_choice = None
+        self._selected_index = -1
+        self._move_selection(1)
+
+    def _find_choice(self, choice: Optional[Choice]) -> Optional[int]:
+        """ The index of `choice` among the available choices, compared by identity """
+        if choice is None or self._cached_choices is None:
+            return None
+        # Most updates add choices after the selection: try where it was first
+        if (
+            0 <= self._selected_index < len(self._cached_choices)
+            and self._cached_choices[self._selected_index] is choice
+        ):
+            return self._selected_index
+        for index, available_choice in enumerate(self._cached_choices):
+            if available_choice is choice:
+                return index
+        return None
 
     def _reset_cached_choices(self) -> None:
         self._cached_choices = None
 
     def get_selection(self):
+        # Makes sure that the selection is consistent with the latest search / choices updates
+        self._get_available_choices()
         return self._selected_choice
 
-    def select_next_choice(self) -> None:
-        if not self._cached_choices or self._selected_choice is None:
-            return
-
-        def _next():
-            self._selected_index += 1
-            self._selected_choice = self._cached_choices[self._selected_index % self.choice_count]
+    def _move_selection(self, step: int) -> None:
+        """ Moves the selection by `step`, cycling, and skipping the disabled choices """
+        choices = self._get_available_choices()
+        index = self._selected_index
+        for _ in range(len(choices)):
+            index = (index + step) % len(choices)
+            if not choices[index].is_disabled:
+                self._selected_index = index
+                self._selected_choice = choices[index]
+                return
 
-        _next()
-        while self._selected_choice.is_disabled:
-            _next()
+    def select_next_choice(self) -> None:
+        if self._get_available_choices() and self._selected_choice is not None:
+            self._move_selection(1)
 
     def select_previous_choice(self) -> None:
-        if not self._cached_choices or self._selected_choice is None:
-            return
-
-        def _prev():
-            self._selected_index -= 1
-            self._selected_choice = self._cached_choices[self._selected_index % self.choice_count]
+        if self._get_available_choices() and self._selected_choice is not None:
+            self._move_selection(-1)
 
-        _prev()
-        while self._selected_choice.is_disabled:
-            _prev()
+    @property
+    def _max_display_length(self) -> int:
+        """ Cached: computing it on every rendering is too slow with many choices """
+        if self._cached_max_display_length is None:
+            self._cached_max_display_length = max(
+                (choice.display_length for choice in self._all_choices), default=0
+            )
+        return self._cached_max_display_length
 
     def preferred_width(self, max_available_width: int) -> int:
-        max_elem_width = max(list(map(lambda x: x.display_length, self._choices)))
-        return min(max_elem_width, max_available_width)
+        return min(self._max_display_length, max_available_width)
 
     def preferred_height(
         self,
@@ -152,15 +200,22 @@ class ChoicesControl(UIControl):
         wrap_lines: bool,
         get_line_prefix: Optional[GetLinePrefixCallable],
     ) -> Optional[int]:
-        return self.choice_count
+        # The menu scrolls past that
+        return min(self.choice_count, max_available_height)
 
     def create_content(self, width: int, height: int) -> UIContent:
+        """
+        Only the lines that are visible get rendered (see `Window`), so that rendering costs the
+        same whatever the number of choices
+        """
+        choices = self._get_available_choices()
+        selected_index = self._selected_index
 
         def _get_line_tokens(line_number):
-            choice = self._get_available_choices()[line_number]
+            choice = choices[line_number]
             tokens = []
 
-            selected = (choice == self.get_selection())
+            selected = (line_number == selected_index)
 
             if selected:
                 tokens.append(('class:set-cursor-position', ' \u276f '))
@@ -168,6 +223,12 @@ class ChoicesControl(UIControl):
                 # For alignment
                 tokens.append(('', '   '))
 
+            if self.is_checkable(choice):
+                if self.is_checked(choice):
+                    tokens.append(('class:selected', '\u25c9 '))
+                else:
+                    tokens.append(('', '\u25cb '))
+
             if choice.is_disabled:
                 token_text = choice.display_text
                 if choice.disabled_reason:
@@ -180,7 +241,9 @@ class ChoicesControl(UIControl):
 
         return UIContent(
             get_line=_get_line_tokens,
-            line_count=self.choice_count,
+            line_count=len(choices),
+            # The window scrolls to keep the selection visible
+            cursor_position=Point(x=0, y=max(selected_index, 0)),
         )
 
     @property
@@ -203,7 +266,7 @@ class ChoicesControl(UIControl):
         if self._search_string is None:
             self._search_string = ''
         self._search_string += char
-        self._reset_cached_choices()
+        self._select_best_match()
 
     def remove_last_char_from_search_string(self) -> None:
         """ Remove the last character from the search string (~backspace) """
@@ -211,102 +274,253 @@ class ChoicesControl(UIControl):
             self._search_string = self._search_string[:-1]
         else:
             self._search_string = None
+        self._select_best_match()
+
+    def _select_best_match(self) -> None:
+        self._selected_choice = None
         self._reset_cached_choices()
 
     def reset_search_string(self) -> None:
         self._search_string = None
 
+    @property
+    def search_string(self) -> str:
+        return self._search_string or ''
 
-def question(message, choices: List[Choice], default=None, qmark='?', key_bindings=None, **kwargs):
-    """
-    Builds a `prompt-toolkit` Application that display a list of choices (ChoiceControl) along with
-    search features and key bindings
-
-    Paramaters
-    ==========
-    kwargs: Dict[Any, Any]
-        Any additional arguments that a prompt_toolkit.application.Application can take. Passed
-        as-is
-    """
-    if key_bindings is None:
-        key_bindings = KeyBindings()
+    @property
+    def is_multiselect(self) -> bool:
+        return self._multiselect
+
+    def is_checkable(self, choice: Choice) -> bool:
+        """ Footer, separators and disabled choices cannot be checked """
+        return (
+            self._multiselect
+            and not choice.is_disabled
+            and all(choice is not footer_choice for footer_choice in self._footer_choices)
+        )
 
-    choices_control = ChoicesControl(choices, default=default)
+    def is_checked(self, choice: Choice) -> bool:
+        return id(choice) in self._checked_choices
 
-    def get_prompt_tokens():
-        tokens = []
+    def toggle_selected_choice(self) -> None:
+        choice = self.get_selection()
+        if choice is None or not self.is_checkable(choice):
+            return
 
-        tokens.append(('class:question-mark', qmark))
-        tokens.append(('class:question', ' %s ' % message))
-        if choices_control.is_answered:
-            tokens.append(('class:answer', ' ' + choices_control.get_selection().display_text))
+        if self.is_checked(choice):
+            del self._checked_choices[id(choice)]
         else:
-            tokens.append(('class:instruction', ' (Use arrow keys)'))
-        return tokens
-
-    @Condition
-    def has_search_string():
-        return choices_control.get_search_string_tokens is not None
-
-    @key_bindings.add(Keys.ControlQ, eager=True)
-    def exit_menu(event):
-        event.app.exit(exception=KeyboardInterrupt())
+            self._checked_choices[id(choice)] = choice
 
-    if not key_bindings.get_bindings_for_keys((Keys.ControlC,)):
-        key_bindings.add(Keys.ControlC, eager=True)(exit_menu)
+    def toggle_available_choices(self) -> None:
+        """ Checks all the choices matching the search, or unchecks them if they all are """
+        checkable_choices = [
+            choice for choice in self._get_available_choices() if self.is_checkable(choice)
+        ]
+        if all(self.is_checked(choice) for choice in checkable_choices):
+            for choice in checkable_choices:
+                self._checked_choices.pop(id(choice), None)
+        else:
+            for choice in checkable_choices:
+                self._checked_choices[id(choice)] = choice
 
-    @key_bindings.add(Keys.Down, eager=True)
-    def move_cursor_down(_event):        # pylint:disable=unused-variable
-        choices_control.select_next_choice()
+    def get_checked_values(self) -> List:
+        """ The values of the checked choices, in the order of the menu """
+        return [choice.value for choice in self._choices if self.is_checked(choice)]
 
-    @key_bindings.add(Keys.Up, eager=True)
-    def move_cursor_up(_event):        # pylint:disable=unused-variable
-        choices_control.select_previous_choice()
 
-    @key_bindings.add(Keys.Enter, eager=True)
-    def set_answer(event):        # pylint:disable=unused-variable
-        choices_control.is_answered = True
-        choices_control.reset_search_string()
-        event.app.exit(result=choices_control.get_selection().value)
+class ListMenuScreen(Screen):
+    """
+    The layout and the key bindings of the list menus. Each question loads its choices in the
+    `ChoicesControl` of the screen (see `ChoicesControl.load`)
 
-    def search_filter(event):
-        choices_control.append_to_search_string(event.key_sequence[0].key)
+    The controls stay the same from one menu to the next, so that prompt_toolkit keeps its caches,
+    like the key bindings in effect.
+    """
 
-    for character in string.printable:
-        key_bindings.add(character, eager=True)(search_filter)
+    def __init__(self):
+        self.control = ChoicesControl([], default=None)
+        self.message = ''
+        self.qmark = '?'
+        self.answer_text = ''
+        self.on_search: Optional[Callable[[str], None]] = None
+        super().__init__(self._build_container(), self._build_key_bindings())
+
+    def ask(
+        self, message: str, qmark: str, on_search: Optional[Callable[[str], None]] = None
+    ) -> None:
+        self.message = message
+        self.qmark = qmark
+        self.answer_text = ''
+        self.on_search = on_search
+
+    def _search_changed(self) -> None:
+        if self.on_search is not None:
+            self.on_search(self.control.search_string)
+
+    def _get_prompt_tokens(self):
+        tokens = []
 
-    @key_bindings.add(Keys.Backspace, eager=True)
-    def delete_from_search_filter(_event):        # pylint:disable=unused-variable
-        choices_control.remove_last_char_from_search_string()
+        tokens.append(('class:question-mark', self.qmark))
+        tokens.append(('class:question', ' %s ' % self.message))
+        if self.control.is_answered:
+            tokens.append(('class:answer', ' ' + self.answer_text))
+        elif self.control.is_multiselect:
+            tokens.append((
+                'class:instruction',
+                ' (Use arrow keys, <tab> to select, <ctrl-a> to select all)'
+            ))
+        else:
+            tokens.append(('class:instruction', ' (Use arrow keys)'))
+        return tokens
 
-    layout = Layout(
-        HSplit([
+    def _build_container(self) -> HSplit:
+        return HSplit([
             # Question
             Window(
                 height=D.exact(1),
-                content=FormattedTextControl(get_prompt_tokens),
+                content=FormattedTextControl(self._get_prompt_tokens),
                 always_hide_cursor=True,
             ),
             # Choices
             ConditionalContainer(
-                Window(choices_control),
+                Window(self.control),
                 filter=~IsDone()        # pylint:disable=invalid-unary-operand-type
             ),
             # Searched string
             ConditionalContainer(
                 Window(
                     height=D.exact(2),
-                    content=FormattedTextControl(choices_control.get_search_string_tokens)
+                    content=FormattedTextControl(
+                        lambda: self.control.get_search_string_tokens()
+                    ),
                 ),
-                filter=has_search_string & ~IsDone()    # pylint:disable=invalid-unary-operand-type
+                filter=~IsDone()        # pylint:disable=invalid-unary-operand-type
             ),
         ])
-    )
 
-    return Application(
-        layout=layout,
-        key_bindings=key_bindings,
-        mouse_support=False,
-        style=default_style,
-        **kwargs
+    def _build_key_bindings(self) -> KeyBindings:
+        """ Built once: the bindings act on the control of the question asked """
+        key_bindings = KeyBindings()
+
+        @key_bindings.add(Keys.ControlQ, eager=True)
+        @key_bindings.add(Keys.ControlC, eager=True)
+        def exit_menu(event):        # pylint:disable=unused-variable
+            event.app.exit(exception=KeyboardInterrupt())
+
+        @key_bindings.add(Keys.Down, eager=True)
+        def move_cursor_down(_event):        # pylint:disable=unused-variable
+            self.control.select_next_choice()
+
+        @key_bindings.add(Keys.Up, eager=True)
+        def move_cursor_up(_event):        # pylint:disable=unused-variable
+            self.control.select_previous_choice()
+
+        @key_bindings.add(Keys.Enter, eager=True)
+        def set_answer(event):        # pylint:disable=unused-variable
+            selection = self.control.get_selection()
+            if selection is None:
+                # Nothing matches the search (yet)
+                return
+            result = selection.value
+            self.answer_text = selection.display_text
+            if self.control.is_checkable(selection):
+                result = self.control.get_checked_values() or [selection.value]
+                if len(result) > 1:
+                    self.answer_text = f'{len(result)} selected'
+
+            self.control.is_answered = True
+            self.control.reset_search_string()
+            event.app.exit(result=result)
+
+        is_multiselect = Condition(lambda: self.control.is_multiselect)
+
+        @key_bindings.add(Keys.Tab, eager=True, filter=is_multiselect)
+        def toggle_choice(_event):        # pylint:disable=unused-variable
+            self.control.toggle_selected_choice()
+
+        @key_bindings.add(Keys.ControlA, eager=True, filter=is_multiselect)
+        def toggle_all_choices(_event):        # pylint:disable=unused-variable
+            self.control.toggle_available_choices()
+
+        def search_filter(event):
+            self.control.append_to_search_string(event.key_sequence[0].key)
+            self._search_changed()
+
+        for character in string.printable:
+            key_bindings.add(character, eager=True)(search_filter)
+
+        @key_bindings.add(Keys.Backspace, eager=True)
+        def delete_from_search_filter(_event):        # pylint:disable=unused-variable
+            self.control.remove_last_char_from_search_string()
+            self._search_changed()
+
+        return key_bindings
+
+
+def question(
+    message,
+    choices: List[Choice],
+    default=None,
+    qmark='?',
+    key_bindings=None,
+    footer_choices: Optional[List[Choice]] = None,
+    choices_feed: Optional[ChoicesFeed] = None,
+    multiselect: bool = False,
+    on_search: Optional[Callable[[str], None]] = None,
+    **kwargs
+):
+    """
+    Shows a list of choices (ChoiceControl) along with search features and key bindings, on the
+    shared `prompt-toolkit` Application (see `common`)
+
+    Paramaters
+    ==========
+    key_bindings: Optional[KeyBindingsBase]
+        Bindings that take precedence over the ones of the menu. Build them once, if you can
+    footer_choices: Optional[List[Choice]]
+        Choices displayed after `choices`, that stay at the bottom of the menu
+    choices_feed: Optional[ChoicesFeed]
+        A feed through which choices are added to / removed from the menu while it is displayed
+    multiselect: bool
+        When True, several choices can be checked (<tab>, or <ctrl-a> for all the choices matching
+        the search). The answer is then the list of the checked values, or a list containing the
+        selected value if none is checked. The footer choices can still be answered as-is
+    on_search: Optional[Callable[[str], None]]
+        Called with the search string each time the user changes it. Runs on the event loop: it
+        must return quickly
+    kwargs: Dict[Any, Any]
+        Any additional arguments that a prompt_toolkit.application.Application can take. Passed
+        as-is, to an application of its own
+    """
+    application = ScreensApplication(**kwargs) if kwargs else shared_application()
+    screen = application.screen(ListMenuScreen)
+    choices_control = screen.control
+    choices_control.load(
+        choices, footer_choices=footer_choices, multiselect=multiselect, default=default
     )
+    screen.ask(message, qmark, on_search)
+    application.show(screen, key_bindings)
+
+    if choices_feed is not None:
+        def subscribe_to_feed():
+            loop = asyncio.get_event_loop()
+
+            def apply_update(added, removed):
+                choices_control.update_choices(added, removed)
+                application.invalidate()
+
+            def on_feed_update(added, removed):
+                # Updates are pushed from any thread, but the control is only modified from the
+                # event loop, in between 2 renderings
+                try:
+                    loop.call_soon_threadsafe(apply_update, added, removed)
+                except RuntimeError:
+                    # The loop is closed, the menu is not displayed anymore
+                    choices_feed.unsubscribe(on_feed_update)
+
+            choices_feed.subscribe(on_feed_update)
+
+        application.pre_run_callables.append(subscribe_to_feed)
+
+    return application
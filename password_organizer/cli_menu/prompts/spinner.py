@@ -0,0 +1,123 @@
+"""
+spinner type question: displays a spinner while a task runs on the event loop of the menu
+
+The answer is the result of the task. The menu stays responsive in the meantime: its key bindings
+can interrupt the wait, by exiting the application. The task is then cancelled. The other keys typed
+while waiting are handed over to the next question.
+"""
+import asyncio
+from typing import Awaitable, Callable, List
+
+from prompt_toolkit.filters import Condition, IsDone
+from prompt_toolkit.input.typeahead import get_typeahead, store_typeahead
+from prompt_toolkit.key_binding import KeyBindings, KeyPress
+from prompt_toolkit.keys import Keys
+from prompt_toolkit.layout.containers import ConditionalContainer, HSplit, Window
+from prompt_toolkit.layout.controls import FormattedTextControl
+from prompt_toolkit.layout.dimension import LayoutDimension as D
+
+from .common import Screen, ScreensApplication, shared_application
+
+
+FRAMES = '⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏'
+FRAME_INTERVAL = 0.1
+DISPLAY_DELAY = 0.2
+""" Seconds before the spinner shows up: shorter waits do not flicker """
+
+
+class SpinnerScreen(Screen):
+    """ The layout and the key bindings of the spinners, updated for each question """
+
+    def __init__(self):
+        self.message = ''
+        self.frame = 0
+        self.is_visible = False
+        self.typeahead: List[KeyPress] = []
+        super().__init__(self._build_container(), self._build_key_bindings())
+
+    def ask(self, message: str) -> None:
+        self.message = message
+        self.frame = 0
+        self.is_visible = False
+        self.typeahead = []
+
+    def _get_tokens(self):
+        return [
+            ('class:question-mark', FRAMES[self.frame % len(FRAMES)]),
+            ('class:question', ' %s ' % self.message),
+            ('class:instruction', ' (<ctrl-c> to interrupt)'),
+        ]
+
+    def _build_container(self) -> HSplit:
+        return HSplit([
+            # Erased once done
+            ConditionalContainer(
+                Window(height=D.exact(1), content=FormattedTextControl(self._get_tokens)),
+                filter=Condition(lambda: self.is_visible) & ~IsDone(),
+            ),
+        ])
+
+    def _build_key_bindings(self) -> KeyBindings:
+        kb = KeyBindings()
+
+        @kb.add(Keys.ControlQ, eager=True)
+        @kb.add(Keys.ControlC, eager=True)
+        def _(event):
+            event.app.exit(exception=KeyboardInterrupt())
+
+        @kb.add(Keys.Any)
+        def keep_typeahead(event):      # pylint:disable=unused-variable
+            self.typeahead.extend(event.key_sequence)
+
+        return kb
+
+    async def animate(self, application: ScreensApplication) -> None:
+        await asyncio.sleep(DISPLAY_DELAY)
+        self.is_visible = True
+        while True:
+            application.invalidate()
+            await asyncio.sleep(FRAME_INTERVAL)
+            self.frame += 1
+
+
+def question(message, task: Callable[[], Awaitable], **kwargs):
+    """
+    Paramaters
+    ==========
+    task: Callable[[], Awaitable]
+        Creates the awaitable to wait for. Called once the event loop of the menu runs
+    key_bindings: Optional[KeyBindingsBase]
+        Bindings that take precedence over the ones of the spinner
+    """
+    key_bindings = kwargs.pop('key_bindings', None)
+
+    application = ScreensApplication(**kwargs) if kwargs else shared_application()
+    screen = application.screen(SpinnerScreen)
+    screen.ask(message)
+    application.show(screen, key_bindings)
+
+    # The keys typed ahead of the spinner: prompt_toolkit would process them before the first
+    # rendering, when the key bindings of the screen are not found yet
+    pending: List[KeyPress] = []
+
+    def finish(**result) -> None:
+        if not application.is_done:
+            store_typeahead(application.input, pending + screen.typeahead)
+            application.exit(**result)
+
+    async def wait() -> None:
+        try:
+            result = await task()
+        except Exception as e:      # pylint:disable=broad-except
+            finish(exception=e)
+        else:
+            finish(result=result)
+
+    def start() -> None:
+        pending.extend(get_typeahead(application.input))
+        # Both cancelled when the application exits
+        application.create_background_task(wait())
+        application.create_background_task(screen.animate(application))
+
+    application.pre_run_callables.append(start)
+    return application
@@ -6,7 +6,7 @@ from prompt_toolkit.lexers import SimpleLexer
 from prompt_toolkit.shortcuts import PromptSession
 from prompt_toolkit.validation import Validator, ValidationError
 
-from .common import default_style
+from .common import default_style, shared_prompt_session
 
 
 def question(message, **kwargs):
@@ -39,11 +39,23 @@ def question(message, **kwargs):
             ('class:question', ' %s  ' % message)
         ]
 
-    session = PromptSession(
-        message=_get_prompt_tokens(),
-        lexer=SimpleLexer(style='class:answer'),
-        style=default_style,
-        **kwargs
-    )
-
+    is_password = kwargs.pop('is_password', False)
+    validator = kwargs.pop('validator', None)
+    if kwargs:
+        # Options the shared session does not reset: a session of its own
+        session = PromptSession(
+            message=_get_prompt_tokens(),
+            lexer=SimpleLexer(style='class:answer'),
+            style=default_style,
+            is_password=is_password,
+            validator=validator,
+            **kwargs
+        )
+        return session.app
+
+    session = shared_prompt_session()
+    session.message = _get_prompt_tokens()
+    session.is_password = is_password
+    session.validator = validator
+    session.default_buffer.reset()
     return session.app
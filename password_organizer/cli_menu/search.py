@@ -0,0 +1,124 @@
+"""
+Search of the choices of a list menu. Kept free of prompt_toolkit, like `choice`
+"""
+from itertools import compress, repeat
+import operator
+from typing import Dict, Generic, List, NamedTuple, TypeVar
+
+from .choice import Choice
+
+
+T = TypeVar('T')
+
+SEGMENT_SEPARATORS = '/-_.: '
+""" What separates the segments of a key, like `/prod/svc/db-password` """
+
+
+def _to_segment_separator(text: str) -> str:
+    # Faster than str.translate
+    for separator in SEGMENT_SEPARATORS[1:]:
+        text = text.replace(separator, '/')
+    return text
+
+
+class _Matches(NamedTuple):
+    """ The choices matching a search string, in the order of the choices """
+    indexes: List[int]
+    texts: List[str]
+    segment_texts: List[str]
+    next_starts: List[int]
+    """
+    Where the search string ends in each text + 1, when matched greedily (fuzzy). Where to look for
+    the next character
+    """
+
+
+class ChoicesIndex(Generic[T]):
+    """
+    Case insensitive search of choices, ranked:
+    1. the search string starts a segment of the choice: `db` finds `/prod/svc/db/password` first
+    2. the search string appears anywhere in the choice
+    3. the characters of the search string appear in order in the choice (fuzzy): `psdb` finds
+       `/prod/svc/db/password`
+    Within a rank, choices keep their order.
+
+    The lowercased texts are computed once. The matches of the search strings typed are kept, so
+    that appending a character only narrows the previous matches, and removing one goes back to
+    them. All the filtering is done with map() / compress(), which keeps the loops in C: several
+    times faster than comprehensions at 100k choices.
+    """
+
+    def __init__(self, choices: List[Choice[T]]):
+        self._choices: List[Choice[T]] = []
+        self._texts: List[str] = []
+        self._segment_texts: List[str] = []
+        # By search string. Only the search strings that prefix the last one are kept
+        self._matches: Dict[str, _Matches] = {}
+        self.add(choices)
+
+    def add(self, choices: List[Choice[T]]) -> None:
+        searchable = [choice for choice in choices if not choice.is_separator]
+        texts = [choice.display_text.lower() for choice in searchable]
+        self._choices.extend(searchable)
+        self._texts.extend(texts)
+        self._segment_texts.extend('/' + _to_segment_separator(text) for text in texts)
+        self._matches = {}
+
+    def __len__(self) -> int:
+        return len(self._choices)
+
+    def search(self, search_string: str) -> List[Choice[T]]:
+        """ The choices matching `search_string`, best first """
+        query = search_string.lower()
+        if not query:
+            return list(self._choices)
+
+        matches = self._narrow_to(query)
+        segment_query = '/' + _to_segment_separator(query)
+        is_substring = list(map(operator.contains, matches.texts, repeat(query)))
+        is_segment = list(map(operator.contains, matches.segment_texts, repeat(segment_query)))
+
+        return list(map(self._choices.__getitem__, [
+            *compress(matches.indexes, is_segment),
+            *compress(matches.indexes, map(operator.gt, is_substring, is_segment)),
+            *compress(matches.indexes, map(operator.not_, is_substring)),
+        ]))
+
+    def _narrow_to(self, query: str) -> _Matches:
+        self._matches = {
+            previous: matches for previous, matches in self._matches.items()
+            if query.startswith(previous)
+        }
+        if self._matches:
+            previous = max(self._matches, key=len)
+            matches = self._matches[previous]
+        else:
+            previous = ''
+            matches = _Matches(
+                list(range(len(self._texts))),
+                self._texts,
+                self._segment_texts,
+                [],
+            )
+
+        for length in range(len(previous) + 1, len(query) + 1):
+            matches = self._narrow(matches, query[length - 1])
+            self._matches[query[:length]] = matches
+        return matches
+
+    @staticmethod
+    def _narrow(matches: _Matches, character: str) -> _Matches:
+        """ The matches of the search string extended by `character` """
+        if matches.next_starts:
+            positions = map(str.find, matches.texts, repeat(character), matches.next_starts)
+        else:
+            # First character
+            positions = map(str.find, matches.texts, repeat(character))
+        # 0 (falsy) where the character is not found
+        next_starts = list(map(operator.add, positions, repeat(1)))
+        return _Matches(
+            list(compress(matches.indexes, next_starts)),
+            list(compress(matches.texts, next_starts)),
+            list(compress(matches.segment_texts, next_starts)),
+            list(compress(next_starts, next_starts)),
+        )
@@ -0,0 +1,224 @@
+"""
+Non-interactive subcommands, working directly on a backend
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, TextIO
+
+from exceptions import ExitCode
+from .backends.base import Backend
+from .bulk_import import BulkImporter, ImportFormatError, ImportReport, detect_format, read_entries
+from .export import Exporter
+from .sync import SyncCheckpoint, Synchronizer, SyncReport
+
+
+def get_command(backend: Backend, args: argparse.Namespace) -> int:
+    """
+    Prints the value of a password. With several keys, prints them as JSON lines
+    `{"key": ..., "value": ...}`
+    """
+    if len(args.keys) == 1:
+        try:
+            print(backend.retrieve_password(args.keys[0]))
+        except Exception as e:      # pylint:disable=broad-except
+            print(f'Failed {args.keys[0]}: {e}', file=sys.stderr)
+            return ExitCode.PARTIAL_FAILURE.value
+        return 0
+
+    retrieval = backend.retrieve_passwords(args.keys)
+    for key in args.keys:
+        if key in retrieval.values:
+            print(json.dumps({'key': key, 'value': retrieval.values[key]}))
+        else:
+            print(f"Failed {key}: {retrieval.errors.get(key, 'Not found')}", file=sys.stderr)
+
+    return 0 if len(retrieval.values) == len(set(args.keys)) else ExitCode.PARTIAL_FAILURE.value
+
+
+def list_command(backend: Backend, args: argparse.Namespace) -> int:
+    """ Prints the password keys, one per line, as the listing pages arrive """
+    for password_keys in backend.iter_password_keys_pages():
+        for key in password_keys:
+            if args.prefix is None or key.startswith(args.prefix):
+                print(key)
+        sys.stdout.flush()
+    return 0
+
+
+def put_command(backend: Backend, args: argparse.Namespace) -> int:
+    """ Creates or updates a password. The value is read from STDIN when not given """
+    value = args.value
+    if value is None:
+        value = sys.stdin.read().rstrip('\n')
+
+    try:
+        if args.key in backend.retrieve_passwords([args.key]).values:
+            backend.update_password(args.key, value)
+        else:
+            backend.create_password(args.key, value)
+    except Exception as e:      # pylint:disable=broad-except
+        print(f'Failed {args.key}: {e}', file=sys.stderr)
+        return ExitCode.PARTIAL_FAILURE.value
+    return 0
+
+
+def delete_command(backend: Backend, args: argparse.Namespace) -> int:
+    """ Deletes passwords """
+    failed = False
+    for key in args.keys:
+        try:
+            backend.delete_password(key)
+        except Exception as e:      # pylint:disable=broad-except
+            print(f'Failed {key}: {e}', file=sys.stderr)
+            failed = True
+    return ExitCode.PARTIAL_FAILURE.value if failed else 0
+
+
+def _print_import_progress(report: ImportReport) -> None:
+    print(
+        f'\rProcessed {report.processed}: {report.created} created, {report.updated} updated, '
+        f'{report.unchanged} unchanged, {len(report.failures)} failed',
+        end='',
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def _print_throttles(throttles: Dict[str, int]) -> None:
+    """ The backend slowed down to stay under its rate limits: tells why the job took longer """
+    if throttles:
+        print(
+            f'Throttled {sum(throttles.values())} time(s), slowed down: '
+            + ', '.join(f'{operation} {count}' for operation, count in sorted(throttles.items())),
+            file=sys.stderr,
+        )
+
+
+def import_command(backend: Backend, args: argparse.Namespace) -> int:
+    """ Creates or updates the passwords listed in a JSON, JSONL, CSV or dotenv file """
+    try:
+        file_format = args.format or detect_format(args.file)
+    except ImportFormatError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return ExitCode.INVALID_INPUT.value
+
+    importer = BulkImporter(
+        backend,
+        max_workers=args.workers,
+        write_rate=args.tps,
+        force=args.force,
+        on_progress=_print_import_progress,
+    )
+
+    fp: TextIO
+    if args.file == '-':
+        fp = sys.stdin
+    else:
+        try:
+            fp = open(args.file, newline='', encoding='utf-8')
+        except OSError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            return ExitCode.INVALID_INPUT.value
+
+    try:
+        with fp:
+            report = importer.run(read_entries(fp, file_format))
+    except ImportFormatError as e:
+        print(f'\nError: {e}', file=sys.stderr)
+        return ExitCode.INVALID_INPUT.value
+
+    _print_import_progress(report)
+    print(file=sys.stderr)
+    _print_throttles(report.throttles)
+    for key, reason in sorted(report.failures.items()):
+        print(f'Failed {key}: {reason}', file=sys.stderr)
+
+    return ExitCode.PARTIAL_FAILURE.value if report.failures else 0
+
+
+def export_command(backend: Backend, args: argparse.Namespace) -> int:
+    """ Writes the passwords (or only their keys and metadata) as JSON lines """
+    exporter = Exporter(
+        backend,
+        prefix=args.prefix,
+        with_values=not args.names_only,
+        max_workers=args.workers,
+    )
+
+    fp: TextIO
+    if args.output == '-':
+        fp = sys.stdout
+    else:
+        try:
+            # The export contains the password values: readable by the current user only
+            fd = os.open(args.output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            fp = open(fd, 'w', encoding='utf-8')
+        except OSError as e:
+            print(f'Error: {e}', file=sys.stderr)
+            return ExitCode.INVALID_INPUT.value
+
+    try:
+        report = exporter.run(fp)
+    finally:
+        if fp is not sys.stdout:
+            fp.close()
+
+    print(f'Exported {report.exported} password(s)', file=sys.stderr)
+    _print_throttles(report.throttles)
+    for key, reason in sorted(report.failures.items()):
+        print(f'Failed {key}: {reason}', file=sys.stderr)
+
+    return ExitCode.PARTIAL_FAILURE.value if report.failures else 0
+
+
+def _print_sync_progress(report: SyncReport) -> None:
+    print(
+        f'\rProcessed {report.processed}: {report.created} created, {report.updated} updated, '
+        f'{report.unchanged} unchanged, {report.skipped} skipped, {len(report.failures)} failed',
+        end='',
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def sync_command(backend: Backend, args: argparse.Namespace) -> int:
+    """
+    Creates or updates in the destination backend the passwords missing or different. With
+    `--dry-run`, prints them as `create <key>` / `update <key>` lines instead
+    """
+    checkpoint = None
+    if not args.no_checkpoint:
+        checkpoint = SyncCheckpoint.for_vaults(
+            backend, args.destination, args.prefix, path=args.checkpoint,
+        )
+
+    synchronizer = Synchronizer(
+        backend,
+        args.destination,
+        prefix=args.prefix,
+        dry_run=args.dry_run,
+        checkpoint=checkpoint,
+        max_workers=args.workers,
+        write_rate=args.tps,
+        on_progress=None if args.dry_run else _print_sync_progress,
+    )
+    report = synchronizer.run()
+
+    if args.dry_run:
+        for change, key in sorted(report.changes, key=lambda change: change[1]):
+            print(f'{change} {key}')
+        print(
+            f'Would create {report.created}, update {report.updated}. '
+            f'{report.unchanged} unchanged, {report.skipped} skipped',
+            file=sys.stderr,
+        )
+    else:
+        _print_sync_progress(report)
+        print(file=sys.stderr)
+    _print_throttles(report.throttles)
+    for key, reason in sorted(report.failures.items()):
+        print(f'Failed {key}: {reason}', file=sys.stderr)
+
+    return ExitCode.PARTIAL_FAILURE.value if report.failures else 0
@@ -0,0 +1,119 @@
+"""
+Streaming export of the passwords of a backend to JSONL
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+import json
+from typing import Deque, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from .backends.base import Backend, PasswordMetadata
+from .backends.batch import BatchRetrieval, chunked
+from .backends.rate_limit import throttles_since
+
+
+@dataclass
+class ExportReport:
+    exported: int = 0
+    failures: Dict[str, str] = field(default_factory=dict)
+    """ The reason why the value could not be exported, by password key """
+    throttles: Dict[str, int] = field(default_factory=dict)
+    """ The calls the backend throttled during the export, by operation """
+
+
+class Exporter:
+    """
+    Writes the passwords of a backend to a file, as JSON lines:
+    `{"key": ..., "value": ..., "last_modified": ..., "version": ..., "description": ...}`
+
+    The listing is walked page by page and the values are fetched in batches of `batch_size` keys
+    (`Backend.retrieve_passwords`), up to `max_workers` batches in flight while the listing goes
+    on. Lines are written as soon as their batch is done, in the listing order, so that memory
+    stays flat whatever the number of passwords.
+
+    Parameters
+    ==========
+    prefix: Optional[str]
+        Only exports the passwords whose key starts with this prefix
+    with_values: bool
+        When False, only the keys and the metadata are exported, without any decryption call
+    """
+
+    BATCH_SIZE = 50
+
+    def __init__(
+        self,
+        backend: Backend,
+        prefix: Optional[str] = None,
+        with_values: bool = True,
+        max_workers: int = 2,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.backend = backend
+        self.prefix = prefix
+        self.with_values = with_values
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+
+    def iter_passwords(self) -> Iterator[PasswordMetadata]:
+        """ Walks the listing of the backend, filtered by `prefix` """
+        for passwords in self.backend.iter_password_metadata_pages():
+            for password in passwords:
+                if self.prefix is None or password.key.startswith(self.prefix):
+                    yield password
+
+    def run(self, fp: TextIO) -> ExportReport:
+        throttles_before = self.backend.throttle_counts()
+        report = self._export(fp)
+        report.throttles = throttles_since(throttles_before, self.backend.throttle_counts())
+        return report
+
+    def _export(self, fp: TextIO) -> ExportReport:
+        report = ExportReport()
+
+        if not self.with_values:
+            for password in self.iter_passwords():
+                self._write(fp, password.to_json_dict())
+                report.exported += 1
+            fp.flush()
+            return report
+
+        in_flight: Deque[Tuple[List[PasswordMetadata], 'Future[BatchRetrieval]']] = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for batch in chunked(self.iter_passwords(), self.batch_size):
+                keys = [password.key for password in batch]
+                in_flight.append((batch, executor.submit(self.backend.retrieve_passwords, keys)))
+                if len(in_flight) > self.max_workers:
+                    self._write_batch(fp, *in_flight.popleft(), report)
+
+            while in_flight:
+                self._write_batch(fp, *in_flight.popleft(), report)
+
+        return report
+
+    def _write_batch(
+        self,
+        fp: TextIO,
+        batch: List[PasswordMetadata],
+        future: 'Future[BatchRetrieval]',
+        report: ExportReport,
+    ) -> None:
+        try:
+            retrieval = future.result()
+        except Exception as e:      # pylint:disable=broad-except
+            retrieval = BatchRetrieval(errors={password.key: str(e) for password in batch})
+
+        for password in batch:
+            if password.key in retrieval.values:
+                content = password.to_json_dict()
+                content['value'] = retrieval.values[password.key]
+                self._write(fp, content)
+                report.exported += 1
+            else:
+                report.failures[password.key] = retrieval.errors.get(password.key, 'Not found')
+        fp.flush()
+
+    @staticmethod
+    def _write(fp: TextIO, content: Dict) -> None:
+        fp.write(json.dumps(content))
+        fp.write('\n')
@@ -1,25 +1,128 @@
-from copy import deepcopy
-from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit.keys import Keys
-from prompt_toolkit.shortcuts import confirm
-from typing import Callable, List, Optional, TypeVar
+"""
+Menus and prompts of the interactive mode
+
+prompt_toolkit is only imported when a menu is displayed, so that the non-interactive commands
+don't pay for it
+"""
+# pylint:disable=import-outside-toplevel
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
 
 from .cli_menu import prompt
-from .cli_menu.prompts.listmenu import Choice
+from .cli_menu.choice import Choice, ChoicesFeed
 
 
 class UserExit(Exception):
     """ Exception representing the user wanting to quit the program """
 
 
+class UserBack(Exception):
+    """ Exception representing the user going back from the first menu of a backend """
+
+
+class UserCancel(Exception):
+    """ Exception representing the user interrupting a call in progress """
+
+
 T = TypeVar('T')
 
 BACK = 'Back...'
 QUIT = 'Exit'
 
 
+def go_back() -> None:
+    """
+    The `back` callback of the menus whose caller handles going back itself, when they return None
+    """
+
+
+@lru_cache(maxsize=None)
+def _quit_key_bindings() -> Any:
+    """ Ctrl+c quits the program, from the menus that propose it. Built once """
+    from prompt_toolkit.key_binding import KeyBindings
+    from prompt_toolkit.keys import Keys
+
+    kb = KeyBindings()
+
+    def quit_menu(event):
+        event.app.exit(exception=UserExit())
+
+    kb.add(Keys.ControlC, eager=True)(quit_menu)
+    return kb
+
+
+@lru_cache(maxsize=None)
+def _cancel_key_bindings() -> Any:
+    """ Ctrl+c interrupts the call waited for. Built once """
+    from prompt_toolkit.key_binding import KeyBindings
+    from prompt_toolkit.keys import Keys
+
+    kb = KeyBindings()
+
+    def cancel(event):
+        event.app.exit(exception=UserCancel())
+
+    kb.add(Keys.ControlC, eager=True)(cancel)
+    return kb
+
+
+def wait_menu(message: str, task: Callable[[], Awaitable[T]]) -> T:
+    """
+    Waits for an awaitable, with a spinner when it takes a while
+
+    It runs on the event loop of the menu, which stays responsive in the meantime.
+
+    Parameters
+    ----------
+    message: str
+        What is waited for
+    task: Callable[[], Awaitable[T]]
+        Creates the awaitable, once the event loop of the menu runs
+
+    Returns
+    -------
+    T
+        The result of the awaitable. Its exception is raised as-is
+
+    Raises
+    ------
+    UserCancel
+        When the user interrupted the wait (Ctrl+c). The awaitable is cancelled, but the call it
+        made may still complete
+    """
+    questions = [
+        {
+            'type': 'spinner',
+            'name': 'result',
+            'message': message,
+            'task': task,
+            'key_bindings': _cancel_key_bindings(),
+        }
+    ]
+    answers = prompt(questions)
+    return answers.get('result')     # type:ignore  # None is not stored as an answer
+
+
 def confirmation_menu(message: str) -> bool:
-    return confirm(message=message)
+    """ Asks for a yes / no answer. <Enter> answers no """
+    questions = [
+        {
+            'type': 'confirm',
+            'name': 'confirmation',
+            'message': message,
+            'default': False,
+        }
+    ]
+    answers = prompt(questions)
+    return answers['confirmation']
+
+
+def print_html(html: str, style: Dict[str, str]) -> None:
+    """ Prints prompt_toolkit HTML formatted text, styled with the given classes """
+    from prompt_toolkit import print_formatted_text, HTML
+    from prompt_toolkit.styles import Style
+
+    print_formatted_text(HTML(html), style=Style.from_dict(style))
 
 
 def read_input(message: str) -> str:
@@ -53,7 +156,10 @@ def list_choice_menu(
     back: Optional[Callable] = None,
     quit_option_text: Optional[str] = QUIT,
     use_ctrl_c_to_quit: bool = True,
-) -> Optional[T]:
+    choices_feed: Optional[ChoicesFeed[T]] = None,
+    multiselect: bool = False,
+    on_search: Optional[Callable[[str], None]] = None,
+) -> Optional[Any]:
     """
     Displays a list menu
 
@@ -75,11 +181,19 @@ def list_choice_menu(
         Whether or not Ctrl C is intercepted to quit the menu
         When it is, the information is appended to the `quit_option_text`
         Defaults to True
+    choices_feed: Optional[ChoicesFeed[T]]
+        A feed through which choices get added to the menu while it is displayed. They are
+        inserted after `choices`, before the "BACK" and "QUIT" options
+    multiselect: bool
+        Whether the user can chose several of the `choices`
+    on_search: Optional[Callable[[str], None]]
+        Called with the search string each time the user changes it
 
     Returns
     -------
-    Optional[T]
+    Optional[Union[T, List[T]]]
         - The choice that the user made
+        - The list of the choices that the user made, when `multiselect` is set
         - None if he chose to go back
 
     Raises
@@ -88,31 +202,29 @@ def list_choice_menu(
         When the user chose the "Quit" alternative
     """
     if use_ctrl_c_to_quit:
-        kb = KeyBindings()
-
-        def quit_menu(event):
-            event.app.exit(exception=UserExit())
-
-        kb.add(Keys.ControlC, eager=True)(quit_menu)
-
         if quit_option_text:
             quit_option_text += ' (Ctrl+c)'
 
-    menu_choices = deepcopy(choices)
+    footer_choices: List[Choice] = []
     if back:
-        menu_choices.extend([Choice.separator(), Choice.from_string(BACK)])
+        footer_choices.extend([Choice.separator(), Choice.from_string(BACK)])
     if quit_option_text:
-        menu_choices.extend([Choice.separator(), Choice.from_string(quit_option_text)])
+        footer_choices.extend([Choice.separator(), Choice.from_string(quit_option_text)])
 
     question_args = {
         'type': 'listmenu',
         'name': 'action',
         'message': message,
-        'choices': menu_choices,
+        # Not copied: the menu never modifies them
+        'choices': choices,
+        'footer_choices': footer_choices,
+        'choices_feed': choices_feed,
         'default': default,
+        'multiselect': multiselect,
+        'on_search': on_search,
     }
     if use_ctrl_c_to_quit:
-        question_args['key_bindings'] = kb
+        question_args['key_bindings'] = _quit_key_bindings()
 
     questions = [question_args]
     answers = prompt(questions)
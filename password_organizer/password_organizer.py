@@ -1,63 +1,483 @@
+import argparse
 import importlib
-from pyfiglet import Figlet
+import os
+import sys
+from typing import List, Optional, Type
 
 from exceptions import InterruptProgramException, ExitCode
-from .menu import list_choice_menu, UserExit
-from .cli_menu.prompts.listmenu import Choice
+from . import __version__, commands
+from .backends.base import Backend
+from .backends.aws_identity import DEFAULT_IDENTITY_CACHE_TTL
+from .backends.batch import DEFAULT_MAX_WORKERS
+from .backends.listing_cache import DEFAULT_CACHE_TTL, app_cache_directory
+from .bulk_import import SUPPORTED_FORMATS
+from .menu import go_back, list_choice_menu, UserBack, UserCancel, UserExit, wait_menu
+from .cli_menu.choice import Choice
+from .tracing import tracing
 
 
 BACKENDS = {
-    "AWS SSM Parameter Store": ("password_organizer.backends", "AWSSSMBackend"),
-    "AWS Secrets Manager": ("password_organizer.backends", "AWSSecretsManagerBackend"),
+    "AWS SSM Parameter Store": ("password_organizer.backends.aws_ssm_backend", "AWSSSMBackend"),
+    "AWS Secrets Manager": (
+        "password_organizer.backends.aws_secrets_manager_backend",
+        "AWSSecretsManagerBackend",
+    ),
+    "Local encrypted file": ("password_organizer.backends.local_file_backend", "LocalFileBackend"),
 }
+""" The backend modules are only imported once chosen, see `load_backend_class` """
+
+BACKEND_CLI_NAMES = {
+    "ssm": "AWS SSM Parameter Store",
+    "secretsmanager": "AWS Secrets Manager",
+    "local": "Local encrypted file",
+}
+""" Names of the `BACKENDS` in the non-interactive subcommands """
+
+
+TITLE = "Password Organizer"
+TITLE_FONT = 'slant'
+TITLE_WIDTH = 150
+
+
+def render_title() -> str:
+    """
+    Renders the application title with figlet. The rendering is cached on disk, so that pyfiglet
+    is only imported on the first launch
+    """
+    cache_path = os.path.join(
+        app_cache_directory(),
+        f'title-{__version__}-{TITLE_FONT}-{TITLE_WIDTH}.txt',
+    )
+    try:
+        with open(cache_path, encoding='utf-8') as fp:
+            return fp.read()
+    except OSError:
+        pass
+
+    from pyfiglet import Figlet    # pylint:disable=import-outside-toplevel
+
+    title = Figlet(font=TITLE_FONT, width=TITLE_WIDTH).renderText(TITLE)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as fp:
+            fp.write(title)
+    except OSError:
+        # Not being able to cache the title is not worth failing for
+        pass
+    return title
 
 
 def app_title():
-    figlet = Figlet(font='slant', width=150)
-    print(figlet.renderText("Password Organizer"))
+    print(render_title())
     print('\n')
 
 
-def main() -> int:
-    app_title()
-    return backend_menu()
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='password-organizer',
+        description='Password organizer CLI for a number of password vault technology',
+    )
+    prefetch_group = parser.add_mutually_exclusive_group()
+    prefetch_group.add_argument(
+        '--prefetch',
+        action='store_true',
+        default=None,
+        help=(
+            'Fetch all the pages of the password listing in the background, at the largest page '
+            'size allowed by the backend, instead of navigating them page by page'
+        ),
+    )
+    prefetch_group.add_argument(
+        '--no-prefetch',
+        action='store_false',
+        dest='prefetch',
+        help='Navigate the password listing page by page',
+    )
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        metavar='SECONDS',
+        help=(
+            'The password keys listing is cached on disk (never the password values). Past this '
+            f'age, it is refreshed in the background. Defaults to {DEFAULT_CACHE_TTL}s'
+        ),
+    )
+    cache_group.add_argument(
+        '--no-cache',
+        action='store_const',
+        const=None,
+        dest='cache_ttl',
+        help='Do not use the on-disk cache of the password keys listing',
+    )
+    parser.add_argument(
+        '--identity-cache-ttl',
+        type=float,
+        default=DEFAULT_IDENTITY_CACHE_TTL,
+        metavar='SECONDS',
+        help=(
+            'How long the AWS account ID and alias of the credentials are cached on disk. '
+            f'Defaults to {DEFAULT_IDENTITY_CACHE_TTL}s'
+        ),
+    )
+    parser.add_argument(
+        '--refresh-cache',
+        action='store_true',
+        help='Ignore the cached password keys listing, and refresh it',
+    )
+    parser.add_argument(
+        '--vault',
+        metavar='FILE',
+        help=(
+            'The file of the local encrypted backend. Defaults to $PASSWORD_ORGANIZER_VAULT, or to '
+            '~/.local/share/password-organizer/vault.pov. Its passphrase is asked, or read from '
+            '$PASSWORD_ORGANIZER_PASSPHRASE'
+        ),
+    )
+    parser.add_argument(
+        '--trace',
+        metavar='FILE',
+        help=(
+            'Record the backend operations, the AWS API calls (with their retries and throttles) '
+            'and the menu renders in a Chrome trace file, and print a summary at exit'
+        ),
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='Profile the session with cProfile, into a file that `pstats` reads',
+    )
 
+    backend_parser = argparse.ArgumentParser(add_help=False)
+    backend_parser.add_argument(
+        '--backend',
+        required=True,
+        choices=sorted(BACKEND_CLI_NAMES),
+        help='The backend to work with',
+    )
+    backend_parser.add_argument(
+        '--region',
+        default=os.environ.get('AWS_REGION') or os.environ.get('AWS_DEFAULT_REGION'),
+        help='The AWS region to work with. Defaults to $AWS_REGION or $AWS_DEFAULT_REGION',
+    )
+    backend_parser.add_argument(
+        '--vault',
+        metavar='FILE',
+        # Keeps the value given before the command
+        default=argparse.SUPPRESS,
+        help='The file of the local backend, see above',
+    )
 
-def backend_menu() -> int:
-    try:
-        backends = list(BACKENDS.keys())
-        backends.sort()
-        backend_key = list_choice_menu(
-            [Choice(x, x, None) for x in backends],
-            "Which backend do you want to use?"
-        )
-        if backend_key is None:
-            # There is no "back" option in the menu above, so this code path should not be possible
-            print("No choice, leaving...")
-            return 0
-    except UserExit:
-        print("\nGoodbye\n")
-        return 0
+    subparsers = parser.add_subparsers(
+        dest='command',
+        title='non-interactive commands',
+        description='Without a command, the interactive menu is started',
+    )
+
+    get_parser = subparsers.add_parser(
+        'get',
+        parents=[backend_parser],
+        help='Print the value of passwords',
+    )
+    get_parser.set_defaults(handler=commands.get_command)
+    get_parser.add_argument(
+        'keys',
+        nargs='+',
+        metavar='key',
+        help='With several keys, the values are printed as JSON lines',
+    )
+
+    list_parser = subparsers.add_parser(
+        'list',
+        parents=[backend_parser],
+        help='Print the password keys',
+    )
+    list_parser.set_defaults(handler=commands.list_command)
+    list_parser.add_argument('--prefix', help='Only print the keys starting with this prefix')
+
+    put_parser = subparsers.add_parser(
+        'put',
+        parents=[backend_parser],
+        help='Create or update a password',
+    )
+    put_parser.set_defaults(handler=commands.put_command)
+    put_parser.add_argument('key')
+    put_parser.add_argument(
+        'value',
+        nargs='?',
+        help='Read from STDIN when not given, which keeps it out of the shell history',
+    )
+
+    delete_parser = subparsers.add_parser(
+        'delete',
+        parents=[backend_parser],
+        help='Delete passwords, without confirmation',
+    )
+    delete_parser.set_defaults(handler=commands.delete_command)
+    delete_parser.add_argument('keys', nargs='+', metavar='key')
+
+    import_parser = subparsers.add_parser(
+        'import',
+        parents=[backend_parser],
+        help='Create or update passwords from a JSON, JSONL, CSV or dotenv file',
+    )
+    import_parser.set_defaults(handler=commands.import_command)
+    import_parser.add_argument('file', help="The file to import. '-' for STDIN")
+    import_parser.add_argument(
+        '--format',
+        choices=SUPPORTED_FORMATS,
+        help='The format of the file. Guessed from its extension by default',
+    )
+    import_parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f'Number of concurrent API calls. Defaults to {DEFAULT_MAX_WORKERS}',
+    )
+    import_parser.add_argument(
+        '--tps',
+        type=float,
+        help='Maximum writes per second. Defaults to the default AWS quota of the backend',
+    )
+    import_parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Write the passwords even when they already have the value to import',
+    )
+
+    export_parser = subparsers.add_parser(
+        'export',
+        parents=[backend_parser],
+        help='Write the passwords as JSON lines',
+    )
+    export_parser.set_defaults(handler=commands.export_command)
+    export_parser.add_argument(
+        '-o', '--output',
+        default='-',
+        help="The file to write to. Defaults to '-' (STDOUT)",
+    )
+    export_parser.add_argument('--prefix', help='Only export the keys starting with this prefix')
+    export_parser.add_argument(
+        '--names-only',
+        action='store_true',
+        help='Only export the keys and their metadata, not the values (no decryption)',
+    )
+    export_parser.add_argument(
+        '--workers',
+        type=int,
+        default=2,
+        help='Number of batches of values fetched concurrently. Defaults to 2',
+    )
+
+    sync_parser = subparsers.add_parser(
+        'sync',
+        parents=[backend_parser],
+        help=(
+            'Copy the passwords missing or different to another backend, or region. Only the '
+            'passwords written since the last sync are read again'
+        ),
+    )
+    sync_parser.set_defaults(handler=commands.sync_command)
+    sync_parser.add_argument(
+        '--to',
+        required=True,
+        choices=sorted(BACKEND_CLI_NAMES),
+        help='The backend to copy the passwords to',
+    )
+    sync_parser.add_argument(
+        '--to-region',
+        help='The AWS region to copy the passwords to. Defaults to --region',
+    )
+    sync_parser.add_argument(
+        '--to-vault',
+        metavar='FILE',
+        help='The file of the local backend to copy the passwords to',
+    )
+    sync_parser.add_argument('--prefix', help='Only sync the keys starting with this prefix')
+    sync_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Print the passwords to create or update, without writing them',
+    )
+    checkpoint_group = sync_parser.add_mutually_exclusive_group()
+    checkpoint_group.add_argument(
+        '--checkpoint',
+        metavar='FILE',
+        help=(
+            'Where to record the passwords found in sync. Defaults to a file in '
+            f'{os.path.join(app_cache_directory(), "sync")}, for the AWS backends'
+        ),
+    )
+    checkpoint_group.add_argument(
+        '--no-checkpoint',
+        action='store_true',
+        help='Read and compare all the passwords, and record nothing',
+    )
+    sync_parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f'Number of batches compared concurrently. Defaults to {DEFAULT_MAX_WORKERS}',
+    )
+    sync_parser.add_argument(
+        '--tps',
+        type=float,
+        help='Maximum writes per second. Defaults to the default AWS quota of the destination',
+    )
+
+    return parser.parse_args(argv)
+
+
+def load_backend_class(backend_key: str) -> Type[Backend]:
+    """
+    Imports the backend class registered in `BACKENDS` under `backend_key`
 
+    Raises
+    ======
+    ModuleNotFoundError
+        when the backend module cannot be found
+    """
     backend_module, backend_class = BACKENDS[backend_key]
+    module = importlib.import_module(backend_module)
+    return getattr(module, backend_class)
 
-    try:
-        module = importlib.import_module(backend_module)
-        clazz = getattr(module, backend_class)
-    except ModuleNotFoundError as e:
-        print(f"Error: \n\t{str(e)}")
-        return ExitCode.CANNOT_FIND_BACKEND.value
 
-    try:
-        backend = clazz(back=backend_menu)
-    except InterruptProgramException as e:
-        print(f"Error: \n\t{e.display_message}")
-        return e.exit_code.value
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    with tracing(args.trace, args.profile):
+        if args.command is not None:
+            return run_command(args)
+
+        app_title()
+        return backend_menu(
+            prefetch=args.prefetch,
+            listing_cache_ttl=args.cache_ttl,
+            refresh_listing_cache=args.refresh_cache,
+            identity_cache_ttl=args.identity_cache_ttl,
+            vault_path=args.vault,
+        )
+
+
+def _aws_error_exit_code(error: Exception) -> Optional[ExitCode]:
+    """
+    The exit code of a failed AWS call (credentials, permissions, network...). None when `error`
+    is something else
 
+    botocore is only imported by the AWS backends: when it is not, no AWS call was made
+    """
+    botocore_exceptions = sys.modules.get('botocore.exceptions')
+    if botocore_exceptions is None:
+        return None
+    if isinstance(error, botocore_exceptions.NoCredentialsError):
+        return ExitCode.MISSING_AUTHENTICATION
+    if isinstance(error, (botocore_exceptions.ClientError, botocore_exceptions.BotoCoreError)):
+        return ExitCode.BACKEND_FAILURE
+    return None
+
+
+def run_command(args: argparse.Namespace) -> int:
+    """
+    Runs a non-interactive subcommand on the backend given on the command line
+
+    The errors of the backend that no command handles, like the AWS calls failing for lack of
+    credentials, are printed on one line instead of a traceback
+    """
     try:
-        backend.initialize()
-        backend.title()
-        return backend.main_menu()
-    except UserExit:
-        print("\nGoodbye\n")
-        return 0
+        return _run_command(args)
+    except Exception as e:      # pylint:disable=broad-except
+        exit_code = _aws_error_exit_code(e)
+        if exit_code is None:
+            raise
+        print(f"Error: {e}", file=sys.stderr)
+        return exit_code.value
+
+
+def _run_command(args: argparse.Namespace) -> int:
+    command_backends = [(args.backend, args.region, args.vault)]
+    if args.command == 'sync':
+        # The destination of the sync, in the region of the source by default
+        command_backends.append((args.to, args.to_region or args.region, args.to_vault))
+        if command_backends[0] == command_backends[1]:
+            print("Error: \n\tThe source and the destination are the same", file=sys.stderr)
+            return ExitCode.INVALID_INPUT.value
+
+    backends = []
+    for cli_name, region, vault_path in command_backends:
+        try:
+            clazz = load_backend_class(BACKEND_CLI_NAMES[cli_name])
+        except ModuleNotFoundError as e:
+            print(f"Error: \n\t{str(e)}", file=sys.stderr)
+            return ExitCode.CANNOT_FIND_BACKEND.value
+
+        if region is None and clazz.REGIONAL:
+            print("Error: \n\t--region is required", file=sys.stderr)
+            return ExitCode.INIT_FAILED.value
+
+        try:
+            backend = clazz(region=region, vault_path=vault_path)
+            backend.initialize()
+        except InterruptProgramException as e:
+            print(f"Error: \n\t{e.display_message}", file=sys.stderr)
+            return e.exit_code.value
+        backends.append(backend)
+
+    if args.command == 'sync':
+        args.destination = backends[1]
+    return args.handler(backends[0], args)
+
+
+def backend_menu(**backend_options) -> int:
+    """
+    Displays the backend choice menu, then hands over to the backend chosen. Loops back to the
+    backend choice when the user goes back from the backend, until they quit
+
+    Parameters
+    ==========
+    backend_options: Dict[str, Any]
+        Passed as-is to the backend constructor
+    """
+    backends = sorted(BACKENDS.keys())
+    while True:
+        try:
+            backend_key = list_choice_menu(
+                [Choice(x, x, None) for x in backends],
+                "Which backend do you want to use?"
+            )
+            if backend_key is None:
+                # There is no "back" option in the menu above, so this code path should not be
+                # possible
+                print("No choice, leaving...")
+                return 0
+        except UserExit:
+            print("\nGoodbye\n")
+            return 0
+
+        try:
+            clazz = load_backend_class(backend_key)
+        except ModuleNotFoundError as e:
+            print(f"Error: \n\t{str(e)}")
+            return ExitCode.CANNOT_FIND_BACKEND.value
+
+        try:
+            backend = clazz(back=go_back, **backend_options)
+        except InterruptProgramException as e:
+            print(f"Error: \n\t{e.display_message}")
+            return e.exit_code.value
+
+        try:
+            backend.initialize()
+            # The title takes a few API calls, made while the first page of the listing is fetched
+            backend.start_speculative_listing()
+            wait_menu('Connecting', backend.as_async().load_title_details)
+            backend.title()
+            backend.main_menu()
+        except (UserBack, UserCancel):
+            # Back to the backend choice
+            pass
+        except InterruptProgramException as e:
+            print(f"Error: \n\t{e.display_message}")
+            return e.exit_code.value
+        except UserExit:
+            print("\nGoodbye\n")
+            return 0
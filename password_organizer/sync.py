@@ -0,0 +1,356 @@
+"""
+Incremental copy of the passwords of a backend to another one (SSM to Secrets Manager, a region to
+another, ...)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .backends.base import Backend, PasswordMetadata
+from .backends.batch import DEFAULT_MAX_WORKERS, BatchRetrieval, chunked
+from .backends.listing_cache import app_cache_directory, write_private_json
+from .backends.rate_limit import throttles_since, TokenBucket
+
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+CHECKPOINT_INTERVAL = 5.0
+""" Seconds between 2 saves of the checkpoint during a sync """
+
+Fingerprint = Optional[str]
+""" What the listing tells about the version of a password. None when it tells nothing """
+
+
+def fingerprint(password: PasswordMetadata) -> Fingerprint:
+    """ Changes whenever the password is written, if the listing of the backend tells it """
+    if password.last_modified is None and password.version is None:
+        return None
+    last_modified = password.last_modified.isoformat() if password.last_modified else ''
+    return f'{last_modified}|{password.version or ""}'
+
+
+def default_checkpoint_directory() -> str:
+    return os.path.join(app_cache_directory(), 'sync')
+
+
+class SyncCheckpoint:
+    """
+    What the last syncs between 2 vaults found in sync: for each password key, the fingerprints of
+    the source and the destination passwords when they had the same value
+
+    When both fingerprints are still the same, the password has not been written since, and is not
+    read again. Only the fingerprints are stored, NEVER the password values nor a digest of them.
+
+    Parameters
+    ==========
+    path: str
+        The file where the checkpoint is stored
+    vaults: List
+        Identifies the source and the destination vaults, and the prefix synced. The checkpoint
+        of other vaults found in `path` is ignored
+    """
+
+    def __init__(self, path: str, vaults: List):
+        self.path = path
+        self.vaults = vaults
+        self._entries: Dict[str, Tuple[Fingerprint, Fingerprint]] = {}
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+
+    @classmethod
+    def for_vaults(
+        cls,
+        source: Backend,
+        destination: Backend,
+        prefix: Optional[str],
+        path: Optional[str] = None,
+    ) -> Optional['SyncCheckpoint']:
+        """
+        The checkpoint of a sync, in `path` or in the cache directory. None without `path` when a
+        backend cannot tell which vault it works on (see `Backend.listing_cache_namespace`)
+        """
+        source_namespace = source.listing_cache_namespace()
+        destination_namespace = destination.listing_cache_namespace()
+        vaults = [source_namespace, destination_namespace, prefix]
+        if path is None:
+            if source_namespace is None or destination_namespace is None:
+                return None
+            digest = hashlib.sha256(json.dumps(vaults).encode('utf-8')).hexdigest()
+            path = os.path.join(default_checkpoint_directory(), f'{digest}.json')
+        return cls(path, vaults)
+
+    def load(self) -> None:
+        """ Loads the checkpoint saved, if any and readable """
+        try:
+            with open(self.path, encoding='utf-8') as fp:
+                content = json.load(fp)
+        except (OSError, ValueError):
+            return
+
+        if (
+            not isinstance(content, dict)
+            or content.get('version') != CHECKPOINT_FORMAT_VERSION
+            or content.get('vaults') != self.vaults
+        ):
+            return
+
+        with self._lock:
+            self._entries = {
+                key: (source_fingerprint, destination_fingerprint)
+                for key, (source_fingerprint, destination_fingerprint)
+                in content.get('entries', {}).items()
+            }
+
+    def save(self) -> None:
+        """ Atomically replaces the checkpoint file. Readable by the current user only """
+        with self._lock:
+            content = {
+                'version': CHECKPOINT_FORMAT_VERSION,
+                'vaults': self.vaults,
+                'entries': dict(self._entries),
+            }
+            self._saved_at = time.monotonic()
+        write_private_json(self.path, content)
+
+    def save_periodically(self) -> None:
+        """ Saves the checkpoint if it was not for CHECKPOINT_INTERVAL """
+        if time.monotonic() - self._saved_at >= CHECKPOINT_INTERVAL:
+            self.save()
+
+    def is_in_sync(self, key: str, source: Fingerprint, destination: Fingerprint) -> bool:
+        """ Whether the password is known to be in sync, the 2 passwords being unchanged since """
+        if source is None or destination is None:
+            return False
+        with self._lock:
+            return self._entries.get(key) == (source, destination)
+
+    def record(self, key: str, source: Fingerprint, destination: Fingerprint) -> None:
+        """ The 2 passwords have the same value. A None fingerprint is not recorded """
+        with self._lock:
+            if source is None or destination is None:
+                self._entries.pop(key, None)
+            else:
+                self._entries[key] = (source, destination)
+
+
+@dataclass
+class SyncReport:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    """ The passwords compared, that had the same value in both backends """
+    skipped: int = 0
+    """ The passwords that the checkpoint tells are in sync, not read """
+    changes: List[Tuple[str, str]] = field(default_factory=list)
+    """ The ('create' or 'update', password key) that a dry run would do """
+    failures: Dict[str, str] = field(default_factory=dict)
+    """ The reason of the failure, by password key """
+    throttles: Dict[str, int] = field(default_factory=dict)
+    """ The calls the backends throttled during the sync, by operation """
+
+    @property
+    def processed(self) -> int:
+        return self.created + self.updated + self.unchanged + self.skipped + len(self.failures)
+
+
+class Synchronizer:
+    """
+    Copies to `destination` the passwords of `source` that it does not have, or with another value
+
+    - Both listings are walked first, with their metadata. The passwords that the checkpoint
+      tells are in sync, and that were not written since in either backend, are skipped without
+      reading them
+    - The values of the other passwords are read in batches of `batch_size` keys from both
+      backends (`Backend.retrieve_passwords`), `max_workers` batches at a time, and compared
+    - Only the passwords missing or different are written, at most `write_rate` per second, shared
+      by all the workers. It defaults to the destination `WRITE_RATE_LIMIT`
+    - The passwords of the destination missing in the source are left untouched
+
+    Parameters
+    ==========
+    prefix: Optional[str]
+        Only syncs the passwords whose key starts with this prefix
+    dry_run: bool
+        Lists the changes to make in `SyncReport.changes`, without making them
+    checkpoint: Optional[SyncCheckpoint]
+        Loaded before the sync, and saved during it, so that an interrupted sync resumes where it
+        stopped and a sync run again only reads the passwords written since. Not saved by dry runs
+    on_progress: Optional[Callable[[SyncReport], None]]
+        Called after each batch, from the worker threads
+    """
+
+    BATCH_SIZE = 20
+
+    def __init__(
+        self,
+        source: Backend,
+        destination: Backend,
+        prefix: Optional[str] = None,
+        dry_run: bool = False,
+        checkpoint: Optional[SyncCheckpoint] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        batch_size: int = BATCH_SIZE,
+        write_rate: Optional[float] = None,
+        on_progress: Optional[Callable[[SyncReport], None]] = None,
+    ):
+        self.source = source
+        self.destination = destination
+        self.prefix = prefix
+        self.dry_run = dry_run
+        self.checkpoint = checkpoint
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        write_rate = write_rate or destination.WRITE_RATE_LIMIT
+        self._write_limiter = TokenBucket(write_rate) if write_rate else None
+        self._report = SyncReport()
+        self._report_lock = threading.Lock()
+        self._destination_passwords: Dict[str, PasswordMetadata] = {}
+        self._written: Dict[str, Fingerprint] = {}
+        """ The passwords written, with the fingerprint of their source """
+
+    def _iter_passwords(self, backend: Backend) -> Iterator[PasswordMetadata]:
+        for passwords in backend.iter_password_metadata_pages():
+            for password in passwords:
+                if self.prefix is None or password.key.startswith(self.prefix):
+                    yield password
+
+    def _destination_fingerprint(self, key: str) -> Fingerprint:
+        password = self._destination_passwords.get(key)
+        return fingerprint(password) if password is not None else None
+
+    def run(self) -> SyncReport:
+        source_throttles = self.source.throttle_counts()
+        destination_throttles = self.destination.throttle_counts()
+        if self.checkpoint is not None:
+            self.checkpoint.load()
+
+        try:
+            self._sync()
+            if self.checkpoint is not None and not self.dry_run:
+                self._checkpoint_written(self.checkpoint)
+        finally:
+            # Also when interrupted: the next sync resumes from there
+            if self.checkpoint is not None and not self.dry_run:
+                self.checkpoint.save()
+
+        # The 2 backends may share their AWS clients, and count the same throttles
+        self._report.throttles = throttles_since(source_throttles, self.source.throttle_counts())
+        for operation, count in throttles_since(
+            destination_throttles, self.destination.throttle_counts()
+        ).items():
+            self._report.throttles[operation] = max(count, self._report.throttles.get(operation, 0))
+        return self._report
+
+    def _sync(self) -> None:
+        self._destination_passwords = {
+            password.key: password for password in self._iter_passwords(self.destination)
+        }
+
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for batch in chunked(self._iter_to_compare(), self.batch_size):
+                in_flight.acquire()
+                future = executor.submit(self._sync_batch, batch)
+                future.add_done_callback(lambda _future: in_flight.release())
+
+    def _iter_to_compare(self) -> Iterator[PasswordMetadata]:
+        """ The passwords of the source that the checkpoint does not tell are in sync """
+        for password in self._iter_passwords(self.source):
+            if self.checkpoint is not None and self.checkpoint.is_in_sync(
+                password.key, fingerprint(password), self._destination_fingerprint(password.key),
+            ):
+                with self._report_lock:
+                    self._report.skipped += 1
+            else:
+                yield password
+
+    def _sync_batch(self, batch: List[PasswordMetadata]) -> None:
+        keys = [password.key for password in batch]
+        existing_keys = [key for key in keys if key in self._destination_passwords]
+        try:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                source_future = executor.submit(self.source.retrieve_passwords, keys)
+                destination_values = (
+                    self.destination.retrieve_passwords(existing_keys).values
+                    if existing_keys else {}
+                )
+                source_retrieval: BatchRetrieval = source_future.result()
+        except Exception as e:      # pylint:disable=broad-except
+            for key in keys:
+                self._record(key, failure=f'Could not read the values: {e}')
+            return
+
+        for password in batch:
+            key = password.key
+            if key not in source_retrieval.values:
+                self._record(key, failure=source_retrieval.errors.get(key, 'Not found'))
+                continue
+            value = source_retrieval.values[key]
+
+            write: Callable[[str, str], None]
+            if key in destination_values:
+                if destination_values[key] == value:
+                    if self.checkpoint is not None:
+                        self.checkpoint.record(
+                            key, fingerprint(password), self._destination_fingerprint(key),
+                        )
+                    self._record(key, outcome='unchanged')
+                    continue
+                write, outcome = self.destination.update_password, 'updated'
+            elif key in self._destination_passwords:
+                self._record(key, failure='Could not read the value of the destination')
+                continue
+            else:
+                write, outcome = self.destination.create_password, 'created'
+
+            if self.dry_run:
+                self._record(key, outcome=outcome, change=outcome[:-1])
+                continue
+
+            if self._write_limiter is not None:
+                self._write_limiter.acquire()
+            try:
+                write(key, value)
+            except Exception as e:      # pylint:disable=broad-except
+                self._record(key, failure=str(e))
+                continue
+            if self.checkpoint is not None:
+                # The fingerprint of the destination is only known once listed again
+                self.checkpoint.record(key, fingerprint(password), None)
+            with self._report_lock:
+                self._written[key] = fingerprint(password)
+            self._record(key, outcome=outcome)
+
+        if self.checkpoint is not None and not self.dry_run:
+            self.checkpoint.save_periodically()
+        if self.on_progress is not None:
+            self.on_progress(self._report)
+
+    def _checkpoint_written(self, checkpoint: SyncCheckpoint) -> None:
+        """ Lists the destination again, for the fingerprints of the passwords written """
+        if not self._written:
+            return
+        for password in self._iter_passwords(self.destination):
+            if password.key in self._written:
+                checkpoint.record(password.key, self._written[password.key], fingerprint(password))
+
+    def _record(
+        self,
+        key: str,
+        outcome: Optional[str] = None,
+        failure: Optional[str] = None,
+        change: Optional[str] = None,
+    ):
+        with self._report_lock:
+            if failure is not None:
+                self._report.failures[key] = failure
+            elif outcome is not None:
+                setattr(self._report, outcome, getattr(self._report, outcome) + 1)
+            if change is not None:
+                self._report.changes.append((change, key))
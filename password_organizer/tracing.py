@@ -0,0 +1,176 @@
+"""
+Opt-in tracing of a session (see `--trace`): spans of the backend operations, of the AWS API calls
+and of the menu renders, written as a Chrome trace (chrome://tracing, https://ui.perfetto.dev)
+
+Nothing is recorded unless a `Tracer` is started: the instrumented code checks `current_tracer()`.
+Only names, durations and counts are recorded, never a password value.
+"""
+from contextlib import contextmanager
+import cProfile
+from functools import wraps
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+
+BACKEND_OPERATIONS = (
+    'initialize',
+    'load_title_details',
+    'list_password_keys',
+    'retrieve_password',
+    'retrieve_passwords',
+    'create_password',
+    'update_password',
+    'delete_password',
+)
+""" The `Backend` methods traced (see `Backend.__init_subclass__`). Not the generators: their span
+would end before their pages are fetched """
+
+
+class Tracer:
+    """
+    Records spans and instant events, from any thread, in the Chrome trace event format
+
+    Timestamps are microseconds since the tracer was created
+    """
+
+    def __init__(self) -> None:
+        self._start = time.perf_counter()
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._thread_names: Dict[int, str] = {}
+
+    def now(self) -> float:
+        """ Microseconds since the tracer was created """
+        return (time.perf_counter() - self._start) * 1e6
+
+    def _record(self, event: Dict[str, Any]) -> None:
+        thread = threading.current_thread()
+        event.update(pid=os.getpid(), tid=thread.ident)
+        with self._lock:
+            self._events.append(event)
+            if thread.ident not in self._thread_names:
+                self._thread_names[thread.ident] = thread.name  # type:ignore
+
+    def complete(self, name: str, category: str, start: float, **args: Any) -> None:
+        """ Records a span that started at `start` (see `now`) and ends now """
+        self._record({
+            'name': name, 'cat': category, 'ph': 'X', 'ts': start, 'dur': self.now() - start,
+            'args': args,
+        })
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        """ Records the span of the block. The yielded dict holds the arguments of the span """
+        start = self.now()
+        try:
+            yield args
+        except BaseException as e:
+            args['error'] = type(e).__name__
+            raise
+        finally:
+            self.complete(name, category, start, **args)
+
+    def instant(self, name: str, category: str, **args: Any) -> None:
+        """ Records an event without duration, like a retry """
+        self._record({'name': name, 'cat': category, 'ph': 'i', 's': 't', 'ts': self.now(),
+                      'args': args})
+
+    def trace_events(self) -> List[Dict[str, Any]]:
+        """ The events recorded, preceded by the names of their threads """
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+             'args': {'name': thread_name}}
+            for tid, thread_name in thread_names.items()
+        ]
+        return metadata + events
+
+    def write(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as fp:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, fp)
+
+    def summary(self) -> List[Tuple[str, str, int, float, float]]:
+        """
+        The spans and events recorded, by category and name
+
+        Returns
+        -------
+        List[Tuple[str, str, int, float, float]]
+            (category, name, count, total milliseconds, maximum milliseconds). The longest first
+        """
+        rows: Dict[Tuple[str, str], List[float]] = {}
+        with self._lock:
+            for event in self._events:
+                rows.setdefault((event['cat'], event['name']), []).append(event.get('dur', 0))
+        return sorted(
+            (
+                (category, name, len(durations), sum(durations) / 1000, max(durations) / 1000)
+                for (category, name), durations in rows.items()
+            ),
+            key=lambda row: (-row[3], row[0], row[1]),
+        )
+
+    def print_summary(self, file: Optional[TextIO] = None) -> None:
+        """ Prints the `summary` table, to STDERR by default """
+        file = file or sys.stderr
+        print(f'\n{"category":10} {"name":40} {"count":>6} {"total ms":>10} {"max ms":>9}',
+              file=file)
+        for category, name, count, total, maximum in self.summary():
+            print(f'{category:10} {name:40} {count:6} {total:10.1f} {maximum:9.1f}', file=file)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def current_tracer() -> Optional[Tracer]:
+    """ The tracer of the session, None when not tracing """
+    return _tracer
+
+
+def traced_operation(method: Callable) -> Callable:
+    """ Records a span for each call of a backend method, when tracing """
+    if getattr(method, '__traced__', False):
+        return method
+    name = method.__qualname__
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        tracer = _tracer
+        if tracer is None:
+            return method(*args, **kwargs)
+        with tracer.span(name, 'backend'):
+            return method(*args, **kwargs)
+
+    wrapper.__traced__ = True   # type:ignore
+    return wrapper
+
+
+@contextmanager
+def tracing(trace_path: Optional[str], profile_path: Optional[str] = None) -> Iterator[None]:
+    """
+    Traces the block into `trace_path`, and profiles it with cProfile into `profile_path` (see
+    `pstats`). The summary of the trace is printed to STDERR at the end. Does nothing for `None`
+    """
+    global _tracer      # pylint:disable=global-statement
+    profiler = cProfile.Profile() if profile_path is not None else None
+    if trace_path is not None:
+        _tracer = Tracer()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None and profile_path is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        tracer, _tracer = _tracer, None
+        if tracer is not None and trace_path is not None:
+            tracer.write(trace_path)
+            tracer.print_summary()
+            print(f'Trace written to {trace_path}', file=sys.stderr)
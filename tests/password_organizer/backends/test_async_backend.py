@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+from password_organizer.backends.async_backend import ExecutorAdapter
+
+from .test_navigation import InMemoryBackend
+
+
+class SlowBackend(InMemoryBackend):
+    """ Each call waits for the other one: they only complete if they run concurrently """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def list_password_keys(self):
+        self.barrier.wait()
+        return super().list_password_keys()
+
+    def retrieve_password(self, key):
+        self.barrier.wait()
+        return super().retrieve_password(key)
+
+
+class TestExecutorAdapter:
+
+    def test_calls_overlap(self):
+        async_backend = SlowBackend().as_async()
+
+        async def both():
+            return await asyncio.gather(
+                async_backend.list_password_keys(),
+                async_backend.retrieve_password('key-1'),
+            )
+
+        listing, value = asyncio.run(both())
+
+        assert listing == (['key-1', 'key-2'], None)
+        assert value == 'value-1'
+
+    def test_is_built_once(self):
+        backend = InMemoryBackend()
+
+        assert isinstance(backend.as_async(), ExecutorAdapter)
+        assert backend.as_async() is backend.as_async()
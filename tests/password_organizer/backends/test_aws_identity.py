@@ -0,0 +1,44 @@
+from moto import mock_aws
+
+from password_organizer.backends import base_aws_backend
+from password_organizer.backends.aws_identity import AccountIdentity
+from password_organizer.backends.aws_ssm_backend import AWSSSMBackend
+
+
+class TestAccountIdentity:
+
+    @mock_aws
+    def test_fetched_then_cached(self, monkeypatch):
+        identity = AWSSSMBackend(region='eu-west-1').account_identity
+
+        assert identity.account_id == '123456789012'
+        assert identity.errors == {}
+
+        def fail(*args):
+            raise AssertionError('Should come from the cache')
+
+        monkeypatch.setattr(base_aws_backend, 'fetch_account_identity', fail)
+        assert AWSSSMBackend(region='eu-west-1').account_id == '123456789012'
+
+    @mock_aws
+    def test_failed_lookup_is_not_cached(self, monkeypatch):
+        calls = []
+
+        def fetch(*args):
+            calls.append(args)
+            return AccountIdentity(account_id='123456789012', errors={'account_alias': 'Denied'})
+
+        monkeypatch.setattr(base_aws_backend, 'fetch_account_identity', fetch)
+        backend = AWSSSMBackend(region='eu-west-1')
+        assert backend.account_identity.errors == {'account_alias': 'Denied'}
+        assert backend.account_id == '123456789012'
+        assert len(calls) == 2
+
+        AWSSSMBackend(region='eu-west-1').account_identity
+        assert len(calls) == 3
+
+    @mock_aws
+    def test_no_cache(self, monkeypatch, cache_home):
+        AWSSSMBackend(region='eu-west-1', identity_cache_ttl=None).account_identity
+
+        assert not (cache_home / 'password-organizer' / 'identities').exists()
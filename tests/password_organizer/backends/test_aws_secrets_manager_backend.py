@@ -0,0 +1,249 @@
+import asyncio
+import json
+
+from moto import mock_aws
+import pytest
+
+from password_organizer.backends import aws_secrets_manager_backend, base
+from password_organizer.backends.aws_secrets_manager_backend import (
+    AWSSecretsManagerBackend, BROWSE_FIELDS, FieldAction, FieldsWouldBeLost,
+)
+
+
+def _backend():
+    backend = AWSSecretsManagerBackend()
+    backend.region = 'eu-west-1'
+    backend._setup_aws_clients()
+    return backend
+
+
+def _count_calls(backend, operation):
+    calls = []
+    backend.secrets_cli.meta.events.register(
+        f'before-call.secrets-manager.{operation}', lambda **_kwargs: calls.append(operation),
+    )
+    return calls
+
+
+async def _awaited(task):
+    return await task()
+
+
+def _walk_pages(list_method):
+    pages = []
+    while list_method is not None:
+        password_keys, list_method = list_method()
+        pages.append(password_keys)
+    return pages
+
+
+class TestAWSSecretsManagerBackend:
+
+    @mock_aws
+    def test_list_password_keys_is_paginated(self):
+        backend = AWSSecretsManagerBackend(prefetch=False)
+        backend.region = 'eu-west-1'
+        backend._setup_aws_clients()
+        for i in range(25):
+            backend.create_password(f'secret-{i:02}', 'value')
+
+        pages = _walk_pages(backend.list_password_keys)
+
+        assert [len(page) for page in pages] == [10, 10, 5]
+        all_keys = sorted(key for page in pages for key in page)
+        assert all_keys == [f'secret-{i:02}' for i in range(25)]
+
+    @mock_aws
+    def test_list_password_keys_uses_the_largest_page_when_prefetching(self):
+        backend = AWSSecretsManagerBackend()
+        backend.region = 'eu-west-1'
+        backend._setup_aws_clients()
+        for i in range(150):
+            backend.create_password(f'secret-{i:03}', 'value')
+
+        pages = _walk_pages(backend.list_password_keys)
+
+        assert [len(page) for page in pages] == [100, 50]
+
+    @mock_aws
+    def test_retrieve_passwords_in_chunks(self):
+        backend = AWSSecretsManagerBackend()
+        backend.region = 'eu-west-1'
+        backend._setup_aws_clients()
+        keys = [f'secret-{i:02}' for i in range(25)]
+        for key in keys:
+            backend.create_password(key, f'value of {key}')
+
+        retrieval = backend.retrieve_passwords(keys + ['missing'])
+
+        assert retrieval.values == {key: f'value of {key}' for key in keys}
+        assert list(retrieval.errors) == ['missing']
+
+    @mock_aws
+    def test_search_password_keys(self):
+        backend = AWSSecretsManagerBackend()
+        backend.region = 'eu-west-1'
+        backend._setup_aws_clients()
+        for key in ['prod-db', 'prod-api', 'dev-db']:
+            backend.create_password(key, 'value')
+
+        found = [key for page in backend.search_password_keys('prod') for key in page]
+
+        assert sorted(found) == ['prod-api', 'prod-db']
+
+    @mock_aws
+    def test_fields_are_fetched_and_parsed_once(self):
+        backend = _backend()
+        fields = {f'field-{i:02}': f'value {i}' for i in range(20)}
+        backend.secrets_cli.create_secret(Name='app', SecretString=json.dumps(fields))
+        get_calls = _count_calls(backend, 'GetSecretValue')
+        batch_calls = _count_calls(backend, 'BatchGetSecretValue')
+
+        for name in fields:
+            assert backend.retrieve_fields('app')[name] == fields[name]
+        # A key/value secret, without a field named after it
+        assert json.loads(backend.retrieve_password('app')) == fields
+        assert backend.retrieve_passwords(['app']).values == {'app': json.dumps(fields)}
+
+        assert (len(get_calls), len(batch_calls)) == (1, 0)
+
+    @mock_aws
+    def test_cache_expires(self):
+        backend = AWSSecretsManagerBackend(secret_cache_ttl=0)
+        backend.region = 'eu-west-1'
+        backend._setup_aws_clients()
+        backend.create_password('app', 'value')
+        get_calls = _count_calls(backend, 'GetSecretValue')
+
+        backend.retrieve_password('app')
+        backend.retrieve_password('app')
+
+        assert len(get_calls) == 2
+
+    @mock_aws
+    def test_field_updates_are_merged_in_one_write(self):
+        backend = _backend()
+        backend.secrets_cli.create_secret(
+            Name='app', SecretString=json.dumps({'user': 'admin', 'password': 'old', 'port': 5432}),
+        )
+        update_calls = _count_calls(backend, 'UpdateSecret')
+
+        backend.update_fields('app', {'password': 'new', 'host': 'db'}, removed=['user'])
+
+        assert len(update_calls) == 1
+        expected = {'password': 'new', 'port': 5432, 'host': 'db'}
+        assert backend.retrieve_fields('app') == expected
+        # Written back, not only cached
+        assert _backend().retrieve_fields('app') == expected
+
+    @mock_aws
+    def test_update_password_keeps_the_other_fields(self):
+        backend = _backend()
+        backend.secrets_cli.create_secret(
+            Name='app', SecretString=json.dumps({'app': 'old', 'user': 'admin'}),
+        )
+
+        backend.update_password('app', 'new')
+
+        assert _backend().retrieve_fields('app') == {'app': 'new', 'user': 'admin'}
+        assert backend.retrieve_password('app') == 'new'
+
+    @mock_aws
+    def test_key_value_secret_round_trip(self):
+        backend = _backend()
+        backend.secrets_cli.create_secret(
+            Name='app', SecretString=json.dumps({'user': 'admin', 'password': 'old'}),
+        )
+
+        value = backend.retrieve_password('app')
+        backend.update_password('app', value)
+        assert _backend().retrieve_fields('app') == {'user': 'admin', 'password': 'old'}
+
+        backend.update_password('app', json.dumps({'user': 'admin', 'password': 'new'}))
+        assert _backend().retrieve_fields('app') == {'user': 'admin', 'password': 'new'}
+
+    @mock_aws
+    def test_update_password_does_not_drop_fields(self, monkeypatch):
+        backend = _backend()
+        secret = {'user': 'admin', 'password': 'old'}
+        backend.secrets_cli.create_secret(Name='app', SecretString=json.dumps(secret))
+
+        with pytest.raises(FieldsWouldBeLost, match='user, password'):
+            backend.update_password('app', 'new')
+
+        # From the menu: told, and back to the menu of the secret
+        printed = []
+        monkeypatch.setattr(base, 'read_password', lambda _message: 'new')
+        monkeypatch.setattr(base, 'wait_menu', lambda _message, task: asyncio.run(_awaited(task)))
+        monkeypatch.setattr(
+            aws_secrets_manager_backend, 'print_html', lambda html, _style: printed.append(html)
+        )
+        screen = backend._handle_update_password('app')
+
+        assert screen.func == backend.password_menu
+        assert BROWSE_FIELDS in printed[0]
+        assert _backend().retrieve_fields('app') == secret
+
+    @mock_aws
+    def test_update_password_of_a_plain_text_secret(self):
+        backend = _backend()
+        backend.secrets_cli.create_secret(Name='app', SecretString='not json')
+
+        backend.update_password('app', 'new')
+
+        assert _backend().retrieve_password('app') == 'new'
+
+    @mock_aws
+    def test_updates_read_the_secret_again(self):
+        backend = _backend()
+        backend.secrets_cli.create_secret(
+            Name='app', SecretString=json.dumps({'user': 'admin', 'password': 'old'}),
+        )
+        backend.retrieve_fields('app')
+        # Changed by someone else, while the secret is cached
+        _backend().update_fields('app', {'user': 'root'})
+        tokens = []
+        backend.secrets_cli.meta.events.register(
+            'provide-client-params.secrets-manager.UpdateSecret',
+            lambda params, **_kwargs: tokens.append(params['ClientRequestToken']),
+        )
+
+        backend.update_fields('app', {'password': 'new'})
+        backend.update_fields('app', {'password': 'newer'})
+
+        assert _backend().retrieve_fields('app') == {'user': 'root', 'password': 'newer'}
+        assert len(set(tokens)) == 2
+
+    @mock_aws
+    def test_field_menus(self, monkeypatch):
+        backend = _backend()
+        backend.secrets_cli.create_secret(
+            Name='app', SecretString=json.dumps({'user': 'admin', 'password': 'old'}),
+        )
+        answers = [
+            BROWSE_FIELDS, 'password', FieldAction.UPDATE,
+            FieldAction.ADD,
+            None,   # Back to the menu of the secret
+            None,
+        ]
+        for module in (base, aws_secrets_manager_backend):
+            monkeypatch.setattr(
+                module, 'list_choice_menu', lambda _choices, _message, **_kwargs: answers.pop(0),
+            )
+        monkeypatch.setattr(
+            aws_secrets_manager_backend, 'read_password', lambda _message: 'new value',
+        )
+        monkeypatch.setattr(aws_secrets_manager_backend, 'read_input', lambda _message: 'host')
+        monkeypatch.setattr(
+            aws_secrets_manager_backend, 'wait_menu',
+            lambda _message, task: asyncio.run(_awaited(task)),
+        )
+
+        screen = backend.password_menu('app')
+        while screen is not None:
+            screen = screen()
+
+        assert not answers
+        assert _backend().retrieve_fields('app') == {
+            'user': 'admin', 'password': 'new value', 'host': 'new value',
+        }
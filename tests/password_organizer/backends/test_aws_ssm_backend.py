@@ -0,0 +1,112 @@
+from moto import mock_aws
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+from password_organizer.backends.aws_ssm_backend import AWSSSMBackend
+from password_organizer.backends.path_tree import SUBTREE_PAGES
+
+
+def _backend(**kwargs):
+    backend = AWSSSMBackend(**kwargs)
+    backend.region = 'eu-west-1'
+    backend._setup_aws_clients()
+    return backend
+
+
+class TestAWSSSMBackend:
+
+    @mock_aws
+    def test_retrieve_passwords_in_chunks(self):
+        backend = _backend()
+        keys = [f'/prod/payments/key-{i:02}' for i in range(25)]
+        for key in keys:
+            backend.create_password(key, f'value of {key}')
+
+        retrieval = backend.retrieve_passwords(keys + ['/prod/payments/missing'])
+
+        assert retrieval.values == {key: f'value of {key}' for key in keys}
+        assert list(retrieval.errors) == ['/prod/payments/missing']
+
+    @mock_aws
+    def test_speculative_listing(self):
+        backend = _backend()
+        backend.create_password('/prod/key', 'value')
+
+        backend.start_speculative_listing()
+        # A spinner is displayed if the listing is not done yet
+        with create_pipe_input() as pipe_input:
+            with create_app_session(input=pipe_input, output=DummyOutput()):
+                first_page = backend._take_speculative_listing()
+
+        assert first_page is not None
+        assert first_page[0] == ['/prod/key']
+        # Consumed
+        assert backend._take_speculative_listing() is None
+
+    @mock_aws
+    def test_clients_are_reused_across_backends_and_regions(self):
+        backend = _backend()
+        ssm_cli = backend.ssm_cli
+
+        backend.region = 'us-east-1'
+        backend._setup_aws_clients()
+        assert backend.ssm_cli is not ssm_cli
+        assert backend.ssm_cli.meta.region_name == 'us-east-1'
+        assert backend.ssm_cli.meta.config.retries['mode'] == 'standard'
+
+        assert _backend().ssm_cli is ssm_cli
+
+    @mock_aws
+    def test_folders_are_listed_by_path(self):
+        backend = _backend()
+        for key in ['/prod/db/password', '/prod/db/user', '/prod/token', '/dev/key']:
+            backend.create_password(key, 'value')
+
+        folder = backend.path_tree.open('/prod/')
+        subtree_listing = folder.subtree_listing
+        if subtree_listing is not None:
+            subtree_listing.join(timeout=5)
+
+        content = []
+        folder.feed.subscribe(lambda added, _removed: content.extend(added))
+        assert folder.is_complete
+        assert sorted(choice.display_text for choice in content) == ['db/', 'token']
+        assert list(backend._iter_folder_keys_pages(backend.ssm_cli, '/prod/db/')) == [
+            ['/prod/db/password', '/prod/db/user'],
+        ]
+
+    @mock_aws
+    def test_opening_the_root_folder_lists_a_bounded_part_of_the_subtree(self):
+        backend = _backend()
+        for i in range(300):
+            backend.create_password(f'/app-{i:03}/key', 'value')
+        calls = []
+        backend.ssm_cli.meta.events.register(
+            'provide-client-params.ssm.DescribeParameters',
+            lambda params, **_kwargs: calls.append(params),
+        )
+
+        folder = backend.path_tree.open('/')
+        for listing in (folder.keys_listing, folder.subtree_listing):
+            listing.join(timeout=5)
+
+        assert len(calls) == SUBTREE_PAGES
+        assert all(
+            call['ParameterFilters'] == [{'Key': 'Path', 'Option': 'Recursive', 'Values': ['/']}]
+            for call in calls
+        )
+        assert not folder.is_complete
+
+    @mock_aws
+    def test_search_password_keys(self):
+        backend = _backend()
+        for key in ['/prod/db/password', '/prod/token', '/dev/db/password']:
+            backend.create_password(key, 'value')
+
+        def found(search_string):
+            pages = backend.search_password_keys(search_string)
+            return sorted(key for page in pages for key in page)
+
+        assert found('/prod/') == ['/prod/db/password', '/prod/token']
+        assert found('db/pass') == ['/dev/db/password', '/prod/db/password']
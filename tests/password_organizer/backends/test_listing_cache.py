@@ -0,0 +1,41 @@
+import os
+import time
+
+from password_organizer.backends.listing_cache import ListingCache
+
+
+class TestListingCache:
+
+    def test_save_then_load(self, tmp_path):
+        cache = ListingCache(['Backend', '123', 'eu-west-1'], directory=str(tmp_path))
+        cache.save(['a', 'b'])
+
+        cached = cache.load()
+
+        assert cached is not None
+        assert cached.password_keys == ['a', 'b']
+        assert cached.is_fresh(60)
+        assert oct(os.stat(cache.path).st_mode & 0o777) == oct(0o600)
+
+    def test_namespaces_are_isolated(self, tmp_path):
+        ListingCache(['Backend', '123', 'eu-west-1'], directory=str(tmp_path)).save(['a'])
+        assert ListingCache(['Backend', '123', 'us-east-1'], directory=str(tmp_path)).load() is None
+
+    def test_update_keeps_the_age(self, tmp_path):
+        cache = ListingCache(['Backend'], directory=str(tmp_path))
+        fetched_at = time.time() - 100
+        cache.save(['a', 'b'], fetched_at=fetched_at)
+
+        cache.update(added=['c'], removed=['a'])
+
+        cached = cache.load()
+        assert cached is not None
+        assert cached.password_keys == ['b', 'c']
+        assert cached.fetched_at == fetched_at
+        assert not cached.is_fresh(60)
+
+    def test_corrupted_cache_is_ignored(self, tmp_path):
+        cache = ListingCache(['Backend'], directory=str(tmp_path))
+        with open(cache.path, 'w') as fp:
+            fp.write('{not json')
+        assert cache.load() is None
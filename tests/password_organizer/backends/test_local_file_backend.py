@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from exceptions import ExitCode
+from password_organizer.backends.base import iter_pages
+from password_organizer.backends.local_file_backend import LocalFileBackend
+from password_organizer.password_organizer import main
+
+
+class TestLocalFileBackend:
+
+    def test_create_update_delete(self, local_backend):
+        local_backend.create_password('/app/a', 'value a')
+        local_backend.create_password('/app/b', 'value b')
+        local_backend.update_password('/app/a', 'new value a')
+        local_backend.delete_password('/app/b')
+
+        assert local_backend.retrieve_password('/app/a') == 'new value a'
+        with pytest.raises(LookupError):
+            local_backend.retrieve_password('/app/b')
+        with pytest.raises(LookupError):
+            local_backend.delete_password('/app/b')
+
+        retrieval = local_backend.retrieve_passwords(['/app/a', '/app/b'])
+        assert retrieval.values == {'/app/a': 'new value a'}
+        assert list(retrieval.errors) == ['/app/b']
+
+    def test_listing_pages(self, tmp_path):
+        backend = LocalFileBackend(
+            vault_path=str(tmp_path / 'vault.pov'), passphrase='secret', scrypt_n=16,
+            prefetch=False,
+        )
+        backend.initialize()
+        keys = [f'/app/key-{i:02}' for i in range(25)]
+        backend.vault.put_many((key, 'value') for key in keys)
+
+        pages = list(iter_pages(backend.list_password_keys))
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert [key for page in pages for key in page] == keys
+        assert list(backend.iter_password_keys_pages()) == [keys]
+        backend.close()
+
+    def test_search(self, local_backend):
+        local_backend.vault.put_many(
+            (key, 'value') for key in ('/prod/db', '/prod/api', '/test/db', '/production')
+        )
+
+        assert list(local_backend.search_password_keys('/prod/')) == [['/prod/api', '/prod/db']]
+        assert list(local_backend.search_password_keys('db')) == [['/prod/db', '/test/db']]
+
+    def test_vault_reopened(self, tmp_path):
+        path = str(tmp_path / 'vault.pov')
+        backend = LocalFileBackend(vault_path=path, passphrase='secret', scrypt_n=16)
+        backend.initialize()
+        backend.create_password('/app/a', 'value a')
+        backend.close()
+
+        backend = LocalFileBackend(vault_path=path, passphrase='secret')
+        backend.initialize()
+        assert backend.retrieve_password('/app/a') == 'value a'
+        backend.close()
+
+    def test_commands(self, capsys, monkeypatch, tmp_path):
+        monkeypatch.setenv('PASSWORD_ORGANIZER_PASSPHRASE', 'secret')
+
+        def run(*argv):
+            exit_code = main([
+                argv[0], '--backend', 'local', '--vault', str(tmp_path / 'vault.pov'), *argv[1:]
+            ])
+            return exit_code, capsys.readouterr().out
+
+        assert run('put', '/app/a', 'value a')[0] == 0
+        assert run('put', '/app/b', 'value b')[0] == 0
+        assert run('get', '/app/a', '/app/b')[1].splitlines() == [
+            json.dumps({'key': '/app/a', 'value': 'value a'}),
+            json.dumps({'key': '/app/b', 'value': 'value b'}),
+        ]
+        assert run('list', '--prefix', '/app/b') == (0, '/app/b\n')
+
+        monkeypatch.setenv('PASSWORD_ORGANIZER_PASSPHRASE', 'not the secret')
+        assert run('list')[0] == ExitCode.MISSING_AUTHENTICATION.value
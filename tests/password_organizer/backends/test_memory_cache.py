@@ -0,0 +1,25 @@
+import time
+
+from password_organizer.backends.memory_cache import ExpiringLRUCache
+
+
+class TestExpiringLRUCache:
+
+    def test_least_recently_used_entries_are_dropped(self):
+        cache = ExpiringLRUCache(max_entries=2, ttl=60)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+
+        assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+        assert len(cache) == 2
+
+    def test_entries_expire(self):
+        cache = ExpiringLRUCache(max_entries=2, ttl=0.05)
+        cache.put('a', 1)
+        assert cache.get('a') == 1
+        time.sleep(0.06)
+
+        assert cache.get('a') is None
+        assert len(cache) == 0
@@ -0,0 +1,118 @@
+import asyncio
+import inspect
+import io
+
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.output.plain_text import PlainTextOutput
+import pytest
+
+from password_organizer.backends import base
+from password_organizer.backends.aws_ssm_backend import AWSSSMBackend
+from password_organizer.backends.base import Backend, PasswordAction, RootAction
+
+
+class InMemoryBackend(Backend):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.passwords = {'key-1': 'value-1', 'key-2': 'value-2'}
+
+    def initialize(self):
+        pass
+
+    def title(self):
+        pass
+
+    def list_password_keys(self):
+        return list(self.passwords), None
+
+    def retrieve_password(self, key):
+        return self.passwords[key]
+
+    def create_password(self, password_key, password_value):
+        self.passwords[password_key] = password_value
+
+    def update_password(self, key, password_value):
+        self.passwords[key] = password_value
+
+    def delete_password(self, password_key):
+        del self.passwords[password_key]
+
+
+async def _awaited(task):
+    return await task()
+
+
+@pytest.fixture
+def menu_answers(monkeypatch):
+    """ Answers the menus with the values of the returned list, and records the stack depths """
+    answers = []
+    stack_depths = []
+
+    def list_choice_menu(choices, message, back=None, **kwargs):
+        stack_depths.append(len(inspect.stack(0)))
+        answer = answers.pop(0)
+        if answer is None and back is not None:
+            back()
+        return answer
+
+    monkeypatch.setattr(base, 'list_choice_menu', list_choice_menu)
+    monkeypatch.setattr(base, 'read_password', lambda _message: 'new-value')
+    monkeypatch.setattr(base, 'confirmation_menu', lambda _message: False)
+    monkeypatch.setattr(base, 'wait_menu', lambda _message, task: asyncio.run(_awaited(task)))
+    return answers, stack_depths
+
+
+class TestNavigation:
+
+    def test_main_menu_returns_when_going_back(self, menu_answers):
+        answers, _ = menu_answers
+        went_back = []
+        answers.extend([RootAction.LIST_PASSWORDS, None, None])
+
+        InMemoryBackend(back=lambda: went_back.append(True)).main_menu()
+
+        assert went_back == [True]
+        assert not answers
+
+    def test_stack_depth_stays_the_same(self, menu_answers):
+        answers, stack_depths = menu_answers
+        backend = InMemoryBackend(back=lambda: None)
+        for _ in range(200):
+            answers.extend([
+                RootAction.LIST_PASSWORDS, 'key-1', PasswordAction.UPDATE,
+                PasswordAction.RETRIEVE,    # Not confirmed: back to the password menu
+                None,                       # Back to the main menu
+            ])
+        answers.append(None)
+
+        backend.main_menu()
+
+        assert not answers
+        assert backend.passwords['key-1'] == 'new-value'
+        # As deep after 200 rounds as during the first one
+        assert max(stack_depths) == max(stack_depths[:5])
+
+    def test_retrieved_value_is_displayed_as_is(self, menu_answers, monkeypatch):
+        answers, _ = menu_answers
+        confirmations = []
+        monkeypatch.setattr(
+            base, 'confirmation_menu', lambda message: confirmations.append(message) or True
+        )
+        backend = InMemoryBackend()
+        backend.passwords['key<&>'] = 'a<b&c'
+
+        output = io.StringIO()
+        with create_app_session(output=PlainTextOutput(output)):
+            backend._handle_retrieve_password('key<&>')
+
+        # The confirmation message is plain text, not HTML
+        assert 'retrieve key<&>?' in confirmations[0]
+        assert output.getvalue().strip() == 'Password key<&>: a<b&c'
+        assert not answers
+
+    def test_server_side_search_when_overridden(self):
+        backend = InMemoryBackend()
+        assert not backend.has_server_side_search
+        assert list(backend.search_password_keys('key')) == []
+        assert AWSSSMBackend().has_server_side_search
@@ -0,0 +1,131 @@
+from password_organizer.backends.path_tree import FolderPath, parent_folder, PathTree
+from password_organizer.backends.prefetch import ListingFailed
+
+
+KEYS = [
+    '/prod/db/password',
+    '/prod/db/user',
+    '/prod/api/key',
+    '/prod/token',
+    '/dev/db/password',
+]
+
+
+def _content(folder):
+    """ The display texts and values of the folder, as its menu gets them """
+    content = {}
+
+    def listener(added, removed):
+        content.update((choice.display_text, choice.value) for choice in added)
+        for text, value in list(content.items()):
+            if value in removed:
+                del content[text]
+
+    folder.feed.subscribe(listener)
+    return content
+
+
+def _wait(path_tree, path):
+    folder = path_tree.open(path)
+    for listing in (folder.keys_listing, folder.subtree_listing):
+        if listing is not None:
+            listing.join(timeout=5)
+    path_tree.close(path)
+    return folder
+
+
+class FakeListings:
+
+    def __init__(self):
+        self.calls = []
+
+    def list_keys(self, path):
+        self.calls.append(('keys', path))
+        yield [key for key in KEYS if parent_folder(key) == path]
+
+    def list_subtree(self, path):
+        self.calls.append(('subtree', path))
+        matching = [key for key in KEYS if key.startswith(path)]
+        # One key per page
+        for key in matching:
+            yield [key]
+
+
+class TestPathTree:
+
+    def test_parent_folder(self):
+        assert parent_folder('/prod/db/password') == '/prod/db/'
+        assert parent_folder(FolderPath('/prod/db/')) == '/prod/'
+        assert parent_folder('/prod/') == '/'
+        assert parent_folder('password') == '/'
+
+    def test_folders_and_keys(self):
+        listings = FakeListings()
+        path_tree = PathTree(listings.list_keys, listings.list_subtree, subtree_pages=10)
+
+        root = _wait(path_tree, '/')
+
+        assert root.is_complete
+        assert _content(root) == {'prod/': '/prod/', 'dev/': '/dev/'}
+        assert isinstance(_content(root)['prod/'], FolderPath)
+        assert _content(path_tree.open('/prod/')) == {
+            'db/': '/prod/db/', 'api/': '/prod/api/', 'token': '/prod/token',
+        }
+
+    def test_complete_folders_are_not_listed_again(self):
+        listings = FakeListings()
+        path_tree = PathTree(listings.list_keys, listings.list_subtree, subtree_pages=10)
+        _wait(path_tree, '/prod/')
+        calls = list(listings.calls)
+
+        db_folder = _wait(path_tree, '/prod/db/')
+        _wait(path_tree, '/prod/')
+
+        assert listings.calls == calls
+        assert db_folder.is_complete
+        assert set(_content(db_folder)) == {'password', 'user'}
+
+    def test_created_and_deleted_keys(self):
+        listings = FakeListings()
+        path_tree = PathTree(listings.list_keys, listings.list_subtree, subtree_pages=10)
+        folder = _wait(path_tree, '/prod/db/')
+
+        path_tree.add_key('/prod/db/host')
+        path_tree.remove_key('/prod/db/user')
+        # Not loaded: ignored
+        path_tree.add_key('/staging/db/host')
+
+        assert set(_content(folder)) == {'password', 'host'}
+
+    def test_failed_listing_is_reported(self):
+        listings = FakeListings()
+
+        def failing_subtree(path):
+            yield from listings.list_subtree(path)
+            raise RuntimeError('boom')
+
+        path_tree = PathTree(listings.list_keys, failing_subtree, subtree_pages=10)
+        folder = _wait(path_tree, '/prod/')
+
+        assert not folder.is_complete
+        content = _content(folder)
+        assert content['Listing failed'] is ListingFailed
+        assert content['token'] == '/prod/token'
+
+    def test_subtree_listing_is_fetched_on_demand(self):
+        listings = FakeListings()
+        path_tree = PathTree(listings.list_keys, listings.list_subtree, subtree_pages=3)
+
+        # One key per page: 3 of the 5 keys, all below /prod/
+        root = _wait(path_tree, '/')
+        assert not root.is_complete
+        assert set(_content(root)) == {'prod/'}
+        # Not resumed by opening the folder again
+        _wait(path_tree, '/')
+        assert set(_content(root)) == {'prod/'}
+
+        path_tree.open('/')
+        path_tree.load_more('/')
+        _wait(path_tree, '/')
+        assert root.is_complete
+        assert set(_content(root)) == {'prod/', 'dev/'}
@@ -0,0 +1,119 @@
+from functools import partial
+import threading
+
+from moto import mock_aws
+
+from password_organizer.backends.aws_ssm_backend import AWSSSMBackend
+from password_organizer.backends.base import iter_pages
+from password_organizer.backends.prefetch import (
+    ListingFailed, PasswordKeysPrefetcher, PausablePrefetcher,
+)
+
+
+def _page(index, page_count):
+    next_method = partial(_page, index + 1, page_count) if index + 1 < page_count else None
+    return [f'key-{index}'], next_method
+
+
+class TestPasswordKeysPrefetcher:
+
+    def test_fetches_all_pages(self):
+        pages = []
+        done = []
+        prefetcher = PasswordKeysPrefetcher(
+            iter_pages(partial(_page, 0, 5)), pages.append, lambda: done.append(True)
+        )
+        prefetcher.start()
+        prefetcher.join(timeout=5)
+        assert prefetcher.is_done
+        assert pages == [[f'key-{i}'] for i in range(5)]
+        assert done == [True]
+
+    def test_reports_the_error(self):
+        def failing_page():
+            raise RuntimeError('boom')
+
+        done = []
+        errors = []
+        prefetcher = PasswordKeysPrefetcher(
+            iter_pages(failing_page), lambda _keys: None, lambda: done.append(True), errors.append
+        )
+        prefetcher.start()
+        prefetcher.join(timeout=5)
+        assert [str(error) for error in errors] == ['boom']
+        assert done == []
+
+
+class TestPausablePrefetcher:
+
+    def test_resumes_where_it_was_paused(self):
+        pages = []
+        done = []
+        fetched = threading.Event()
+        proceed = threading.Event()
+
+        def page_listing():
+            yield ['key-0']
+            fetched.set()
+            proceed.wait(timeout=5)
+            yield ['key-1']
+            yield ['key-2']
+
+        prefetcher = PausablePrefetcher(page_listing(), pages.append, lambda: done.append(True))
+        prefetcher.resume()
+        fetched.wait(timeout=5)
+        prefetcher.pause()
+        proceed.set()
+        prefetcher.join(timeout=5)
+        # The page being fetched when paused is kept
+        assert pages == [['key-0'], ['key-1']]
+        assert not prefetcher.is_done
+
+        prefetcher.resume()
+        prefetcher.join(timeout=5)
+        assert pages == [['key-0'], ['key-1'], ['key-2']]
+        assert prefetcher.is_done
+        assert done == [True]
+
+    def test_reports_the_error(self):
+        def page_listing():
+            yield ['key-0']
+            raise RuntimeError('boom')
+
+        pages = []
+        done = []
+        errors = []
+        prefetcher = PausablePrefetcher(
+            page_listing(), pages.append, lambda: done.append(True), errors.append
+        )
+        prefetcher.resume()
+        prefetcher.join(timeout=5)
+        assert pages == [['key-0']]
+        assert [str(error) for error in errors] == ['boom']
+        assert done == []
+        assert prefetcher.is_done
+
+
+class TestListingRefresh:
+
+    @mock_aws
+    def test_failed_refresh_is_reported_and_not_cached(self, monkeypatch):
+        backend = AWSSSMBackend(region='eu-west-1', listing_cache_ttl=60)
+        backend.initialize()
+
+        def failing_listing():
+            yield ['/app/new']
+            raise RuntimeError('boom')
+
+        monkeypatch.setattr(backend, 'iter_password_keys_pages', failing_listing)
+        feed = backend._start_listing_refresh(['/app/old'])
+        backend._listing_refresh[0].join(timeout=5)
+
+        added, removed = [], []
+        feed.subscribe(lambda new, gone: (added.extend(new), removed.extend(gone)))
+        assert [(choice.value, choice.disabled_reason) for choice in added] == [
+            ('/app/new', None), (ListingFailed, 'boom'),
+        ]
+        # Partial: nothing is known to be deleted, and the cache is not filled with it
+        assert removed == []
+        assert backend.listing_cache.load() is None
@@ -0,0 +1,57 @@
+import time
+
+from password_organizer.backends.rate_limit import (
+    AdaptiveRateController, RateControllers, throttles_since,
+)
+
+
+class TestAdaptiveRateController:
+
+    def test_unlimited_until_throttled(self):
+        controller = AdaptiveRateController()
+        call_times = [controller.acquire() for _ in range(8)]
+        assert controller.rate is None
+
+        controller.on_throttle(call_times[-1])
+        # Half of the 8 calls of the last second
+        assert controller.rate == 4
+        # Sent before the rate dropped: only counted
+        controller.on_throttle(call_times[-2])
+        assert controller.rate == 4
+        assert (controller.calls, controller.throttles) == (8, 2)
+
+    def test_additive_increase_multiplicative_decrease(self):
+        controller = AdaptiveRateController(min_rate=10, max_rate=50)
+        controller.on_throttle(controller.acquire())
+        assert controller.rate == 10
+
+        for _ in range(2000):
+            controller.on_success()
+        assert controller.rate == 50
+
+        controller.on_throttle(controller.acquire())
+        assert controller.rate == 25
+
+    def test_calls_are_spaced(self):
+        controller = AdaptiveRateController(min_rate=20, jitter=0.1)
+        controller.on_throttle(controller.acquire())
+        start = time.monotonic()
+        for _ in range(4):
+            controller.acquire()
+        # 4 intervals of 1/20s, give or take 10%
+        assert time.monotonic() - start >= 4 * 0.9 / 20
+
+
+class TestRateControllers:
+
+    def test_one_controller_per_operation(self):
+        controllers = RateControllers()
+        put_parameter = controllers.controller('ssm', 'eu-west-1', 'PutParameter')
+        assert controllers.controller('ssm', 'eu-west-1', 'PutParameter') is put_parameter
+        assert controllers.controller('ssm', 'us-east-1', 'PutParameter') is not put_parameter
+
+        put_parameter.on_throttle(put_parameter.acquire())
+        assert controllers.throttle_counts() == {('ssm', 'eu-west-1', 'PutParameter'): 1}
+
+    def test_throttles_since(self):
+        assert throttles_since({'a': 1, 'b': 2}, {'a': 1, 'b': 5, 'c': 1}) == {'b': 3, 'c': 1}
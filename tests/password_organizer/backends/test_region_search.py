@@ -0,0 +1,105 @@
+import threading
+import time
+
+from moto import mock_aws
+
+from password_organizer.backends.aws_secrets_manager_backend import AWSSecretsManagerBackend
+from password_organizer.backends.aws_ssm_backend import AWSSSMBackend
+from password_organizer.backends.region_search import RegionSearch, RegionTimeout
+
+
+def _list_region(region):
+    if region == 'broken':
+        raise RuntimeError('Not enabled')
+    if region == 'slow':
+        time.sleep(0.3)
+    yield [f'{region}-a', f'{region}-b']
+    yield [f'{region}-c']
+
+
+class TestRegionSearch:
+
+    def test_merges_regions_and_reports_failures(self):
+        pages = []
+        done = {}
+        search = RegionSearch(
+            _list_region,
+            ['eu-west-1', 'broken', 'slow', 'us-east-1'],
+            lambda region, keys: pages.append((region, keys)),
+            done.__setitem__,
+            max_workers=2,
+            region_timeout=0.1,
+        )
+        search.start()
+        search.join(timeout=5)
+
+        assert search.is_done
+        assert sorted(key for region, keys in pages for key in keys) == [
+            f'{region}-{suffix}' for region in ('eu-west-1', 'us-east-1') for suffix in 'abc'
+        ]
+        assert done['eu-west-1'] is None
+        assert done['us-east-1'] is None
+        assert isinstance(done['broken'], RuntimeError)
+        assert isinstance(done['slow'], RegionTimeout)
+
+    def test_region_whose_first_call_blocks_is_abandoned(self):
+        unblock = threading.Event()
+        done = {}
+
+        def list_region(region):
+            if region == 'blocked':
+                unblock.wait(timeout=10)
+            yield [f'{region}-a']
+
+        search = RegionSearch(
+            list_region,
+            ['blocked', 'eu-west-1'],
+            lambda _region, _keys: None,
+            done.__setitem__,
+            max_workers=1,
+            region_timeout=0.2,
+        )
+        started = time.monotonic()
+        search.start()
+        search.join(timeout=5)
+        unblock.set()
+
+        assert time.monotonic() - started < 2
+        assert isinstance(done['blocked'], RegionTimeout)
+        assert done['eu-west-1'] is None
+
+    @mock_aws
+    def test_lists_backend_regions(self):
+        for region in ('eu-west-1', 'us-east-1'):
+            AWSSSMBackend(region=region).in_region(region).create_password(f'/{region}', 'value')
+        backend = AWSSSMBackend(region='eu-west-1')
+        backend.initialize()
+
+        found = {}
+        search = RegionSearch(
+            lambda region: backend.in_region(region).iter_password_keys_pages(),
+            ['eu-west-1', 'us-east-1', 'eu-central-1'],
+            lambda region, keys: found.setdefault(region, []).extend(keys),
+        )
+        search.start()
+        search.join(timeout=10)
+
+        assert found == {
+            'eu-west-1': ['/eu-west-1'], 'us-east-1': ['/us-east-1'], 'eu-central-1': [],
+        }
+        assert backend.region == 'eu-west-1'
+
+    @mock_aws
+    def test_backend_in_another_region_shares_nothing_mutable(self):
+        backend = AWSSecretsManagerBackend(
+            region='eu-west-1', prefetch=True, region_search_timeout=3, secret_cache_ttl=5
+        )
+        backend.initialize()
+
+        copy = backend.in_region('us-east-1')
+
+        assert (copy.region, backend.region) == ('us-east-1', 'eu-west-1')
+        assert copy.client_pool is backend.client_pool
+        assert (copy._prefetch, copy._region_search_timeout, copy._secret_cache_ttl) == (True, 3, 5)
+        for attribute in ('_account_identity_lock', '_listing_refresh_lock', '_secret_cache'):
+            assert getattr(copy, attribute) is not getattr(backend, attribute)
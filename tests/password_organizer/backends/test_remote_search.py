@@ -0,0 +1,94 @@
+import threading
+
+from password_organizer.backends.remote_search import RemoteSearch, SearchFailed
+from password_organizer.cli_menu.choice import Choice, ChoicesFeed
+
+
+KEYS = ['prod-db', 'prod-api', 'dev-db', 'dev-api']
+
+
+def _values(feed):
+    values = []
+    feed.subscribe(lambda added, _removed: values.extend(choice.value for choice in added))
+    return values
+
+
+class TestRemoteSearch:
+
+    def test_typing_is_debounced_and_results_merged(self):
+        queries = []
+
+        def search_pages(search_string):
+            queries.append(search_string)
+            yield [key for key in KEYS if search_string in key]
+
+        feed = ChoicesFeed()
+        remote_search = RemoteSearch(search_pages, feed, ['prod-db'], debounce=0.2)
+        for search_string in ('d', 'db', 'db-', 'db'):
+            remote_search.search(search_string)
+        remote_search.join(timeout=5)
+
+        assert queries == ['db']
+        # Already in the menu: not pushed again
+        assert _values(feed) == ['dev-db']
+
+    def test_new_search_cancels_the_query_in_progress(self):
+        first_page_pushed = threading.Event()
+        resume = threading.Event()
+        pages_fetched = []
+
+        def search_pages(search_string):
+            for page in ('first', 'second'):
+                pages_fetched.append(page)
+                yield [f'{search_string}-{page}']
+
+        def on_first_page(_added, _removed):
+            # Holds the query in between 2 pages
+            if not first_page_pushed.is_set():
+                first_page_pushed.set()
+                resume.wait(timeout=5)
+
+        feed = ChoicesFeed()
+        feed.subscribe(on_first_page)
+        remote_search = RemoteSearch(search_pages, feed, [], debounce=0)
+        remote_search.search('old')
+        first_page_pushed.wait(timeout=5)
+        remote_search.search('x')   # Too short: cancels only
+        resume.set()
+        remote_search.join(timeout=5)
+
+        assert _values(feed) == ['old-first']
+        assert pages_fetched == ['first']
+
+    def test_forwards_other_feeds_without_duplicates(self):
+        source = ChoicesFeed()
+        feed = ChoicesFeed()
+        remote_search = RemoteSearch(lambda _: iter([['dev-db']]), feed, [], debounce=0)
+        remote_search.forward(source)
+        remote_search.search('db')
+        remote_search.join(timeout=5)
+
+        source.push([Choice.from_string('dev-db'), Choice.from_string('prod-db')])
+        remote_search.cancel()
+        source.push([Choice.from_string('dev-api')])
+
+        assert _values(feed) == ['dev-db', 'prod-db']
+
+    def test_failed_search_is_reported(self):
+        def search_pages(search_string):
+            yield [f'{search_string}-first']
+            raise RuntimeError('boom')
+
+        feed = ChoicesFeed()
+        remote_search = RemoteSearch(search_pages, feed, [], debounce=0)
+        for _ in range(2):
+            remote_search.search('db')
+            remote_search.join(timeout=5)
+
+        added = []
+        feed.subscribe(lambda choices, _removed: added.extend(choices))
+        # Once per search string, found when searching it
+        assert [(choice.display_text, choice.disabled_reason) for choice in added] == [
+            ('db-first', None), ('Search failed: db', 'boom'),
+        ]
+        assert added[1].value == (SearchFailed, 'db')
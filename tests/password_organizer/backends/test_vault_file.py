@@ -0,0 +1,183 @@
+import os
+
+import pytest
+
+from exceptions import InvalidVault, WrongPassphrase
+from password_organizer.backends.vault_file import (
+    DELETE, RECORD_HEADER, RECORD_MAC_SIZE, VAULT_HEADER, VaultFile,
+)
+
+
+def _vault(path, passphrase='secret', **kwargs):
+    return VaultFile(str(path), passphrase, scrypt_n=16, **kwargs)
+
+
+def _flip_byte(path, offset):
+    with open(path, 'r+b') as fp:
+        fp.seek(offset, os.SEEK_SET if offset >= 0 else os.SEEK_END)
+        byte = fp.read(1)
+        fp.seek(-1, os.SEEK_CUR)
+        fp.write(bytes([byte[0] ^ 1]))
+
+
+class TestVaultFile:
+
+    def test_put_get_delete(self, tmp_path):
+        with _vault(tmp_path / 'vault') as vault:
+            vault.put('/app/a', 'value a')
+            vault.put_many([('/app/b', 'value b'), ('/app/é', 'välue')])
+            vault.put('/app/a', 'new value a')
+            assert vault.delete('/app/b')
+            assert not vault.delete('/app/missing')
+
+            assert vault.get('/app/a') == 'new value a'
+            assert vault.get('/app/b') is None
+            assert vault.get('/app/é') == 'välue'
+            assert '/app/a' in vault
+            assert len(vault) == 2
+
+        with _vault(tmp_path / 'vault') as vault:
+            assert list(vault.keys()) == ['/app/a', '/app/é']
+            assert vault.get('/app/a') == 'new value a'
+
+    def test_values_are_encrypted(self, tmp_path):
+        with _vault(tmp_path / 'vault') as vault:
+            vault.put('/app/a', 'very secret value')
+        with open(tmp_path / 'vault', 'rb') as fp:
+            content = fp.read()
+        assert b'/app/a' in content
+        assert b'very secret value' not in content
+
+    def test_wrong_passphrase(self, tmp_path):
+        _vault(tmp_path / 'vault').close()
+        with pytest.raises(WrongPassphrase):
+            _vault(tmp_path / 'vault', passphrase='not the secret')
+
+    def test_not_a_vault(self, tmp_path):
+        (tmp_path / 'vault').write_bytes(b'x' * VAULT_HEADER.size)
+        with pytest.raises(InvalidVault):
+            _vault(tmp_path / 'vault')
+
+    def test_tampered_value(self, tmp_path):
+        with _vault(tmp_path / 'vault') as vault:
+            vault.put('/app/a', 'value a')
+            vault.compact()
+            vault.put('/app/b', 'value b')
+        _flip_byte(tmp_path / 'vault', VAULT_HEADER.size + RECORD_HEADER.size + 10)
+
+        # Indexed: found when read
+        with _vault(tmp_path / 'vault') as vault:
+            with pytest.raises(InvalidVault):
+                vault.get('/app/a')
+            assert vault.get('/app/b') == 'value b'
+
+        # Appended since the index: found when the vault is opened
+        _flip_byte(tmp_path / 'vault', -RECORD_MAC_SIZE - 1)
+        with pytest.raises(InvalidVault):
+            _vault(tmp_path / 'vault')
+
+    def test_forged_records_are_detected(self, tmp_path):
+        with _vault(tmp_path / 'vault') as vault:
+            vault.put('/app/a', 'old value')
+            size = os.path.getsize(tmp_path / 'vault')
+            vault.put('/app/a', 'new value')
+        with open(tmp_path / 'vault', 'rb') as fp:
+            old_record = fp.read()[VAULT_HEADER.size:size]
+        key = b'/app/a'
+        deletion = RECORD_HEADER.pack(3 + len(key) + RECORD_MAC_SIZE, DELETE, len(key)) + key
+
+        # Replayed, or without a valid MAC: rejected, unless last (interrupted while written)
+        for appended in (old_record, deletion + b'x' * RECORD_MAC_SIZE):
+            vault_copy = tmp_path / 'copy'
+            vault_copy.write_bytes((tmp_path / 'vault').read_bytes() + appended + appended)
+            with pytest.raises(InvalidVault):
+                _vault(vault_copy)
+
+    def test_incomplete_record_is_dropped(self, tmp_path):
+        with _vault(tmp_path / 'vault') as vault:
+            vault.put('/app/a', 'value a')
+            size = os.path.getsize(tmp_path / 'vault')
+            vault.put('/app/b', 'value b')
+        with open(tmp_path / 'vault', 'r+b') as fp:
+            fp.truncate(size + 10)
+
+        with _vault(tmp_path / 'vault') as vault:
+            assert list(vault.keys()) == ['/app/a']
+            assert os.path.getsize(tmp_path / 'vault') == size
+            vault.put('/app/c', 'value c')
+        with _vault(tmp_path / 'vault') as vault:
+            assert vault.get('/app/c') == 'value c'
+
+    def test_keys_merge_index_and_appended_records(self, tmp_path):
+        with _vault(tmp_path / 'vault') as vault:
+            vault.put_many((f'/app/{i:03}', str(i)) for i in range(0, 100, 2))
+            vault.compact()
+            vault.put_many((f'/app/{i:03}', str(i)) for i in range(1, 100, 2))
+            vault.put('/other/a', 'a')
+            vault.delete('/app/050')
+
+            keys = list(vault.keys(prefix='/app/'))
+            assert keys == [f'/app/{i:03}' for i in range(100) if i != 50]
+            assert list(vault.keys(prefix='/app/09', start_after='/app/095')) == [
+                '/app/096', '/app/097', '/app/098', '/app/099',
+            ]
+            assert list(vault.keys(prefix='/b')) == []
+            assert len(vault) == 100
+            assert vault.get('/app/050') is None
+            assert vault.get('/app/051') == '51'
+
+    def test_compaction(self, tmp_path):
+        with _vault(tmp_path / 'vault', compaction_threshold=10) as vault:
+            for i in range(100):
+                vault.put('/app/a', f'value {i}')
+            vault_size, _ = vault.file_sizes()
+            vault.compact()
+            assert vault.file_sizes()[0] < vault_size / 5
+            assert vault.get('/app/a') == 'value 99'
+
+        with _vault(tmp_path / 'vault') as vault:
+            assert list(vault.keys()) == ['/app/a']
+            assert vault.get('/app/a') == 'value 99'
+
+    def test_index_of_another_vault_is_rebuilt(self, tmp_path):
+        with _vault(tmp_path / 'vault') as vault:
+            vault.put('/app/a', 'value a')
+            vault.compact()
+        with _vault(tmp_path / 'other') as other:
+            other.put('/other/b', 'value b')
+            other.compact()
+        os.replace(tmp_path / 'other.index', tmp_path / 'vault.index')
+
+        with _vault(tmp_path / 'vault') as vault:
+            assert list(vault.keys()) == ['/app/a']
+            assert vault.get('/app/a') == 'value a'
+
+    def test_tampered_index_is_rebuilt(self, tmp_path):
+        with _vault(tmp_path / 'vault') as vault:
+            vault.put_many([('/app/a', 'value a'), ('/app/b', 'value b')])
+            vault.compact()
+        _flip_byte(tmp_path / 'vault.index', -1)
+
+        with _vault(tmp_path / 'vault') as vault:
+            assert list(vault.keys()) == ['/app/a', '/app/b']
+            assert vault.get('/app/b') == 'value b'
+
+    def test_two_handles(self, tmp_path):
+        """ Like 2 processes: they only share the files """
+        with _vault(tmp_path / 'vault') as first, _vault(tmp_path / 'vault') as second:
+            first.put('/app/a', 'value a')
+            assert second.get('/app/a') == 'value a'
+            second.put('/app/b', 'value b')
+
+            first.compact()
+            second.put('/app/c', 'value c')
+            second.delete('/app/a')
+            assert list(first.keys()) == ['/app/b', '/app/c']
+            assert first.get('/app/c') == 'value c'
+
+            second.compact()
+            first.put('/app/d', 'value d')
+            assert list(second.keys()) == ['/app/b', '/app/c', '/app/d']
+
+        with _vault(tmp_path / 'vault') as vault:
+            assert [vault.get(key) for key in vault.keys()] == ['value b', 'value c', 'value d']
@@ -1,4 +1,16 @@
+from password_organizer.cli_menu.prompts.listmenu import Choice
+
+
 class TestChoice:
 
     def test_bar(self):
         assert True
+
+    def test_is_slotted(self):
+        choice = Choice.from_string('a')
+        assert not hasattr(choice, '__dict__')
+
+    def test_equality(self):
+        assert Choice('a', 1) == Choice('a', 1, None)
+        assert Choice('a', 1) != Choice('a', 1, 'Disabled')
+        assert Choice('a', 1) != ('a', 1, None)
@@ -0,0 +1,93 @@
+from password_organizer.cli_menu.prompts.listmenu import Choice, ChoicesControl, ChoicesFeed
+
+
+def _control(choices, footer_choices=None):
+    return ChoicesControl(
+        [Choice.from_string(choice) for choice in choices],
+        footer_choices=[Choice.from_string(choice) for choice in footer_choices or []],
+        default=None,
+    )
+
+
+class TestChoicesControl:
+
+    def test_update_choices_keeps_footer_at_the_bottom(self):
+        control = _control(['a'], footer_choices=['Exit'])
+        control.update_choices([Choice.from_string('b')], [])
+        assert [c.value for c in control._get_available_choices()] == ['a', 'b', 'Exit']
+
+    def test_update_choices_removes_values(self):
+        control = _control(['a', 'b', 'c'])
+        control.update_choices([], ['b'])
+        assert [c.value for c in control._get_available_choices()] == ['a', 'c']
+
+        control = _control([f'key-{i}' for i in range(40000)])
+        control.update_choices([], [f'key-{i}' for i in range(0, 40000, 2)])
+        assert len(control._get_available_choices()) == 20000
+
+        # Unhashable values
+        control = ChoicesControl([Choice('a', ['a']), Choice('b', ['b'])], default=None)
+        control.update_choices([], [['a']])
+        assert [c.value for c in control._get_available_choices()] == [['b']]
+
+    def test_search_applies_to_added_choices(self):
+        control = _control(['a'])
+        control.append_to_search_string('b')
+        control.update_choices([Choice.from_string('b')], [])
+        assert control.get_selection().value == 'b'
+
+    def test_search_selects_the_best_match(self):
+        control = _control(['/prod/adbtool', '/prod/svc/db'], footer_choices=['Exit'])
+        control.select_next_choice()
+        for character in 'DB':
+            control.append_to_search_string(character)
+        assert [c.value for c in control._get_available_choices()] == [
+            '/prod/svc/db', '/prod/adbtool'
+        ]
+        assert control.get_selection().value == '/prod/svc/db'
+
+        control.remove_last_char_from_search_string()
+        control.remove_last_char_from_search_string()
+        assert [c.value for c in control._get_available_choices()] == [
+            '/prod/adbtool', '/prod/svc/db', 'Exit'
+        ]
+
+
+class TestChoicesFeed:
+
+    def test_subscriber_receives_backlog_then_updates(self):
+        feed: ChoicesFeed[str] = ChoicesFeed()
+        feed.push([Choice.from_string('a')])
+        received = []
+        feed.subscribe(lambda added, removed: received.append(([c.value for c in added], removed)))
+        feed.push([Choice.from_string('b')])
+        feed.discard(['a'])
+        assert received == [(['a'], []), (['b'], []), ([], ['a'])]
+
+
+class TestChoicesControlViewport:
+
+    def test_only_the_viewport_is_laid_out(self):
+        control = _control([f'key-{i}' for i in range(100000)], footer_choices=['Exit'])
+
+        assert control.preferred_height(80, 20, False, None) == 20
+        assert control.preferred_width(200) == len('key-99999')
+
+        control.update_choices([Choice.from_string('a-much-longer-key')], [])
+        assert control.preferred_width(200) == len('a-much-longer-key')
+
+    def test_selection_is_index_based(self):
+        control = _control(['a', 'b', 'c'], footer_choices=['Exit'])
+        control.update_choices([Choice('d', 'd', disabled_reason='Not allowed')], [])
+
+        control.select_previous_choice()
+        assert control.get_selection().value == 'Exit'
+        control.select_previous_choice()
+        # Skips the disabled choice
+        assert control.get_selection().value == 'c'
+        assert control.create_content(80, 10).cursor_position.y == 2
+
+        # Added before the selection
+        control.update_choices([Choice.from_string('e')], ['a'])
+        assert control.get_selection().value == 'c'
+        assert control.create_content(80, 10).cursor_position.y == 1
@@ -0,0 +1,49 @@
+from password_organizer.cli_menu.choice import Choice
+from password_organizer.cli_menu.search import ChoicesIndex
+
+
+KEYS = [
+    '/prod/svc/api-key',
+    '/prod/svc/db/password',
+    '/dev/svc/DB-password',
+    '/prod/payments/token',
+    '/staging/dbadmin/password',
+]
+
+
+def _search(index, search_string):
+    return [choice.value for choice in index.search(search_string)]
+
+
+class TestChoicesIndex:
+
+    def test_ranks_segment_then_substring_then_fuzzy(self):
+        index = ChoicesIndex([Choice.from_string(key) for key in KEYS])
+
+        assert _search(index, 'db') == [
+            # Starts a segment, case insensitive
+            '/prod/svc/db/password', '/dev/svc/DB-password', '/staging/dbadmin/password',
+        ]
+        assert _search(index, 'min') == ['/staging/dbadmin/password']
+        assert _search(index, 'svcpw') == [
+            # Fuzzy
+            '/prod/svc/db/password', '/dev/svc/DB-password',
+        ]
+
+    def test_narrows_and_widens(self):
+        index = ChoicesIndex([Choice.from_string(key) for key in KEYS])
+
+        assert _search(index, 'p') == KEYS
+        assert _search(index, 'pay') == ['/prod/payments/token', '/prod/svc/api-key']
+        assert _search(index, 'paym') == ['/prod/payments/token']
+        assert _search(index, 'pa') == _search(ChoicesIndex(index.search('')), 'pa')
+        assert _search(index, 'xyz') == []
+        assert _search(index, '') == KEYS
+
+    def test_add_and_separators(self):
+        index = ChoicesIndex([Choice.from_string(KEYS[0]), Choice.separator()])
+        index.add([Choice.from_string(KEYS[1])])
+
+        assert len(index) == 2
+        assert _search(index, '/prod/svc') == KEYS[:2]
+        assert _search(index, '-') == [KEYS[0]]
@@ -0,0 +1,41 @@
+import pytest
+
+from password_organizer.backends.aws_clients import reset_default_client_pool
+
+
+@pytest.fixture(autouse=True)
+def aws_credentials(monkeypatch):
+    """ Fake credentials, so that no test can reach a real AWS account """
+    for variable in (
+        'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN', 'AWS_SECURITY_TOKEN'
+    ):
+        monkeypatch.setenv(variable, 'x')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+
+
+@pytest.fixture(autouse=True)
+def cache_home(monkeypatch, tmp_path):
+    """ Keeps the on-disk caches of the tests away from the user ones """
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
+
+
+@pytest.fixture(autouse=True)
+def aws_client_pool(aws_credentials):
+    """ Each test gets fresh AWS clients, bound to its fake credentials """
+    reset_default_client_pool()
+    yield
+    reset_default_client_pool()
+
+
+@pytest.fixture
+def local_backend(tmp_path):
+    """ A local backend on a new vault: no network, and a fast key derivation """
+    from password_organizer.backends.local_file_backend import LocalFileBackend
+
+    backend = LocalFileBackend(
+        vault_path=str(tmp_path / 'vault.pov'), passphrase='secret', scrypt_n=16,
+    )
+    backend.initialize()
+    yield backend
+    backend.close()
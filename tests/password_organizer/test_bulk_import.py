@@ -0,0 +1,112 @@
+import io
+import re
+
+from botocore.awsrequest import AWSResponse
+from moto import mock_aws
+import pytest
+
+from password_organizer.backends.aws_clients import AWSClientPool
+from password_organizer.backends.aws_ssm_backend import AWSSSMBackend
+from password_organizer.backends.rate_limit import RateControllers
+from password_organizer.bulk_import import (
+    BulkImporter, ImportEntry, ImportFormatError, detect_format, read_entries
+)
+
+
+class _RawBody:
+
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self):
+        yield self.body
+
+
+class TestReadEntries:
+
+    def test_env(self):
+        content = '# comment\nexport A=1\nB="two words"\n\nC=x=y\n'
+        assert list(read_entries(io.StringIO(content), 'env')) == [
+            ImportEntry('A', '1'), ImportEntry('B', 'two words'), ImportEntry('C', 'x=y'),
+        ]
+
+    def test_csv_with_header(self):
+        content = 'key,value\n/a,"1,2"\n'
+        assert list(read_entries(io.StringIO(content), 'csv')) == [ImportEntry('/a', '1,2')]
+
+    def test_jsonl(self):
+        content = '{"key": "/a", "value": "1"}\n{"/b": 2}\n'
+        assert list(read_entries(io.StringIO(content), 'jsonl')) == [
+            ImportEntry('/a', '1'), ImportEntry('/b', '2'),
+        ]
+
+    def test_json(self):
+        assert list(read_entries(io.StringIO('{"/a": "1"}'), 'json')) == [ImportEntry('/a', '1')]
+
+    @pytest.mark.parametrize('file_format, content, error', [
+        ('jsonl', '{"/a": "1"}\nnope\n', 'Line 2: Expecting value'),
+        ('json', '{\n"/a": "1",\n}', 'Line 3: Expecting property name'),
+        ('json', b'{"/a": "\xff"}', 'not UTF-8 text'),
+    ])
+    def test_invalid_file(self, tmp_path, file_format, content, error):
+        path = tmp_path / f'secrets.{file_format}'
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content)
+
+        with open(path, encoding='utf-8') as fp:
+            with pytest.raises(ImportFormatError, match=f'^{re.escape(str(path))}: {error}'):
+                list(read_entries(fp, file_format))
+
+    def test_detect_format(self):
+        assert detect_format('secrets.ndjson') == 'jsonl'
+        assert detect_format('/tmp/.env.prod') == 'env'
+        with pytest.raises(ImportFormatError):
+            detect_format('secrets.txt')
+
+
+class TestBulkImporter:
+
+    @mock_aws
+    def test_creates_updates_and_skips_unchanged(self):
+        backend = AWSSSMBackend(region='eu-west-1')
+        backend.initialize()
+        backend.create_password('/unchanged', 'same')
+        backend.create_password('/updated', 'old')
+
+        report = BulkImporter(backend, write_rate=1000).run([
+            ImportEntry('/unchanged', 'same'),
+            ImportEntry('/updated', 'new'),
+        ] + [ImportEntry(f'/created/{i:02}', str(i)) for i in range(25)])
+
+        assert (report.created, report.updated, report.unchanged) == (25, 1, 1)
+        assert report.failures == {}
+        assert backend.retrieve_password('/updated') == 'new'
+        assert backend.retrieve_password('/created/24') == '24'
+
+    @mock_aws
+    def test_throttled_writes_slow_down_instead_of_failing(self):
+        attempts = []
+
+        def throttle_first_attempts(request, **_kwargs):
+            attempts.append(request)
+            if len(attempts) <= 2:
+                body = b'{"__type": "ThrottlingException", "message": "Rate exceeded"}'
+                return AWSResponse(request.url, 400, {}, _RawBody(body))
+            return None
+
+        client_pool = AWSClientPool()
+        # Slows down to 20 calls/s, not to the default 0.5
+        client_pool.rate_controllers = RateControllers(min_rate=20)
+        client_pool.session.events.register_first(
+            'before-send.ssm.PutParameter', throttle_first_attempts,
+        )
+        backend = AWSSSMBackend(region='eu-west-1', client_pool=client_pool)
+        backend.initialize()
+
+        report = BulkImporter(backend, write_rate=1000).run([ImportEntry('/a', '1')])
+
+        assert (report.created, report.failures) == (1, {})
+        assert report.throttles == {'ssm.PutParameter (eu-west-1)': 2}
+        assert client_pool.rate_controllers.controller('ssm', 'eu-west-1', 'PutParameter').rate
@@ -0,0 +1,64 @@
+import io
+import json
+import sys
+
+from botocore.exceptions import ClientError, NoCredentialsError
+from moto import mock_aws
+
+from exceptions import ExitCode
+from password_organizer.backends.aws_ssm_backend import AWSSSMBackend
+from password_organizer.password_organizer import main
+
+
+def _run(capsys, *argv):
+    exit_code = main([argv[0], '--backend', 'ssm', '--region', 'eu-west-1', *argv[1:]])
+    return exit_code, capsys.readouterr().out
+
+
+class TestCommands:
+
+    @mock_aws
+    def test_put_get_list_delete(self, capsys, monkeypatch):
+        assert _run(capsys, 'put', '/app/a', 'value a')[0] == 0
+        monkeypatch.setattr(sys, 'stdin', io.StringIO('value b\n'))
+        assert _run(capsys, 'put', '/app/b')[0] == 0
+        assert _run(capsys, 'put', '/app/a', 'new value a')[0] == 0
+
+        assert _run(capsys, 'get', '/app/a') == (0, 'new value a\n')
+        exit_code, output = _run(capsys, 'get', '/app/a', '/app/b')
+        assert exit_code == 0
+        assert [json.loads(line) for line in output.splitlines()] == [
+            {'key': '/app/a', 'value': 'new value a'},
+            {'key': '/app/b', 'value': 'value b'},
+        ]
+        assert _run(capsys, 'list', '--prefix', '/app/') == (0, '/app/a\n/app/b\n')
+
+        assert _run(capsys, 'delete', '/app/a')[0] == 0
+        assert _run(capsys, 'list') == (0, '/app/b\n')
+        assert _run(capsys, 'get', '/app/a')[0] == ExitCode.PARTIAL_FAILURE.value
+
+    @mock_aws
+    def test_aws_errors(self, capsys, monkeypatch):
+        def access_denied(*_args):
+            raise ClientError(
+                {'Error': {'Code': 'AccessDeniedException', 'Message': 'Not allowed'}}, 'Call'
+            )
+
+        def no_credentials(*_args):
+            raise NoCredentialsError()
+
+        options = ['--backend', 'ssm', '--region', 'eu-west-1']
+        monkeypatch.setattr(AWSSSMBackend, 'retrieve_passwords', access_denied)
+        assert main(['put', *options, '/app/a', 'value a']) == ExitCode.PARTIAL_FAILURE.value
+        assert capsys.readouterr().err.startswith('Failed /app/a: ')
+
+        # Not handled by the command: one line, no traceback
+        monkeypatch.setattr(AWSSSMBackend, 'iter_password_keys_pages', access_denied)
+        assert main(['list', *options]) == ExitCode.BACKEND_FAILURE.value
+        assert capsys.readouterr().err == (
+            'Error: An error occurred (AccessDeniedException) when calling the Call operation: '
+            'Not allowed\n'
+        )
+        monkeypatch.setattr(AWSSSMBackend, 'iter_password_keys_pages', no_credentials)
+        assert main(['list', *options]) == ExitCode.MISSING_AUTHENTICATION.value
+        assert capsys.readouterr().err == 'Error: Unable to locate credentials\n'
@@ -0,0 +1,44 @@
+import io
+import json
+
+from moto import mock_aws
+
+from password_organizer.backends.aws_ssm_backend import AWSSSMBackend
+from password_organizer.export import Exporter
+
+
+def _backend():
+    backend = AWSSSMBackend(region='eu-west-1')
+    backend.initialize()
+    for i in range(60):
+        backend.create_password(f'/prod/key-{i:02}', f'value-{i}')
+    backend.create_password('/dev/key', 'dev value')
+    return backend
+
+
+class TestExporter:
+
+    @mock_aws
+    def test_exports_values_with_prefix(self):
+        output = io.StringIO()
+
+        report = Exporter(_backend(), prefix='/prod/', batch_size=25).run(output)
+
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert report.exported == 60
+        assert report.failures == {}
+        assert sorted((line['key'], line['value']) for line in lines) == sorted(
+            (f'/prod/key-{i:02}', f'value-{i}') for i in range(60)
+        )
+        assert all('last_modified' in line and 'version' in line for line in lines)
+
+    @mock_aws
+    def test_names_only(self):
+        output = io.StringIO()
+
+        report = Exporter(_backend(), prefix='/dev/', with_values=False).run(output)
+
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert report.exported == 1
+        assert [line['key'] for line in lines] == ['/dev/key']
+        assert 'value' not in lines[0]
@@ -0,0 +1,100 @@
+import asyncio
+
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+import pytest
+
+from password_organizer.cli_menu.choice import Choice
+from password_organizer.cli_menu.prompts.common import ScreensApplication
+from password_organizer.menu import confirmation_menu, list_choice_menu, UserCancel, wait_menu
+
+
+class TestListChoiceMenu:
+
+    def test_choices_are_not_copied(self):
+        value = object()
+        with create_pipe_input() as pipe_input:
+            pipe_input.send_text('\r')
+            with create_app_session(input=pipe_input, output=DummyOutput()):
+                assert list_choice_menu([Choice('A choice', value)], 'Which one?') is value
+
+    def test_successive_menus_share_the_application(self, monkeypatch):
+        applications = []
+        run = ScreensApplication.run
+
+        def recording_run(application, *args, **kwargs):
+            applications.append(application)
+            return run(application, *args, **kwargs)
+
+        monkeypatch.setattr(ScreensApplication, 'run', recording_run)
+        choices = [Choice.from_string('first'), Choice.from_string('second')]
+        with create_pipe_input() as pipe_input:
+            with create_app_session(input=pipe_input, output=DummyOutput()):
+                pipe_input.send_text('\r')
+                assert list_choice_menu(choices, 'Which one?') == 'first'
+                pipe_input.send_text('sec\r')
+                assert list_choice_menu(choices, 'Which one?') == 'second'
+                pipe_input.send_text('y')
+                assert confirmation_menu('Sure?') is True
+                pipe_input.send_text('\r')
+                assert confirmation_menu('Sure?') is False
+
+        assert len(applications) == 4
+        assert all(application is applications[0] for application in applications)
+
+    def test_enter_is_ignored_when_nothing_matches(self):
+        choices = [Choice.from_string('first'), Choice.from_string('second')]
+        with create_pipe_input() as pipe_input:
+            # The search matches nothing: the first Enter does not answer
+            pipe_input.send_text('xyz\r\x08\x08\x08sec\r')
+            with create_app_session(input=pipe_input, output=DummyOutput()):
+                assert list_choice_menu(choices, 'Which one?') == 'second'
+
+
+class TestWaitMenu:
+
+    def test_returns_the_result_or_raises(self):
+        async def compute():
+            await asyncio.sleep(0.3)    # Shows the spinner
+            return 42
+
+        async def fail():
+            raise ValueError('Denied')
+
+        with create_pipe_input() as pipe_input:
+            with create_app_session(input=pipe_input, output=DummyOutput()):
+                assert wait_menu('Computing', compute) == 42
+                with pytest.raises(ValueError):
+                    wait_menu('Failing', fail)
+
+    def test_ctrl_c_cancels_the_wait(self):
+        cancelled = []
+
+        async def never_done():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with create_pipe_input() as pipe_input:
+            with create_app_session(input=pipe_input, output=DummyOutput()):
+                pipe_input.send_text('\x03')
+                with pytest.raises(UserCancel):
+                    wait_menu('Waiting', never_done)
+
+        assert cancelled == [True]
+
+    def test_keys_typed_ahead_go_to_the_next_menu(self):
+        async def compute():
+            return 42
+
+        choices = [Choice.from_string('first'), Choice.from_string('second')]
+        with create_pipe_input() as pipe_input:
+            with create_app_session(input=pipe_input, output=DummyOutput()):
+                pipe_input.send_text('\rsec\r')
+                assert list_choice_menu(choices, 'Which one?') == 'first'
+                # `sec\r` was read along with the first Enter, ahead of the spinner
+                assert wait_menu('Computing', compute) == 42
+                assert list_choice_menu(choices, 'Which one?') == 'second'
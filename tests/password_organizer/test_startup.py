@@ -0,0 +1,67 @@
+"""
+Startup time regression tests
+
+They run the imports in a fresh interpreter with `-X importtime`, which reports the time spent
+importing each module, in microseconds, on STDERR
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, Iterable, Set
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STARTUP_BUDGET_US = 250000
+""" Generous, to absorb slow CI machines: the imports take ~70ms on a laptop """
+
+HEAVY_MODULES = ('boto3', 'botocore', 'prompt_toolkit', 'pyfiglet')
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=REPO_ROOT,
+        env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+
+def _import_times(code: str) -> Dict[str, int]:
+    """ Cumulated import time of each module imported by `code`, in microseconds """
+    times = {}
+    for line in _run_python('-X', 'importtime', '-c', code).stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_time, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def _top_level_packages(modules: Iterable[str]) -> Set[str]:
+    return {module.split('.')[0] for module in modules}
+
+
+class TestStartup:
+
+    def test_entry_point_imports_no_heavy_dependency(self):
+        times = _import_times('import password_organizer.password_organizer')
+
+        assert not _top_level_packages(times) & set(HEAVY_MODULES)
+        assert times['password_organizer.password_organizer'] < STARTUP_BUDGET_US
+
+    def test_only_the_chosen_backend_is_imported(self):
+        modules = _run_python(
+            '-c',
+            'import sys; '
+            'from password_organizer.password_organizer import load_backend_class; '
+            'load_backend_class("AWS SSM Parameter Store"); '
+            'print("\\n".join(sys.modules))',
+        ).stdout.splitlines()
+
+        assert 'password_organizer.backends.aws_ssm_backend' in modules
+        assert 'password_organizer.backends.aws_secrets_manager_backend' not in modules
+        assert 'prompt_toolkit' not in _top_level_packages(modules)
@@ -0,0 +1,127 @@
+from moto import mock_aws
+
+from password_organizer.backends.aws_secrets_manager_backend import AWSSecretsManagerBackend
+from password_organizer.backends.aws_ssm_backend import AWSSSMBackend
+from password_organizer.backends.local_file_backend import LocalFileBackend
+from password_organizer.password_organizer import main
+from password_organizer.sync import SyncCheckpoint, Synchronizer
+
+
+def _backends():
+    source = AWSSSMBackend(region='eu-west-1')
+    source.initialize()
+    destination = AWSSecretsManagerBackend(region='eu-west-1')
+    destination.initialize()
+
+    for i in range(30):
+        source.create_password(f'/prod/key-{i:02}', f'value-{i}')
+    source.create_password('/dev/key', 'dev value')
+    destination.create_password('/prod/key-00', 'value-0')
+    destination.create_password('/prod/key-01', 'old value')
+    destination.create_password('/prod/only-in-destination', 'value')
+    return source, destination
+
+
+def _count_reads(monkeypatch, backend):
+    reads = []
+    retrieve_passwords = backend.retrieve_passwords
+
+    def counted(keys):
+        reads.extend(keys)
+        return retrieve_passwords(keys)
+
+    monkeypatch.setattr(backend, 'retrieve_passwords', counted)
+    return reads
+
+
+class TestSynchronizer:
+
+    @mock_aws
+    def test_copies_missing_and_different_passwords(self):
+        source, destination = _backends()
+
+        report = Synchronizer(source, destination, prefix='/prod/', batch_size=7).run()
+
+        assert (report.created, report.updated, report.unchanged) == (28, 1, 1)
+        assert report.failures == {}
+        values = destination.retrieve_passwords([f'/prod/key-{i:02}' for i in range(30)]).values
+        assert values == {f'/prod/key-{i:02}': f'value-{i}' for i in range(30)}
+        assert destination.retrieve_password('/prod/only-in-destination') == 'value'
+        assert '/dev/key' not in destination.retrieve_passwords(['/dev/key']).values
+
+    @mock_aws
+    def test_dry_run(self, tmp_path):
+        source, destination = _backends()
+        checkpoint = SyncCheckpoint(str(tmp_path / 'checkpoint.json'), ['vaults'])
+
+        report = Synchronizer(source, destination, dry_run=True, checkpoint=checkpoint).run()
+
+        assert (report.created, report.updated, report.unchanged) == (29, 1, 1)
+        assert ('update', '/prod/key-01') in report.changes
+        assert ('create', '/dev/key') in report.changes
+        assert destination.retrieve_password('/prod/key-01') == 'old value'
+        assert not (tmp_path / 'checkpoint.json').exists()
+
+    @mock_aws
+    def test_checkpoint_skips_passwords_not_written_since(self, monkeypatch, tmp_path):
+        source, destination = _backends()
+        path = str(tmp_path / 'checkpoint.json')
+        Synchronizer(source, destination, checkpoint=SyncCheckpoint(path, ['vaults'])).run()
+
+        source.update_password('/prod/key-05', 'new value')
+        destination.update_password('/prod/key-06', 'changed in the destination')
+        source_reads = _count_reads(monkeypatch, source)
+        destination_reads = _count_reads(monkeypatch, destination)
+        checkpoint = SyncCheckpoint(path, ['vaults'])
+        report = Synchronizer(source, destination, checkpoint=checkpoint).run()
+
+        assert sorted(source_reads) == ['/prod/key-05', '/prod/key-06']
+        assert sorted(destination_reads) == ['/prod/key-05', '/prod/key-06']
+        assert (report.updated, report.skipped) == (2, 29)
+        assert destination.retrieve_password('/prod/key-06') == 'value-6'
+
+        # A checkpoint of other vaults is ignored
+        source_reads.clear()
+        Synchronizer(source, destination, checkpoint=SyncCheckpoint(path, ['others'])).run()
+        assert len(source_reads) == 31
+
+    def test_backends_without_metadata(self, tmp_path):
+        source, destination = (
+            LocalFileBackend(vault_path=str(tmp_path / name), passphrase='secret', scrypt_n=16)
+            for name in ('source.pov', 'destination.pov')
+        )
+        source.initialize()
+        destination.initialize()
+        source.vault.put_many([('/a', '1'), ('/b', '2')])
+        checkpoint = SyncCheckpoint(str(tmp_path / 'checkpoint.json'), ['vaults'])
+
+        Synchronizer(source, destination, checkpoint=checkpoint).run()
+        report = Synchronizer(source, destination, checkpoint=checkpoint).run()
+
+        # No way to tell what changed: all compared again
+        assert (report.unchanged, report.skipped) == (2, 0)
+        assert list(destination.vault.keys()) == ['/a', '/b']
+
+
+class TestSyncCommand:
+
+    @mock_aws
+    def test_sync_to_another_region(self, capsys):
+        source = AWSSSMBackend(region='eu-west-1')
+        source.initialize()
+        source.create_password('/app/a', 'value a')
+        source.create_password('/app/b', 'value b')
+        argv = ['sync', '--backend', 'ssm', '--region', 'eu-west-1', '--to-region', 'eu-west-2']
+
+        assert main(argv + ['--to', 'ssm', '--dry-run']) == 0
+        assert capsys.readouterr().out == 'create /app/a\ncreate /app/b\n'
+
+        assert main(argv + ['--to', 'ssm']) == 0
+        captured = capsys.readouterr()
+        assert 'Processed 2: 2 created' in captured.err
+
+        assert main(argv + ['--to', 'ssm']) == 0
+        captured = capsys.readouterr()
+        assert 'Processed 2: 0 created, 0 updated, 0 unchanged, 2 skipped' in captured.err
+
+        assert main(argv[:-2] + ['--to', 'ssm']) != 0
@@ -0,0 +1,85 @@
+import json
+
+from botocore.awsrequest import AWSResponse
+from moto import mock_aws
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+from password_organizer.backends.aws_clients import default_client_pool
+from password_organizer.cli_menu.choice import Choice
+from password_organizer.menu import list_choice_menu
+from password_organizer.password_organizer import main
+from password_organizer.tracing import Tracer, tracing
+
+
+class _RawBody:
+
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self):
+        yield self.body
+
+
+def _throttle_once(session):
+    """ The first PutParameter attempt is throttled, before it reaches moto """
+    attempts = []
+
+    def before_send(request, **_kwargs):
+        attempts.append(request)
+        if len(attempts) == 1:
+            body = b'{"__type": "ThrottlingException", "message": "Rate exceeded"}'
+            return AWSResponse(request.url, 400, {}, _RawBody(body))
+        return None
+
+    session.events.register_first('before-send.ssm.PutParameter', before_send)
+
+
+class TestTracing:
+
+    def test_spans_and_summary(self):
+        tracer = Tracer()
+        with tracer.span('list', 'backend'):
+            pass
+        tracer.instant('throttle', 'aws')
+
+        events = tracer.trace_events()
+        assert [event['ph'] for event in events] == ['M', 'X', 'i']
+        assert sorted(row[:3] for row in tracer.summary()) == [
+            ('aws', 'throttle', 1), ('backend', 'list', 1),
+        ]
+
+    @mock_aws
+    def test_trace_option(self, capsys, tmp_path):
+        _throttle_once(default_client_pool().session)
+        trace_path = tmp_path / 'trace.json'
+
+        exit_code = main([
+            '--trace', str(trace_path), '--profile', str(tmp_path / 'profile'),
+            'put', '--backend', 'ssm', '--region', 'eu-west-1', '/app/a', 'secret value',
+        ])
+
+        assert exit_code == 0
+        events = json.loads(trace_path.read_text())['traceEvents']
+        spans = {(event['cat'], event['name']): event for event in events if event['ph'] == 'X'}
+        assert ('backend', 'AWSSSMBackend.create_password') in spans
+        put_parameter = spans[('aws', 'ssm.PutParameter')]
+        assert put_parameter['args']['attempts'] == 2
+        assert put_parameter['args']['throttles'] == 1
+        assert [event['name'] for event in events if event['ph'] == 'i'] == ['throttle']
+        assert 'secret value' not in trace_path.read_text()
+        assert (tmp_path / 'profile').exists()
+        assert 'ssm.PutParameter' in capsys.readouterr().err
+
+    def test_menu_renders(self, tmp_path, capsys):
+        trace_path = tmp_path / 'trace.json'
+        with tracing(str(trace_path)):
+            with create_pipe_input() as pipe_input:
+                pipe_input.send_text('\r')
+                with create_app_session(input=pipe_input, output=DummyOutput()):
+                    list_choice_menu([Choice.from_string('only')], 'Which one?')
+
+        events = json.loads(trace_path.read_text())['traceEvents']
+        spans = {(event['cat'], event['name']) for event in events if event['ph'] == 'X'}
+        assert ('ui', 'render ListMenuScreen') in spans